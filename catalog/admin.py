@@ -77,7 +77,7 @@ class StrainAdmin(admin.ModelAdmin):
         'strain_number', 'scientific_name', 'genus', 'species',
         'isolation_source', 'geographic_location', 'alternative_numbers'
     ]
-    ordering = ['collection__code', 'strain_number']
+    ordering = ['collection_code', 'strain_number']
     date_hierarchy = 'deposit_date'
     
     fieldsets = (
@@ -232,6 +232,10 @@ class GenomeSequenceAdmin(admin.ModelAdmin):
                 'sequence_length', 'sequence_data'
             )
         }),
+        ('Хранилище последовательностей', {
+            'fields': ('sequence_handle', 'stored_length', 'sequence_checksum'),
+            'classes': ('collapse',)
+        }),
         ('Качество', {
             'fields': ('quality_score', 'coverage', 'submission_date'),
             'classes': ('collapse',)
@@ -246,7 +250,13 @@ class GenomeSequenceAdmin(admin.ModelAdmin):
         }),
     )
     
-    readonly_fields = ['created_at', 'updated_at']
+    readonly_fields = [
+        'sequence_handle', 'stored_length', 'sequence_checksum',
+        'created_at', 'updated_at'
+    ]
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).defer('sequence_data')
     
     def strain_name(self, obj):
         return obj.strain.full_name
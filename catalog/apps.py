@@ -7,6 +7,9 @@ class CatalogConfig(AppConfig):
     verbose_name = 'Каталог микроорганизмов'
     
     def ready(self):
+        # Подключение сигналов (снимок статистики и т.п.)
+        from . import signals
+        
         # Настройка админки
         from django.contrib import admin
         from django.conf import settings
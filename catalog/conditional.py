@@ -0,0 +1,85 @@
+"""
+Условные ответы API (ETag / Last-Modified) по версиям данных каталога.
+
+Ответ представления однозначно определяется путем, параметрами запроса,
+форматом ответа и версиями данных, от которых он зависит
+(``version_namespaces``, см. ``catalog/versions.py``). Из них строится
+сильный ETag; Last-Modified - время последнего изменения этих данных.
+
+Проверка ``If-None-Match`` выполняется в ``initial()`` - после
+согласования формата и проверки прав, но до обработчика, поэтому ответ 304
+не выполняет ни одного запроса к БД. ``If-Modified-Since`` не проверяется:
+Last-Modified имеет точность до секунды, и изменение в ту же секунду дало
+бы ложный ответ 304.
+
+С кэшем в памяти процесса версии не учитывают изменения, сделанные другими
+процессами (``shared_versions()``), поэтому ETag не выдается.
+"""
+import hashlib
+
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.response import Response
+
+from .versions import STRAINS, get_last_modified, get_versions, shared_versions
+
+
+class NotModified(APIException):
+    """Данные не изменились с версии, уже имеющейся у клиента"""
+    status_code = status.HTTP_304_NOT_MODIFIED
+
+
+class ConditionalResponseMixin:
+    """
+    ETag и Last-Modified для GET/HEAD представлений DRF и ответ 304 без
+    выполнения обработчика.
+
+    Browsable API не обрабатывается: его страница зависит от пользователя
+    (форма входа, CSRF-токен).
+    """
+    # Версии данных, от которых зависит ответ
+    version_namespaces = [STRAINS]
+
+    conditional_etag = None
+
+    def get_conditional_etag(self, request, versions):
+        parts = [
+            request.path,
+            repr(sorted(request.query_params.lists())),
+            request.accepted_media_type or '',
+            repr(sorted(versions.items())),
+        ]
+        return quote_etag(hashlib.sha1('|'.join(parts).encode('utf-8')).hexdigest())
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method not in ('GET', 'HEAD') or request.accepted_renderer.format == 'api':
+            return
+        if not shared_versions():
+            return
+
+        self.conditional_etag = self.get_conditional_etag(
+            request, get_versions(self.version_namespaces)
+        )
+        self.conditional_last_modified = int(get_last_modified(self.version_namespaces))
+        conditional = get_conditional_response(request, etag=self.conditional_etag)
+        if conditional is not None and conditional.status_code == status.HTTP_304_NOT_MODIFIED:
+            raise NotModified()
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            return Response(status=status.HTTP_304_NOT_MODIFIED)
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if self.conditional_etag and response.status_code in (
+            status.HTTP_200_OK, status.HTTP_206_PARTIAL_CONTENT, status.HTTP_304_NOT_MODIFIED
+        ):
+            response['ETag'] = self.conditional_etag
+            response['Last-Modified'] = http_date(self.conditional_last_modified)
+            # Клиенты должны каждый раз проверять актуальность (ответ 304 дешев)
+            patch_cache_control(response, no_cache=True)
+        return response
@@ -0,0 +1,186 @@
+"""
+Потоковый экспорт данных каталога.
+
+Экспорт строится из генераторов поверх ``values_list(...).iterator()``:
+в памяти одновременно находится только одна порция строк из БД, а первая
+строка ответа (заголовок CSV или ``[`` массива JSON) отправляется клиенту
+до выполнения запроса.
+"""
+import csv
+
+from django.http import StreamingHttpResponse
+
+from .models import Strain
+from .renderers import dumps
+from .sequence_store import get_sequence_store, normalize_sequence
+
+
+# Размер порции строк, читаемых из БД за один раз
+EXPORT_CHUNK_SIZE = 2000
+
+ORGANISM_TYPE_LABELS = dict(Strain.ORGANISM_TYPES)
+HABITAT_TYPE_LABELS = dict(Strain.HABITAT_TYPES)
+
+
+class Echo:
+    """Псевдобуфер для csv.writer: write() просто возвращает строку"""
+
+    def write(self, value):
+        return value
+
+
+def iterate_rows(queryset, fields, chunk_size=EXPORT_CHUNK_SIZE):
+    """Кортежи значений полей без кэширования queryset"""
+    return queryset.values_list(*fields).iterator(chunk_size=chunk_size)
+
+
+def stream_csv(header, rows):
+    """Генератор строк CSV: сначала заголовок, затем по одной строке"""
+    writer = csv.writer(Echo())
+    yield writer.writerow(header)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def streaming_attachment(chunks, content_type, filename):
+    """StreamingHttpResponse с заголовком Content-Disposition"""
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+# Поля записи JSON/NDJSON экспорта в порядке values_list
+STRAIN_EXPORT_FIELDS = [
+    'collection_code', 'strain_number', 'scientific_name',
+    'organism_type', 'habitat_type', 'isolation_source',
+    'geographic_location', 'latitude', 'longitude',
+    'is_psychrophile', 'is_thermophile', 'is_halophile',
+    'is_acidophile', 'is_alkaliphile', 'is_barophile',
+    'produces_antibiotics', 'produces_enzymes',
+    'produces_metabolites', 'nitrogen_fixation',
+]
+
+
+def strain_export_record(row):
+    """Запись экспорта штамма из кортежа STRAIN_EXPORT_FIELDS"""
+    (code, strain_number, scientific_name, organism_type, habitat_type,
+     isolation_source, geographic_location, latitude, longitude,
+     is_psychrophile, is_thermophile, is_halophile, is_acidophile,
+     is_alkaliphile, is_barophile, produces_antibiotics, produces_enzymes,
+     produces_metabolites, nitrogen_fixation) = row
+    return {
+        'collection': code,
+        'strain_number': strain_number,
+        'scientific_name': scientific_name,
+        'organism_type': organism_type,
+        'habitat_type': habitat_type,
+        'isolation_source': isolation_source,
+        'geographic_location': geographic_location,
+        'coordinates': {
+            'latitude': float(latitude) if latitude else None,
+            'longitude': float(longitude) if longitude else None,
+        },
+        'extremophile_properties': {
+            'is_psychrophile': is_psychrophile,
+            'is_thermophile': is_thermophile,
+            'is_halophile': is_halophile,
+            'is_acidophile': is_acidophile,
+            'is_alkaliphile': is_alkaliphile,
+            'is_barophile': is_barophile,
+        },
+        'biotechnology': {
+            'produces_antibiotics': produces_antibiotics,
+            'produces_enzymes': produces_enzymes,
+            'produces_metabolites': produces_metabolites,
+            'nitrogen_fixation': nitrogen_fixation,
+        }
+    }
+
+
+def dump_record(record):
+    """Компактный JSON записи (bytes, UTF-8), как в ответах API"""
+    return dumps(record)
+
+
+def stream_json_array(records):
+    """
+    Генератор JSON-массива по частям.
+
+    Результат побайтно совпадает с ``dumps(list(records))``, но массив
+    не собирается в памяти.
+    """
+    yield b'['
+    separator = b''
+    for record in records:
+        yield separator + dump_record(record)
+        separator = b','
+    yield b']'
+
+
+def stream_ndjson(records):
+    """Генератор NDJSON: одна запись JSON на строку"""
+    for record in records:
+        yield dump_record(record) + b'\n'
+
+
+# Допустимая ширина строки последовательности в FASTA
+FASTA_LINE_WIDTHS = (60, 80)
+
+# Порция записей GenomeSequence: последовательности могут быть большими
+FASTA_CHUNK_SIZE = 50
+
+# Поля записи FASTA экспорта в порядке values_list
+FASTA_EXPORT_FIELDS = [
+    'accession_number', 'sequence_type', 'sequence_data', 'sequence_handle',
+    'strain__collection_code', 'strain__strain_number',
+    'strain__scientific_name', 'strain__latitude', 'strain__longitude',
+    'strain__optimal_temperature', 'strain__habitat_type',
+]
+
+
+def wrap_sequence(pieces, width, lines_per_chunk=1000):
+    """
+    Строки последовательности шириной width.
+
+    pieces - части последовательности произвольной длины (например, чанки
+    хранилища); вывод идет порциями не более lines_per_chunk строк.
+    """
+    step = width * lines_per_chunk
+    carry = ''
+    for piece in pieces:
+        buffer = carry + piece
+        complete = len(buffer) - len(buffer) % width
+        for offset in range(0, complete, step):
+            block = buffer[offset:min(offset + step, complete)]
+            yield '\n'.join(
+                block[i:i + width] for i in range(0, len(block), width)
+            ) + '\n'
+        carry = buffer[complete:]
+    if carry:
+        yield carry + '\n'
+
+
+def stream_fasta(rows, width):
+    """Генератор FASTA из кортежей FASTA_EXPORT_FIELDS"""
+    store = get_sequence_store()
+    for (accession, sequence_type, sequence_data, sequence_handle, code,
+         strain_number, scientific_name, latitude, longitude, temperature,
+         habitat_type) in rows:
+        if sequence_handle:
+            pieces = store.iter_chunks(sequence_handle)
+        else:
+            sequence = normalize_sequence(sequence_data)
+            if not sequence:
+                continue
+            pieces = [sequence]
+
+        header = f">{accession} {code}-{strain_number} {scientific_name}"
+        header += f" [type={sequence_type}]"
+        if latitude and longitude:
+            header += f" [lat={latitude} lon={longitude}]"
+        if temperature:
+            header += f" [temp={temperature}C]"
+        header += f" [habitat={habitat_type}]"
+
+        yield header + '\n'
+        yield from wrap_sequence(pieces, width)
@@ -0,0 +1,200 @@
+"""
+Быстрая сериализация списков штаммов без объектов моделей.
+
+``ModelSerializer`` для каждой строки создает объект модели, вызывает
+``get_*_display`` и ``to_representation`` каждого поля через общий механизм
+DRF. ``FastSerializer`` один раз «компилирует» сериализатор: выбирает колонки
+``values_list()`` и строит функцию строка -> словарь, в которой каждое
+поле - обращение к элементу кортежа и, если нужно, одно преобразование.
+
+* строки, флаги и целые числа из БД DRF выводит без изменений - они
+  копируются как есть;
+* прочие поля (Decimal, даты, UUID) - ``to_representation`` того же поля
+  DRF (вывод совпадает байт в байт), ``None`` выводится как есть, как в DRF;
+* ``get_<поле>_display`` - словарь код -> название;
+* вычисляемые свойства (COMPUTED_FIELDS) - по колонкам, в том числе списки
+  экстремофильных и биотехнологических свойств по маске ``traits`` через
+  заранее построенную таблицу маска -> список.
+
+Сериализатор, поля которого не сводятся к колонкам (SerializerMethodField
+без описания в COMPUTED_FIELDS, вложенные списки), не компилируется -
+``compile_serializer`` возвращает None, и используется DRF.
+"""
+import functools
+import operator
+
+from rest_framework import serializers
+
+from .models import Strain
+from .serializers import DISPLAY_SOURCE
+
+
+# Поле флага -> название
+EXTREMOPHILE_LABELS = {field: label for _, field, label in Strain.EXTREMOPHILE_TYPES}
+BIOTECH_LABELS = {field: label for _, field, label in Strain.BIOTECH_TYPES}
+
+
+def labels_by_mask(labels):
+    """
+    Таблица маска traits -> список названий установленных флагов labels
+    (в порядке labels). Индекс таблицы - маска, сдвинутая к первому биту
+    группы.
+    """
+    bits = [Strain.TRAIT_FIELDS.index(field) for field in labels]
+    shift = min(bits)
+    names = list(labels.values())
+    table = []
+    for mask in range(1 << (max(bits) - shift + 1)):
+        table.append([
+            name for name, bit in zip(names, bits) if mask & (1 << (bit - shift))
+        ])
+    return shift, (1 << (max(bits) - shift + 1)) - 1, table
+
+
+def traits_labels(labels):
+    """Функция traits -> список названий (копия списка из таблицы)"""
+    shift, mask, table = labels_by_mask(labels)
+    return lambda traits: list(table[(traits >> shift) & mask])
+
+
+extremophile_labels = traits_labels(EXTREMOPHILE_LABELS)
+biotech_labels = traits_labels(BIOTECH_LABELS)
+
+# Вычисляемые поля: имя -> (колонки values_list, функция от их значений)
+COMPUTED_FIELDS = {
+    Strain: {
+        'full_name': (
+            ('collection_code', 'strain_number'),
+            lambda code, number: f'{code}-{number}'
+        ),
+        'is_baikal_endemic': (
+            ('habitat_type',),
+            lambda habitat_type: habitat_type in Strain.BAIKAL_HABITATS
+        ),
+        'extremophile_types': (('traits',), extremophile_labels),
+        'extremophile_summary': (('traits',), extremophile_labels),
+        'biotechnology_summary': (('traits',), biotech_labels),
+    },
+}
+
+
+# Поля DRF, которые значения из БД (str, bool, int) выводят без изменений
+PASSTHROUGH_FIELDS = (
+    serializers.CharField, serializers.ChoiceField,
+    serializers.BooleanField, serializers.IntegerField,
+)
+
+
+def display_labels(model, name):
+    """Функция код -> название для поля с choices (как get_<поле>_display)"""
+    labels = {code: str(label) for code, label in model._meta.get_field(name).flatchoices}
+    return lambda value: labels.get(value, value)
+
+
+def field_plan(model, name, field):
+    """
+    (колонки, функция) для поля сериализатора; функция None - значение
+    выводится как есть; None вместо пары - поле не компилируется.
+    """
+    computed = COMPUTED_FIELDS.get(model, {})
+    if name in computed:
+        return computed[name]
+    if isinstance(field, (serializers.SerializerMethodField, serializers.ListSerializer)):
+        return None
+    source = field.source
+    display = DISPLAY_SOURCE.match(source)
+    if display:
+        return (display.group(1),), display_labels(model, display.group(1))
+    if isinstance(field, serializers.PrimaryKeyRelatedField):
+        # DRF выводит первичный ключ связанного объекта как есть
+        return (source,), None
+    path = source.replace('.', '__')
+    if path.split('__')[0] not in {f.name for f in model._meta.concrete_fields}:
+        return None
+    if type(field) in PASSTHROUGH_FIELDS:
+        return (path,), None
+    convert = field.to_representation
+    return (path,), lambda value: None if value is None else convert(value)
+
+
+class FastSerializer:
+    """
+    Скомпилированный сериализатор: rows(queryset) -> строки values_list,
+    serialize(rows) -> список словарей, совпадающий с serializer.data.
+    """
+
+    def __init__(self, columns, row_to_dict):
+        self.columns = columns
+        self.row_to_dict = row_to_dict
+
+    def rows(self, queryset, extra=()):
+        """
+        Строки queryset с нужными колонками (именованные кортежи); extra -
+        дополнительные колонки в конце строки (например, ключ пагинации).
+        """
+        columns = self.columns + tuple(
+            column for column in extra if column not in self.columns
+        )
+        return queryset.values_list(*columns, named=True)
+
+    def serialize(self, rows):
+        return list(map(self.row_to_dict, rows))
+
+
+def column_getter(positions, convert):
+    """Функция строка -> значение поля из колонок positions строки"""
+    if convert is None:
+        return operator.itemgetter(*positions)
+    if len(positions) == 1:
+        position, = positions
+        return lambda row: convert(row[position])
+    getter = operator.itemgetter(*positions)
+    return lambda row: convert(*getter(row))
+
+
+def row_function(names, getters, positions):
+    """
+    Функция строка -> словарь полей names. Если ни одно поле не
+    преобразуется, значения выбираются одним itemgetter по positions.
+    """
+    if getters is None:
+        if len(positions) == 1:
+            name, = names
+            position, = positions
+            return lambda row: {name: row[position]}
+        getter = operator.itemgetter(*positions)
+        return lambda row: dict(zip(names, getter(row)))
+    return lambda row: dict(zip(names, [get(row) for get in getters]))
+
+
+@functools.lru_cache(maxsize=None)
+def compile_fields(serializer_class, fields):
+    serializer = serializer_class()
+    model = serializer_class.Meta.model
+    columns = []
+    getters = []
+    positions = []
+    converted = False
+    for name in fields:
+        entry = field_plan(model, name, serializer.fields[name])
+        if entry is None:
+            return None
+        field_columns, convert = entry
+        for column in field_columns:
+            if column not in columns:
+                columns.append(column)
+        field_positions = [columns.index(column) for column in field_columns]
+        positions.extend(field_positions)
+        converted = converted or convert is not None
+        getters.append(column_getter(field_positions, convert))
+    # Одна функция на весь набор полей, построенная заранее
+    row_to_dict = row_function(fields, getters if converted else None, positions)
+    return FastSerializer(tuple(columns), row_to_dict)
+
+
+def compile_serializer(serializer_class, fields=None):
+    """
+    FastSerializer для полей fields (по умолчанию Meta.fields) сериализатора
+    модели или None, если какое-либо поле не сводится к колонкам.
+    """
+    return compile_fields(serializer_class, tuple(fields or serializer_class.Meta.fields))
@@ -1,6 +1,17 @@
 import django_filters
 from django.db import models
-from .models import Strain, Collection, GenomeSequence, Publication
+from rest_framework.filters import OrderingFilter
+from .models import Strain, Collection, GenomeSequence, Publication, traits_mask
+from .fulltext import RANK_ANNOTATION, search_strains
+from .fuzzy import FUZZY_ANNOTATION, fuzzy_search
+
+
+# Значение фильтров extremophile_types и biotech_types -> поле флага
+EXTREMOPHILE_TYPE_FIELDS = {value: field for value, field, _ in Strain.EXTREMOPHILE_TYPES}
+BIOTECH_TYPE_FIELDS = {value: field for value, field, _ in Strain.BIOTECH_TYPES}
+
+# Аннотации релевантности, по которым сортируются результаты поиска
+RELEVANCE_ANNOTATIONS = [RANK_ANNOTATION, FUZZY_ANNOTATION]
 
 
 class StrainFilter(django_filters.FilterSet):
@@ -92,14 +103,7 @@ class StrainFilter(django_filters.FilterSet):
         method='filter_extremophile'
     )
     extremophile_types = django_filters.MultipleChoiceFilter(
-        choices=[
-            ('psychrophile', 'Психрофил'),
-            ('thermophile', 'Термофил'),
-            ('halophile', 'Галофил'),
-            ('acidophile', 'Ацидофил'),
-            ('alkaliphile', 'Алкалифил'),
-            ('barophile', 'Барофил'),
-        ],
+        choices=[(value, label) for value, _, label in Strain.EXTREMOPHILE_TYPES],
         method='filter_extremophile_types'
     )
     
@@ -108,12 +112,7 @@ class StrainFilter(django_filters.FilterSet):
         method='filter_biotech_potential'
     )
     biotech_types = django_filters.MultipleChoiceFilter(
-        choices=[
-            ('antibiotics', 'Антибиотики'),
-            ('enzymes', 'Ферменты'),
-            ('metabolites', 'Метаболиты'),
-            ('nitrogen_fixation', 'Азотфиксация'),
-        ],
+        choices=[(value, label) for value, _, label in Strain.BIOTECH_TYPES],
         method='filter_biotech_types'
     )
     
@@ -170,6 +169,9 @@ class StrainFilter(django_filters.FilterSet):
     # Многократный поиск
     search = django_filters.CharFilter(method='filter_search')
     
+    # Нечеткий поиск по названиям (опечатки в латинских названиях)
+    fuzzy = django_filters.CharFilter(method='filter_fuzzy')
+    
     class Meta:
         model = Strain
         fields = [
@@ -183,66 +185,32 @@ class StrainFilter(django_filters.FilterSet):
     def filter_extremophile(self, queryset, name, value):
         """Фильтр для любых экстремофилов"""
         if value:
-            return queryset.filter(
-                models.Q(is_psychrophile=True) |
-                models.Q(is_thermophile=True) |
-                models.Q(is_halophile=True) |
-                models.Q(is_acidophile=True) |
-                models.Q(is_alkaliphile=True) |
-                models.Q(is_barophile=True)
-            )
+            return queryset.filter(is_extremophile=True)
         return queryset
     
     def filter_extremophile_types(self, queryset, name, value):
-        """Фильтр по типам экстремофилов"""
+        """Фильтр по типам экстремофилов (любой из выбранных)"""
         if not value:
             return queryset
         
-        conditions = models.Q()
-        for extremophile_type in value:
-            if extremophile_type == 'psychrophile':
-                conditions |= models.Q(is_psychrophile=True)
-            elif extremophile_type == 'thermophile':
-                conditions |= models.Q(is_thermophile=True)
-            elif extremophile_type == 'halophile':
-                conditions |= models.Q(is_halophile=True)
-            elif extremophile_type == 'acidophile':
-                conditions |= models.Q(is_acidophile=True)
-            elif extremophile_type == 'alkaliphile':
-                conditions |= models.Q(is_alkaliphile=True)
-            elif extremophile_type == 'barophile':
-                conditions |= models.Q(is_barophile=True)
-        
-        return queryset.filter(conditions)
+        return queryset.filter(
+            traits__has_any=traits_mask(EXTREMOPHILE_TYPE_FIELDS[extremophile_type] for extremophile_type in value)
+        )
     
     def filter_biotech_potential(self, queryset, name, value):
         """Фильтр для биотехнологического потенциала"""
         if value:
-            return queryset.filter(
-                models.Q(produces_antibiotics=True) |
-                models.Q(produces_enzymes=True) |
-                models.Q(produces_metabolites=True) |
-                models.Q(nitrogen_fixation=True)
-            )
+            return queryset.filter(has_biotech_potential=True)
         return queryset
     
     def filter_biotech_types(self, queryset, name, value):
-        """Фильтр по типам биотехнологического потенциала"""
+        """Фильтр по типам биотехнологического потенциала (любой из выбранных)"""
         if not value:
             return queryset
         
-        conditions = models.Q()
-        for biotech_type in value:
-            if biotech_type == 'antibiotics':
-                conditions |= models.Q(produces_antibiotics=True)
-            elif biotech_type == 'enzymes':
-                conditions |= models.Q(produces_enzymes=True)
-            elif biotech_type == 'metabolites':
-                conditions |= models.Q(produces_metabolites=True)
-            elif biotech_type == 'nitrogen_fixation':
-                conditions |= models.Q(nitrogen_fixation=True)
-        
-        return queryset.filter(conditions)
+        return queryset.filter(
+            traits__has_any=traits_mask(BIOTECH_TYPE_FIELDS[biotech_type] for biotech_type in value)
+        )
     
     def filter_baikal(self, queryset, name, value):
         """Фильтр для байкальских штаммов"""
@@ -256,23 +224,35 @@ class StrainFilter(django_filters.FilterSet):
         return queryset
     
     def filter_search(self, queryset, name, value):
-        """Многоцелевой поиск по различным полям"""
+        """Полнотекстовый поиск с аннотацией релевантности (search_rank)"""
         if not value:
             return queryset
         
-        return queryset.filter(
-            models.Q(scientific_name__icontains=value) |
-            models.Q(genus__icontains=value) |
-            models.Q(species__icontains=value) |
-            models.Q(strain_number__icontains=value) |
-            models.Q(alternative_numbers__icontains=value) |
-            models.Q(isolation_source__icontains=value) |
-            models.Q(geographic_location__icontains=value) |
-            models.Q(description__icontains=value) |
-            models.Q(special_properties__icontains=value) |
-            models.Q(collection__name__icontains=value) |
-            models.Q(collection__code__icontains=value)
-        )
+        return search_strains(queryset, value)
+    
+    def filter_fuzzy(self, queryset, name, value):
+        """Триграммное сходство с названием, родом и видом (fuzzy_similarity)"""
+        if not value.strip():
+            return queryset
+        
+        return fuzzy_search(queryset, value)
+
+
+class RelevanceOrderingFilter(OrderingFilter):
+    """
+    Сортировка DRF, которая при поиске (?search=, ?fuzzy=) без явного
+    ?ordering= выводит сначала наиболее релевантные результаты.
+    """
+    
+    def get_ordering(self, request, queryset, view):
+        params = request.query_params.get(self.ordering_param)
+        relevance = [
+            f'-{annotation}' for annotation in RELEVANCE_ANNOTATIONS
+            if annotation in queryset.query.annotations
+        ]
+        if not params and relevance:
+            return [*relevance, *(self.get_default_ordering(view) or [])]
+        return super().get_ordering(request, queryset, view)
 
 
 class CollectionFilter(django_filters.FilterSet):
@@ -0,0 +1,133 @@
+"""
+Полнотекстовый поиск по штаммам.
+
+Индексируется StrainSearchDocument - денормализованный документ штамма,
+поля которого имеют разный вес (названия > номера > происхождение >
+описание). Структура индекса зависит от СУБД (см. миграцию 0004):
+
+* PostgreSQL - сохраняемый столбец ``search_vector`` типа tsvector
+  с GIN-индексом. Названия индексируются конфигурацией ``english`` (латинские
+  биноминальные названия), номера - ``simple``, остальные поля - ``russian``;
+  ранжирование - ``ts_rank_cd``.
+* SQLite - виртуальная таблица FTS5 ``catalog_strain_fts``, синхронизируемая
+  триггерами; ранжирование - ``bm25`` с весами полей.
+
+Для прочих СУБД поиск откатывается к ``icontains`` без ранжирования.
+"""
+import re
+
+from django.db import connections
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+from .models import Strain, StrainSearchDocument
+
+
+# Аннотация с релевантностью (больше - лучше)
+RANK_ANNOTATION = 'search_rank'
+
+# Веса полей документа для bm25 в порядке столбцов FTS5
+FTS_WEIGHTS = (10.0, 5.0, 2.0, 1.0)
+
+# Поля для поиска без полнотекстового индекса
+FALLBACK_FIELDS = [
+    'scientific_name', 'genus', 'species', 'strain_number',
+    'alternative_numbers', 'isolation_source', 'geographic_location',
+    'description', 'special_properties', 'collection__name', 'collection__code',
+]
+
+FTS_JOIN = (
+    "catalog_strain_fts JOIN catalog_strainsearchdocument AS document"
+    " ON document.id = catalog_strain_fts.rowid"
+)
+
+TOKEN_RE = re.compile(r'\w+')
+
+POSTGRES_QUERY = (
+    "(websearch_to_tsquery('russian', %s) || websearch_to_tsquery('english', %s)"
+    " || to_tsquery('simple', %s))"
+)
+
+
+def query_tokens(query):
+    return TOKEN_RE.findall(query.lower())
+
+
+def postgres_prefix_query(tokens):
+    """Запрос to_tsquery с поиском по префиксу каждого слова"""
+    return ' & '.join(f"'{token}':*" for token in tokens)
+
+
+def fts5_query(tokens):
+    """Запрос MATCH для FTS5: все слова, каждое - как префикс"""
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def fallback_search(queryset, query):
+    condition = Q()
+    for field in FALLBACK_FIELDS:
+        condition |= Q(**{f'{field}__icontains': query})
+    return queryset.filter(condition).annotate(
+        **{RANK_ANNOTATION: Value(0.0, output_field=FloatField())}
+    )
+
+
+def search_strains(queryset, query):
+    """
+    Отбирает штаммы по поисковой строке и аннотирует их релевантностью.
+
+    Возвращает queryset с аннотацией ``search_rank``; порядок не меняется,
+    сортировку по релевантности выполняет вызывающая сторона.
+    """
+    query = query.strip()
+    tokens = query_tokens(query)
+    if not tokens:
+        return fallback_search(queryset, query)
+
+    strain_table = queryset.model._meta.db_table
+    vendor = connections[queryset.db].vendor
+
+    if vendor == 'postgresql':
+        params = (query, query, postgres_prefix_query(tokens))
+        matches = RawSQL(
+            "SELECT strain_id FROM catalog_strainsearchdocument"
+            f" WHERE search_vector @@ {POSTGRES_QUERY}",
+            params
+        )
+        rank = RawSQL(
+            f"SELECT ts_rank_cd(search_vector, {POSTGRES_QUERY})"
+            " FROM catalog_strainsearchdocument"
+            f" WHERE strain_id = {strain_table}.id",
+            params,
+            output_field=FloatField()
+        )
+    elif vendor == 'sqlite':
+        match = fts5_query(tokens)
+        weights = ', '.join(str(weight) for weight in FTS_WEIGHTS)
+        # rowid в FTS5 - первичный ключ документа, а не штамма (UUID)
+        matches = RawSQL(
+            f"SELECT document.strain_id FROM {FTS_JOIN} WHERE catalog_strain_fts MATCH %s",
+            (match,)
+        )
+        # bm25 возвращает отрицательные значения: чем меньше, тем лучше
+        rank = RawSQL(
+            f"SELECT -bm25(catalog_strain_fts, {weights}) FROM {FTS_JOIN}"
+            f" WHERE catalog_strain_fts MATCH %s AND document.strain_id = {strain_table}.id",
+            (match,),
+            output_field=FloatField()
+        )
+    else:
+        return fallback_search(queryset, query)
+
+    return queryset.filter(pk__in=matches).annotate(**{RANK_ANNOTATION: rank})
+
+
+def rebuild_search_documents(strains=None):
+    """Пересоздает поисковые документы штаммов (по умолчанию - всех)"""
+    if strains is None:
+        strains = Strain.objects.select_related('collection')
+    count = 0
+    for strain in strains.iterator(chunk_size=500):
+        StrainSearchDocument.update_for(strain)
+        count += 1
+    return count
@@ -0,0 +1,188 @@
+"""
+Нечеткий поиск по таксономическим названиям на основе триграмм.
+
+Опечатки в латинских названиях (``Psedomonas``, ``Rodococcus``) не находятся
+через ``icontains``, но дают высокое сходство по триграммам.
+
+* PostgreSQL - оператор ``<%`` расширения pg_trgm с GIN-индексом по выражению
+  ``TAXON_EXPRESSION`` (миграция 0005); ранжирование - ``word_similarity``.
+  Порог оператора - параметр ``pg_trgm.word_similarity_threshold``, он
+  устанавливается равным FUZZY_THRESHOLD при открытии соединения
+  (``catalog/signals.py``).
+* Прочие СУБД - триграммный индекс в памяти процесса. Он строится при первом
+  запросе и перестраивается при изменении версии данных штаммов
+  (``catalog/versions.py``); найденные штаммы отбираются из БД запросами
+  по первичным ключам частями по FUZZY_BATCH_SIZE.
+"""
+import re
+import threading
+from collections import Counter, defaultdict
+
+from django.db import connections
+from django.db.models import BooleanField, Case, FloatField, Value, When
+from django.db.models.expressions import RawSQL
+
+from .models import Strain
+from .versions import STRAINS, get_version
+
+
+# Аннотация со сходством (0..1, больше - лучше)
+FUZZY_ANNOTATION = 'fuzzy_similarity'
+
+# Порог сходства: типичные опечатки в одну-две буквы дают 0.45-0.7
+FUZZY_THRESHOLD = 0.45
+
+# Максимальное число штаммов в результате поиска по индексу в памяти (после
+# остальных фильтров запроса)
+FUZZY_LIMIT = 500
+
+# Совпадений на один запрос проверки фильтров (SQLite ограничивает число
+# параметров запроса)
+FUZZY_BATCH_SIZE = 500
+
+# Выражение GIN-индекса pg_trgm; в запросе должно совпадать с индексом
+TAXON_EXPRESSION = "({table}.scientific_name || ' ' || {table}.genus || ' ' || {table}.species)"
+
+WORD_RE = re.compile(r'[^\W_]+')
+
+
+def taxon_words(text):
+    return WORD_RE.findall(text.lower())
+
+
+def word_trigrams(word):
+    """Триграммы слова с дополнением пробелами, как в pg_trgm"""
+    padded = f'  {word} '
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+class TrigramIndex:
+    """
+    Инвертированный индекс триграмма -> слова названий.
+
+    Каждое слово запроса должно быть похоже (сходство Жаккара по триграммам
+    не ниже порога) на какое-либо слово названия штамма; итоговое сходство -
+    среднее по словам запроса с весом по числу их триграмм.
+    """
+
+    def __init__(self, entries):
+        self.word_trigrams = {}
+        self.postings = defaultdict(set)
+        self.owners = defaultdict(set)
+        for pk, text in entries:
+            for word in taxon_words(text):
+                self.owners[word].add(pk)
+                if word not in self.word_trigrams:
+                    trigrams = word_trigrams(word)
+                    self.word_trigrams[word] = trigrams
+                    for trigram in trigrams:
+                        self.postings[trigram].add(word)
+
+    def search(self, query, threshold=FUZZY_THRESHOLD, limit=None):
+        """Список (pk, сходство) по убыванию сходства (первые limit, если задан)"""
+        words = set(taxon_words(query))
+        total_weight = 0
+        scores = defaultdict(float)
+        matched_words = Counter()
+        for word in words:
+            query_trigrams = word_trigrams(word)
+            total_weight += len(query_trigrams)
+
+            shared = Counter()
+            for trigram in query_trigrams:
+                shared.update(self.postings.get(trigram, ()))
+
+            best = {}
+            for candidate, common in shared.items():
+                similarity = common / (
+                    len(query_trigrams) + len(self.word_trigrams[candidate]) - common
+                )
+                if similarity < threshold:
+                    continue
+                for pk in self.owners[candidate]:
+                    if similarity > best.get(pk, 0):
+                        best[pk] = similarity
+            for pk, similarity in best.items():
+                scores[pk] += similarity * len(query_trigrams)
+                matched_words[pk] += 1
+
+        results = [
+            (pk, round(score / total_weight, 4))
+            for pk, score in scores.items()
+            if matched_words[pk] == len(words)
+        ]
+        results.sort(key=lambda item: -item[1])
+        return results[:limit]
+
+
+_index = None
+_index_version = None
+_index_lock = threading.Lock()
+
+
+def get_trigram_index():
+    """Индекс в памяти процесса, актуальный для текущей версии данных"""
+    global _index, _index_version
+    version = get_version(STRAINS)
+    if _index is None or _index_version != version:
+        with _index_lock:
+            if _index is None or _index_version != version:
+                rows = Strain.objects.values_list(
+                    'pk', 'scientific_name', 'genus', 'species'
+                ).iterator(chunk_size=2000)
+                _index = TrigramIndex(
+                    (pk, ' '.join((name, genus, species)))
+                    for pk, name, genus, species in rows
+                )
+                _index_version = version
+    return _index
+
+
+def fuzzy_search(queryset, query):
+    """
+    Отбирает штаммы с названиями, похожими на query, и аннотирует их
+    сходством (``fuzzy_similarity``). Порядок не меняется.
+    """
+    query = query.strip()
+    vendor = connections[queryset.db].vendor
+
+    if vendor == 'postgresql':
+        expression = TAXON_EXPRESSION.format(table=queryset.model._meta.db_table)
+        return queryset.filter(
+            RawSQL(f"%s <%% {expression}", (query,), output_field=BooleanField())
+        ).annotate(**{
+            FUZZY_ANNOTATION: RawSQL(
+                f"word_similarity(%s, {expression})", (query,), output_field=FloatField()
+            )
+        })
+
+    ranked = get_trigram_index().search(query)
+    matches = dict(ranked)
+    # Лимит применяется к совпадениям, прошедшим остальные фильтры queryset:
+    # глобальные первые FUZZY_LIMIT могли бы не содержать ни одного из них.
+    # Совпадения проверяются частями в порядке убывания сходства, пока не
+    # наберется FUZZY_LIMIT штаммов (число параметров запроса ограничено)
+    top = []
+    for offset in range(0, len(ranked), FUZZY_BATCH_SIZE):
+        batch = [pk for pk, _ in ranked[offset:offset + FUZZY_BATCH_SIZE]]
+        found = set(queryset.filter(pk__in=batch).order_by().values_list('pk', flat=True))
+        top.extend(pk for pk in batch if pk in found)
+        if len(top) >= FUZZY_LIMIT:
+            break
+    top = top[:FUZZY_LIMIT]
+    if not top:
+        return queryset.none()
+    # Одна ветвь CASE на значение сходства, а не на штамм
+    by_similarity = defaultdict(list)
+    for pk in top:
+        by_similarity[matches[pk]].append(pk)
+    return queryset.filter(pk__in=top).annotate(**{
+        FUZZY_ANNOTATION: Case(
+            *[
+                When(pk__in=pks, then=Value(similarity))
+                for similarity, pks in by_similarity.items()
+            ],
+            default=Value(0.0),
+            output_field=FloatField()
+        )
+    })
@@ -0,0 +1,149 @@
+"""
+Штаммы на карте: кластеры по геохешу и отдельные точки.
+
+До ``GEO_CLUSTER_MAX_ZOOM`` штаммы в области карты группируются по
+префиксу ``Strain.geohash`` одним запросом с GROUP BY: ответ содержит по
+кластеру на ячейку (число штаммов, центр, преобладающая среда обитания,
+число экстремофилов каждого типа). Длина префикса выбирается по масштабу
+и уменьшается, если ячеек в области больше ``GEO_MAX_CLUSTERS``. На более
+крупных масштабах отдаются точки GeoJSON, но не больше
+``GEO_MAX_FEATURES`` - иначе снова кластеры. Размер ответа ограничен
+независимо от числа штаммов с координатами.
+"""
+import math
+
+from django.db.models import Count, FloatField, Q, Sum
+from django.db.models.functions import Cos, Radians, Sin, Substr
+from rest_framework.exceptions import ValidationError
+
+from .geohash import GEOHASH_LENGTH, cell_size
+from .models import Strain
+from .statistics import EXTREMOPHILE_FACET
+
+
+GEO_CLUSTER_MAX_ZOOM = 12
+GEO_MAX_ZOOM = 20
+GEO_MAX_CLUSTERS = 256
+GEO_MAX_FEATURES = 500
+
+WORLD_BBOX = (-180.0, -90.0, 180.0, 90.0)
+
+HABITAT_LABELS = dict(Strain.HABITAT_TYPES)
+HABITAT_ORDER = {code: index for index, (code, label) in enumerate(Strain.HABITAT_TYPES)}
+
+
+def parse_bbox(value):
+    """
+    ?bbox=запад,юг,восток,север (градусы). Запад больше востока - область
+    пересекает 180-й меридиан.
+    """
+    if not value:
+        return WORLD_BBOX
+    try:
+        west, south, east, north = (float(part) for part in value.split(','))
+    except ValueError:
+        raise ValidationError({'bbox': 'Ожидается запад,юг,восток,север в градусах'})
+    if not (-180 <= west <= 180 and -180 <= east <= 180 and -90 <= south < north <= 90):
+        raise ValidationError({'bbox': 'Координаты вне допустимого диапазона'})
+    return west, south, east, north
+
+
+def parse_zoom(value):
+    if value in (None, ''):
+        return 0
+    try:
+        zoom = int(value)
+    except ValueError:
+        zoom = -1
+    if not 0 <= zoom <= GEO_MAX_ZOOM:
+        raise ValidationError({'zoom': f'Ожидается целое число от 0 до {GEO_MAX_ZOOM}'})
+    return zoom
+
+
+def bbox_filter(bbox):
+    west, south, east, north = bbox
+    condition = Q(latitude__gte=south, latitude__lte=north)
+    if west <= east:
+        return condition & Q(longitude__gte=west, longitude__lte=east)
+    return condition & (Q(longitude__gte=west) | Q(longitude__lte=east))
+
+
+def bbox_width(bbox):
+    west, south, east, north = bbox
+    return east - west if west <= east else east - west + 360
+
+
+def cluster_precision(zoom, bbox):
+    """
+    Длина префикса геохеша: ячейка - около восьмой части тайла карты
+    (1 при zoom 0, 6 при zoom 12), но не больше GEO_MAX_CLUSTERS ячеек в bbox.
+    """
+    precision = min(GEOHASH_LENGTH, 1 + (5 * zoom + 6) // 12)
+    while precision > 1:
+        width, height = cell_size(precision)
+        cells = (math.ceil(bbox_width(bbox) / width) + 1) * (math.ceil((bbox[3] - bbox[1]) / height) + 1)
+        if cells <= GEO_MAX_CLUSTERS:
+            break
+        precision -= 1
+    return precision
+
+
+def strain_clusters(queryset, precision):
+    """Кластеры GeoJSON по префиксу геохеша длины precision (один запрос)"""
+    rows = queryset.order_by().exclude(geohash='').annotate(
+        cell=Substr('geohash', 1, precision)
+    ).values('cell', 'habitat_type').annotate(
+        count=Count('pk'),
+        latitude_sum=Sum('latitude'),
+        # Средняя долгота - направление суммы единичных векторов: у точек по
+        # обе стороны 180-го меридиана центр не уходит к нулевому
+        longitude_sin=Sum(Sin(Radians('longitude')), output_field=FloatField()),
+        longitude_cos=Sum(Cos(Radians('longitude')), output_field=FloatField()),
+        **{
+            f'extremophile_{value}': Count('pk', filter=Q(**{field: True}))
+            for value, field, label in EXTREMOPHILE_FACET
+        }
+    )
+
+    cells = {}
+    for row in rows:
+        cell = cells.setdefault(row['cell'], {
+            'count': 0, 'latitude_sum': 0, 'longitude_sin': 0.0, 'longitude_cos': 0.0,
+            'habitats': {},
+            'extremophiles': {value: 0 for value, field, label in EXTREMOPHILE_FACET},
+        })
+        cell['count'] += row['count']
+        cell['latitude_sum'] += row['latitude_sum']
+        cell['longitude_sin'] += row['longitude_sin']
+        cell['longitude_cos'] += row['longitude_cos']
+        cell['habitats'][row['habitat_type']] = row['count']
+        for value in cell['extremophiles']:
+            cell['extremophiles'][value] += row[f'extremophile_{value}']
+
+    features = []
+    for geohash, cell in sorted(cells.items()):
+        count = cell['count']
+        # При равенстве - первая по порядку HABITAT_TYPES среда
+        habitats = cell['habitats']
+        dominant = min(habitats, key=lambda habitat: (
+            -habitats[habitat], HABITAT_ORDER.get(habitat, len(HABITAT_ORDER))
+        ))
+        features.append({
+            'type': 'Feature',
+            'properties': {
+                'cluster': True,
+                'geohash': geohash,
+                'count': count,
+                'dominant_habitat': dominant,
+                'dominant_habitat_display': HABITAT_LABELS.get(dominant, dominant),
+                'extremophiles': cell['extremophiles'],
+            },
+            'geometry': {
+                'type': 'Point',
+                'coordinates': [
+                    round(math.degrees(math.atan2(cell['longitude_sin'], cell['longitude_cos'])), 6),
+                    round(float(cell['latitude_sum']) / count, 6),
+                ],
+            },
+        })
+    return features
@@ -0,0 +1,45 @@
+"""
+Геохеш координат штаммов.
+
+Геохеш длины n - ячейка сетки, вложенная в ячейку своего префикса длины
+n - 1, поэтому группировка по префиксу ``Strain.geohash`` дает кластеры
+для любого масштаба карты без пересчета координат.
+"""
+GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+# Длина хранимого геохеша: ячейка около 38 x 19 м
+GEOHASH_LENGTH = 8
+
+
+def encode_geohash(latitude, longitude, length=GEOHASH_LENGTH):
+    """Геохеш точки (широта и долгота в градусах)"""
+    latitude, longitude = float(latitude), float(longitude)
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    result = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(result) < length:
+        # Биты долготы и широты чередуются, начиная с долготы
+        value, bounds = (longitude, lon_range) if even else (latitude, lat_range)
+        middle = (bounds[0] + bounds[1]) / 2
+        if value >= middle:
+            bits = (bits << 1) | 1
+            bounds[0] = middle
+        else:
+            bits <<= 1
+            bounds[1] = middle
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            result.append(GEOHASH_ALPHABET[bits])
+            bits = 0
+            bit_count = 0
+    return ''.join(result)
+
+
+def cell_size(length):
+    """Размер ячейки геохеша длины length: (градусы долготы, градусы широты)"""
+    lon_bits = (5 * length + 1) // 2
+    lat_bits = 5 * length // 2
+    return 360.0 / 2 ** lon_bits, 180.0 / 2 ** lat_bits
@@ -0,0 +1,291 @@
+"""
+Кэш первого уровня (L1) в памяти процесса перед общим кэшем Django (L2).
+
+Даже с общим Redis каждое попадание - это сетевой запрос и распаковка
+pickle. Небольшие часто читаемые значения (версии данных, список
+коллекций, статистика, справочники) хранятся в LRU-кэше процесса с
+ограничением размера и времени жизни.
+
+Большинство ключей версионированы (содержат версию данных) и не меняются,
+поэтому их не нужно инвалидировать. Сами версии меняются: ``invalidate()``
+удаляет ключи в текущем процессе и рассылает сообщение остальным процессам
+через Redis pub/sub (при заданном REDIS_URL) или, без Redis, через
+датаграммы Unix-сокетов процессов одного сервера. Потерянное сообщение
+(разрыв соединения, переполненный буфер) ограничено временем жизни L1.
+
+Сообщения принимают только процессы сервера: ``start_listener()``
+вызывается в wsgi.py и asgi.py. В остальных процессах (manage.py migrate,
+shell, команды) неверсионированные ключи читаются из L2 напрямую, а
+``invalidate()`` только рассылает сообщения.
+"""
+import atexit
+import glob
+import hashlib
+import logging
+import os
+import socket
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+
+logger = logging.getLogger(__name__)
+
+MISSING = object()
+
+INVALIDATION_CHANNEL = 'catalog:l1:invalidate'
+
+MAX_MESSAGE_SIZE = 65536
+
+RECONNECT_DELAY = 1.0
+
+
+class LocalLRUCache:
+    """
+    LRU-кэш с временем жизни записей. Потокобезопасен: gunicorn может
+    запускать несколько потоков в процессе.
+    """
+
+    def __init__(self, max_entries, timeout):
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        # Увеличивается при каждой инвалидации (см. set)
+        self.generation = 0
+
+    def get(self, key, default=None):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return default
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self.entries[key]
+                return default
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, generation=None):
+        """
+        generation - значение self.generation до чтения value из L2: если с
+        тех пор была инвалидация, value мог устареть и не сохраняется.
+        """
+        if self.max_entries <= 0:
+            return
+        with self.lock:
+            if generation is not None and generation != self.generation:
+                return
+            self.entries[key] = (value, time.monotonic() + self.timeout)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def delete_many(self, keys):
+        with self.lock:
+            self.generation += 1
+            for key in keys:
+                self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.generation += 1
+            self.entries.clear()
+
+
+local_cache = LocalLRUCache(
+    getattr(settings, 'CATALOG_L1_CACHE_MAX_ENTRIES', 512),
+    getattr(settings, 'CATALOG_L1_CACHE_TIMEOUT', 30),
+)
+
+
+def encode_keys(keys):
+    return '\n'.join(keys).encode('utf-8')
+
+
+def decode_keys(data):
+    return data.decode('utf-8').split('\n')
+
+
+class RedisTransport:
+    """Сообщения об инвалидации через Redis pub/sub"""
+
+    def __init__(self, url):
+        import redis
+
+        self.redis = redis
+        self.client = redis.Redis.from_url(url)
+
+    def publish(self, keys):
+        self.client.publish(INVALIDATION_CHANNEL, encode_keys(keys))
+
+    def start(self, handle):
+        threading.Thread(target=self.listen, args=(handle,), daemon=True).start()
+
+    def listen(self, handle):
+        while True:
+            try:
+                pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(INVALIDATION_CHANNEL)
+                # Сообщения, отправленные до подписки, потеряны
+                local_cache.clear()
+                for message in pubsub.listen():
+                    handle(decode_keys(message['data']))
+            except self.redis.RedisError as exc:
+                logger.warning('L1 cache: Redis pub/sub недоступен: %s', exc)
+                time.sleep(RECONNECT_DELAY)
+
+
+class SocketTransport:
+    """
+    Замена pub/sub без Redis: каждый процесс слушает свой Unix-сокет в общем
+    каталоге, сообщение отправляется во все сокеты каталога.
+    """
+
+    def __init__(self, directory, name=None):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.path = os.path.join(directory, f'{name or os.getpid()}.sock')
+        self.sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        # Процесс, который не успевает читать сообщения, не блокирует запись
+        self.sender.setblocking(False)
+
+    def publish(self, keys):
+        data = encode_keys(keys)
+        for path in glob.glob(os.path.join(self.directory, '*.sock')):
+            if path == self.path:
+                continue
+            try:
+                self.sender.sendto(data, path)
+            except (ConnectionRefusedError, FileNotFoundError):
+                # Процесс завершился, не удалив свой сокет
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+            except OSError as exc:
+                logger.warning('L1 cache: сообщение в %s не отправлено: %s', path, exc)
+
+    def start(self, handle):
+        # Сокет создается до запуска потока: сообщения после start() не теряются
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        receiver = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        receiver.bind(self.path)
+        atexit.register(self.close)
+        threading.Thread(target=self.listen, args=(receiver, handle), daemon=True).start()
+
+    def listen(self, receiver, handle):
+        while True:
+            handle(decode_keys(receiver.recv(MAX_MESSAGE_SIZE)))
+
+    def close(self):
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+
+def socket_directory():
+    default = os.path.join(
+        tempfile.gettempdir(),
+        'sifibr-l1-' + hashlib.sha1(str(settings.BASE_DIR).encode('utf-8')).hexdigest()[:8]
+    )
+    return getattr(settings, 'CATALOG_L1_SOCKET_DIR', default)
+
+
+def create_transport():
+    redis_url = getattr(settings, 'REDIS_URL', None)
+    if redis_url:
+        return RedisTransport(redis_url)
+    if hasattr(socket, 'AF_UNIX'):
+        return SocketTransport(socket_directory())
+    return None
+
+
+transport = None
+transport_pid = None
+transport_lock = threading.Lock()
+listener_pid = None
+listener_lock = threading.Lock()
+
+
+def get_transport():
+    """Транспорт сообщений об инвалидации этого процесса (без приема)"""
+    global transport, transport_pid
+    if transport_pid != os.getpid():
+        with transport_lock:
+            if transport_pid != os.getpid():
+                transport = create_transport()
+                transport_pid = os.getpid()
+    return transport
+
+
+def start_listener():
+    """
+    Включает L1 для неверсионированных ключей и прием сообщений об
+    инвалидации (один раз в каждом процессе сервера)
+    """
+    global listener_pid
+    with listener_lock:
+        if listener_pid == os.getpid():
+            return
+        # После fork L1 унаследован от родительского процесса
+        local_cache.clear()
+        current = get_transport()
+        if current is not None:
+            current.start(local_cache.delete_many)
+        listener_pid = os.getpid()
+
+
+def listening():
+    return listener_pid == os.getpid()
+
+
+def get_local(key, load):
+    """Значение из L1; при промахе - load() (чтение из L2). None не кэшируется"""
+    if not listening():
+        return load()
+    value = local_cache.get(key, MISSING)
+    if value is MISSING:
+        generation = local_cache.generation
+        value = load()
+        if value is not None:
+            local_cache.set(key, value, generation)
+    return value
+
+
+def get_many_local(keys, load_many):
+    """Несколько значений из L1; отсутствующие - одним вызовом load_many(keys)"""
+    if not listening():
+        return load_many(keys)
+    found = {}
+    missing = []
+    for key in keys:
+        value = local_cache.get(key, MISSING)
+        if value is MISSING:
+            missing.append(key)
+        else:
+            found[key] = value
+    if missing:
+        generation = local_cache.generation
+        for key, value in load_many(missing).items():
+            local_cache.set(key, value, generation)
+            found[key] = value
+    return found
+
+
+def invalidate(keys):
+    """Удаляет ключи из L1 этого процесса и рассылает сообщение остальным"""
+    local_cache.delete_many(keys)
+    current = get_transport()
+    if current is None:
+        return
+    try:
+        current.publish(keys)
+    except Exception as exc:
+        # Остальные процессы увидят изменение не позже времени жизни L1
+        logger.warning('L1 cache: инвалидация не разослана: %s', exc)
@@ -0,0 +1,75 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from catalog.exports import STRAIN_EXPORT_FIELDS, iterate_rows, strain_export_record
+from catalog.models import Strain
+from catalog.renderers import ORJSONRenderer, dumps, orjson
+
+
+def best_time(function, repeat):
+    """Лучшее время из repeat запусков function (секунды)"""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает JSONRenderer DRF и ORJSONRenderer на ответах /api/strains/ и /api/export/json/'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--page-size',
+            type=int,
+            default=500,
+            help='Размер страницы /api/strains/ (по умолчанию 500)',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=20,
+            help='Число повторов, берется лучшее время (по умолчанию 20)',
+        )
+
+    def report(self, title, size, baseline, optimized):
+        self.stdout.write(self.style.MIGRATE_HEADING(f'{title} ({size} байт)'))
+        self.stdout.write(f'  json (DRF)  {baseline * 1000:8.2f} мс')
+        self.stdout.write(f'  orjson      {optimized * 1000:8.2f} мс  (x{baseline / optimized:.1f})')
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            raise CommandError('orjson не установлен: ORJSONRenderer использует стандартный json')
+        repeat = options['repeat']
+        client = APIClient(SERVER_NAME='localhost')
+
+        for params in ({'page_size': options['page_size']},
+                       {'page_size': options['page_size'], 'exclude': 'description'}):
+            response = client.get('/api/strains/', params)
+            if response.status_code != 200:
+                raise CommandError(f'/api/strains/: статус {response.status_code}')
+            data = response.data
+            content = ORJSONRenderer().render(data)
+            if content != JSONRenderer().render(data):
+                raise CommandError('ORJSONRenderer: вывод отличается от JSONRenderer')
+            query = '&'.join(f'{key}={value}' for key, value in params.items())
+            self.report(
+                f'GET /api/strains/?{query}', len(content),
+                best_time(lambda: JSONRenderer().render(data), repeat),
+                best_time(lambda: ORJSONRenderer().render(data), repeat),
+            )
+
+        queryset = Strain.objects.filter(is_available=True)
+        records = [strain_export_record(row) for row in iterate_rows(queryset, STRAIN_EXPORT_FIELDS)]
+        self.report(
+            f'GET /api/export/json/ ({len(records)} записей)', len(dumps(records)),
+            best_time(lambda: [json.dumps(record, cls=DjangoJSONEncoder) for record in records], repeat),
+            best_time(lambda: [dumps(record) for record in records], repeat),
+        )
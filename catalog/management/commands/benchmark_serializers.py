@@ -0,0 +1,83 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from catalog.fast_serializers import compile_serializer
+from catalog.models import Strain
+from catalog.serializers import StrainListSerializer, StrainSearchSerializer
+
+
+SERIALIZERS = [StrainListSerializer, StrainSearchSerializer]
+
+
+def best_time(function, repeat):
+    """Лучшее время из repeat запусков function (секунды)"""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает стоимость строки сериализаторов DRF и FastSerializer для списков штаммов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=500,
+            help='Число штаммов в выборке (по умолчанию 500)',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Число повторов, берется лучшее время (по умолчанию 5)',
+        )
+
+    def handle(self, *args, **options):
+        queryset = Strain.objects.filter(is_available=True).select_related(
+            'collection'
+        ).order_by('collection_code', 'strain_number')[:options['rows']]
+        instances = list(queryset)
+        if not instances:
+            raise CommandError('Нет доступных штаммов для замера')
+        count = len(instances)
+        renderer = JSONRenderer()
+
+        for serializer_class in SERIALIZERS:
+            fast = compile_serializer(serializer_class)
+            rows = list(fast.rows(queryset))
+
+            drf_json = renderer.render(serializer_class(instances, many=True).data)
+            fast_json = renderer.render(fast.serialize(rows))
+            if drf_json != fast_json:
+                raise CommandError(f'{serializer_class.__name__}: JSON не совпадает с DRF')
+
+            timings = [
+                ('DRF, сериализация', best_time(
+                    lambda: serializer_class(instances, many=True).data, options['repeat']
+                )),
+                ('Fast, сериализация', best_time(
+                    lambda: fast.serialize(rows), options['repeat']
+                )),
+                ('DRF, запрос + сериализация', best_time(
+                    lambda: serializer_class(list(queryset.all()), many=True).data,
+                    options['repeat']
+                )),
+                ('Fast, запрос + сериализация', best_time(
+                    lambda: fast.serialize(fast.rows(queryset.all())), options['repeat']
+                )),
+            ]
+
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f'{serializer_class.__name__}: {count} строк, JSON совпадает ({len(drf_json)} байт)'
+            ))
+            for title, elapsed in timings:
+                self.stdout.write(f'  {title:<30} {elapsed * 1e6 / count:8.1f} мкс/строка')
+            speedup = timings[0][1] / timings[1][1]
+            self.stdout.write(f'  Ускорение сериализации: x{speedup:.1f}')
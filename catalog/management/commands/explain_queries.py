@@ -0,0 +1,81 @@
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from rest_framework.request import Request
+
+from catalog.filters import StrainFilter
+from catalog.models import Collection, Strain
+from catalog.views import AdvancedSearchAPIView, GenomeSequenceViewSet, StrainViewSet
+
+
+def view_queryset(view_class, params=None, action='list'):
+    """Queryset, который представление DRF строит для GET-запроса с params"""
+    request = Request(RequestFactory().get('/', params or {}))
+    view = view_class(action=action, format_kwarg=None, kwargs={}, args=(), request=request)
+    queryset = view.filter_queryset(view.get_queryset())
+    page_size = view.paginator.get_page_size(view.request) if view.paginator else None
+    return queryset[:page_size] if page_size else queryset
+
+
+def endpoint_queries():
+    """(описание, queryset) для основных запросов встроенных эндпоинтов"""
+    strain = Strain.objects.filter(is_available=True).only('genus', 'collection').first()
+    genus = strain.genus if strain else 'Pseudomonas'
+    collection = Collection.objects.filter(is_active=True).first()
+
+    queries = [
+        ('GET /api/strains/', view_queryset(StrainViewSet)),
+        ('GET /api/strains/?ordering=scientific_name',
+         view_queryset(StrainViewSet, {'ordering': 'scientific_name'})),
+        ('GET /api/strains/?is_extremophile=true',
+         view_queryset(StrainViewSet, {'is_extremophile': 'true'})),
+        ('GET /api/strains/?extremophile_types=psychrophile&extremophile_types=barophile',
+         view_queryset(StrainViewSet, {'extremophile_types': ['psychrophile', 'barophile']})),
+        ('GET /api/strains/?has_biotech_potential=true',
+         view_queryset(StrainViewSet, {'has_biotech_potential': 'true'})),
+        (f'GET /api/strains/?search={genus}',
+         view_queryset(StrainViewSet, {'search': genus})),
+        (f'GET /api/strains/?genus={genus}',
+         view_queryset(StrainViewSet, {'genus': genus})),
+        (f'GET /api/search/?search={genus}',
+         view_queryset(AdvancedSearchAPIView, {'search': genus})),
+        ('GET /api/genome-sequences/', view_queryset(GenomeSequenceViewSet)),
+        ('GET /api/export/csv/',
+         StrainFilter({}, queryset=Strain.objects.filter(is_available=True)).qs.values_list(
+             'collection_code', 'strain_number', 'scientific_name'
+         )),
+        ('GET /api/strains/?facets=organism_type,habitat_type,collection',
+         Strain.objects.filter(is_available=True).order_by().values(
+             'organism_type', 'habitat_type', 'collection'
+         ).distinct()),
+    ]
+    if collection is not None:
+        queries.append((
+            f'GET /api/collections/{collection.pk}/strains/',
+            collection.strains.filter(is_available=True).order_by('strain_number')[:50]
+        ))
+    return queries
+
+
+class Command(BaseCommand):
+    help = 'Печатает EXPLAIN для запросов встроенных эндпоинтов API (проверка использования индексов)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--analyze',
+            action='store_true',
+            help='Выполнить EXPLAIN ANALYZE (только PostgreSQL)',
+        )
+        parser.add_argument(
+            '--sql',
+            action='store_true',
+            help='Печатать также текст SQL-запроса',
+        )
+
+    def handle(self, *args, **options):
+        explain_options = {'analyze': True} if options['analyze'] else {}
+        for title, queryset in endpoint_queries():
+            self.stdout.write(self.style.MIGRATE_HEADING(title))
+            if options['sql']:
+                self.stdout.write(str(queryset.query))
+            self.stdout.write(queryset.explain(**explain_options))
+            self.stdout.write('')
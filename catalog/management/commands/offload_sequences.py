@@ -0,0 +1,56 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from catalog.models import GenomeSequence
+
+
+class Command(BaseCommand):
+    help = 'Переносит GenomeSequence.sequence_data из таблицы во внешнее хранилище последовательностей'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=20,
+            help='Количество записей, загружаемых из БД за один раз',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать, сколько записей будет перенесено',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        pending = GenomeSequence.objects.exclude(sequence_data='')
+        ids = list(pending.order_by('pk').values_list('pk', flat=True))
+
+        self.stdout.write(f'Записей с данными в таблице: {len(ids)}')
+        if options['dry_run'] or not ids:
+            return
+        # Как и GenomeSequence.save(): без постоянного хранилища данные
+        # остаются в БД
+        if not getattr(settings, 'SEQUENCE_STORE_OFFLOAD', False):
+            raise CommandError(
+                'SEQUENCE_STORE_OFFLOAD выключен: задайте SEQUENCE_STORE_ROOT '
+                'или SEQUENCE_STORE_OFFLOAD=True'
+            )
+
+        moved = 0
+        for offset in range(0, len(ids), batch_size):
+            batch = GenomeSequence.objects.filter(
+                pk__in=ids[offset:offset + batch_size]
+            ).only('pk', 'sequence_data')
+            for sequence in batch:
+                sequence.offload_sequence()
+                # update() не трогает updated_at и не вызывает сигналы
+                GenomeSequence.objects.filter(pk=sequence.pk).update(
+                    sequence_data='',
+                    sequence_handle=sequence.sequence_handle,
+                    stored_length=sequence.stored_length,
+                    sequence_checksum=sequence.sequence_checksum,
+                )
+                moved += 1
+            self.stdout.write(f'  Перенесено {moved} из {len(ids)}')
+
+        self.stdout.write(self.style.SUCCESS(f'✅ Перенесено последовательностей: {moved}'))
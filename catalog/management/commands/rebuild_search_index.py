@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from catalog.fulltext import rebuild_search_documents
+
+
+class Command(BaseCommand):
+    help = 'Пересоздает поисковые документы штаммов (полнотекстовый индекс)'
+
+    def handle(self, *args, **options):
+        self.stdout.write('Обновление поисковых документов штаммов...')
+        count = rebuild_search_documents()
+        self.stdout.write(self.style.SUCCESS(f'✅ Обновлено документов: {count}'))
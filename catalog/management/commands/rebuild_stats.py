@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from catalog.statistics import rebuild_stats_snapshot
+from catalog.versions import STRAINS, bump_version_on_commit
+
+
+class Command(BaseCommand):
+    help = 'Полностью пересчитывает снимок статистики каталога (CatalogStatsSnapshot)'
+
+    def handle(self, *args, **options):
+        self.stdout.write('Пересчет статистики каталога...')
+        snapshot = rebuild_stats_snapshot()
+        # Кэшированная статистика (cached_stats) устаревает
+        bump_version_on_commit(STRAINS)
+        stats = snapshot.as_stats()
+
+        self.stdout.write(f"  Коллекций: {stats['total_collections']}")
+        self.stdout.write(f"  Штаммов: {stats['total_strains']}")
+        self.stdout.write(f"  Экстремофилов: {stats['total_extremophiles']}")
+        self.stdout.write(f"  Байкальских штаммов: {stats['baikal_strains']}")
+        self.stdout.write(self.style.SUCCESS('✅ Снимок статистики обновлен'))
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.8 on 2026-10-18 06:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogStatsSnapshot',
+            fields=[
+                ('id', models.PositiveSmallIntegerField(default=1, editable=False, primary_key=True, serialize=False)),
+                ('total_collections', models.IntegerField(default=0, verbose_name='Активных коллекций')),
+                ('total_strains', models.IntegerField(default=0, verbose_name='Доступных штаммов')),
+                ('total_extremophiles', models.IntegerField(default=0, verbose_name='Экстремофилов')),
+                ('baikal_strains', models.IntegerField(default=0, verbose_name='Байкальских штаммов')),
+                ('biotech_potential', models.IntegerField(default=0, verbose_name='С биотех потенциалом')),
+                ('genome_sequenced', models.IntegerField(default=0, verbose_name='С секвенированным геномом')),
+                ('genome_size_sum', models.BigIntegerField(default=0)),
+                ('genome_size_count', models.IntegerField(default=0)),
+                ('gc_content_sum', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('gc_content_count', models.IntegerField(default=0)),
+                ('extremophiles', models.JSONField(default=dict, verbose_name='Экстремофилы по типам')),
+                ('biotechnology', models.JSONField(default=dict, verbose_name='Биотех потенциал по типам')),
+                ('organism_counts', models.JSONField(default=dict, verbose_name='По типам организмов')),
+                ('habitat_counts', models.JSONField(default=dict, verbose_name='По средам обитания')),
+                ('collection_counts', models.JSONField(default=dict, verbose_name='По коллекциям')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Снимок статистики',
+                'verbose_name_plural': 'Снимки статистики',
+            },
+        ),
+    ]
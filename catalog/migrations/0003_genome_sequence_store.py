@@ -0,0 +1,33 @@
+# Generated by Django 4.2.8 on 2026-10-18 06:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0002_catalogstatssnapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='genomesequence',
+            name='sequence_checksum',
+            field=models.CharField(blank=True, editable=False, max_length=64, verbose_name='SHA-256 последовательности'),
+        ),
+        migrations.AddField(
+            model_name='genomesequence',
+            name='sequence_handle',
+            field=models.CharField(blank=True, editable=False, max_length=100, verbose_name='Дескриптор в хранилище'),
+        ),
+        migrations.AddField(
+            model_name='genomesequence',
+            name='stored_length',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Длина сохраненной последовательности'),
+        ),
+        migrations.AlterField(
+            model_name='genomesequence',
+            name='sequence_data',
+            field=models.TextField(blank=True, help_text='При сохранении переносится во внешнее хранилище последовательностей', verbose_name='Данные последовательности'),
+        ),
+    ]
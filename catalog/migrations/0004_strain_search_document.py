@@ -0,0 +1,131 @@
+# Generated by Django 4.2.8 on 2026-10-18 06:30
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+POSTGRES_FORWARD = [
+    """
+    ALTER TABLE catalog_strainsearchdocument ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', names), 'A') ||
+        setweight(to_tsvector('simple', identifiers), 'B') ||
+        setweight(to_tsvector('russian', context), 'C') ||
+        setweight(to_tsvector('russian', details), 'D')
+    ) STORED
+    """,
+    "CREATE INDEX catalog_strainsearchdocument_vector_gin"
+    " ON catalog_strainsearchdocument USING GIN (search_vector)",
+]
+
+POSTGRES_BACKWARD = [
+    "DROP INDEX IF EXISTS catalog_strainsearchdocument_vector_gin",
+    "ALTER TABLE catalog_strainsearchdocument DROP COLUMN IF EXISTS search_vector",
+]
+
+# Внешнее содержимое: FTS5 хранит только индекс, текст берется из документа
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE catalog_strain_fts USING fts5(
+        names, identifiers, context, details,
+        content='catalog_strainsearchdocument',
+        content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER catalog_strain_fts_insert AFTER INSERT ON catalog_strainsearchdocument
+    BEGIN
+        INSERT INTO catalog_strain_fts(rowid, names, identifiers, context, details)
+        VALUES (new.id, new.names, new.identifiers, new.context, new.details);
+    END
+    """,
+    """
+    CREATE TRIGGER catalog_strain_fts_delete AFTER DELETE ON catalog_strainsearchdocument
+    BEGIN
+        INSERT INTO catalog_strain_fts(catalog_strain_fts, rowid, names, identifiers, context, details)
+        VALUES ('delete', old.id, old.names, old.identifiers, old.context, old.details);
+    END
+    """,
+    """
+    CREATE TRIGGER catalog_strain_fts_update AFTER UPDATE ON catalog_strainsearchdocument
+    BEGIN
+        INSERT INTO catalog_strain_fts(catalog_strain_fts, rowid, names, identifiers, context, details)
+        VALUES ('delete', old.id, old.names, old.identifiers, old.context, old.details);
+        INSERT INTO catalog_strain_fts(rowid, names, identifiers, context, details)
+        VALUES (new.id, new.names, new.identifiers, new.context, new.details);
+    END
+    """,
+]
+
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS catalog_strain_fts_update",
+    "DROP TRIGGER IF EXISTS catalog_strain_fts_delete",
+    "DROP TRIGGER IF EXISTS catalog_strain_fts_insert",
+    "DROP TABLE IF EXISTS catalog_strain_fts",
+]
+
+
+def run_vendor_sql(statements):
+    def run(apps, schema_editor):
+        for statement in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return run
+
+
+def build_search_documents(apps, schema_editor):
+    """Поисковые документы для уже существующих штаммов"""
+    Strain = apps.get_model('catalog', 'Strain')
+    StrainSearchDocument = apps.get_model('catalog', 'StrainSearchDocument')
+    documents = []
+    for strain in Strain.objects.select_related('collection').iterator(chunk_size=500):
+        collection = strain.collection
+        documents.append(StrainSearchDocument(
+            strain_id=strain.pk,
+            names=' '.join(filter(None, [
+                strain.scientific_name, strain.genus,
+                strain.species, strain.subspecies,
+            ])),
+            identifiers=' '.join(filter(None, [
+                strain.strain_number, strain.alternative_numbers,
+                collection.code, f"{collection.code}-{strain.strain_number}",
+            ])),
+            context=' '.join(filter(None, [
+                strain.isolation_source, strain.geographic_location,
+                collection.name,
+            ])),
+            details=' '.join(filter(None, [
+                strain.description, strain.special_properties,
+            ])),
+        ))
+    StrainSearchDocument.objects.bulk_create(documents, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0003_genome_sequence_store'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StrainSearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('names', models.TextField(blank=True, verbose_name='Названия (вес A)')),
+                ('identifiers', models.TextField(blank=True, verbose_name='Номера (вес B)')),
+                ('context', models.TextField(blank=True, verbose_name='Происхождение (вес C)')),
+                ('details', models.TextField(blank=True, verbose_name='Описание (вес D)')),
+                ('strain', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='search_document', to='catalog.strain', verbose_name='Штамм')),
+            ],
+            options={
+                'verbose_name': 'Поисковый документ штамма',
+                'verbose_name_plural': 'Поисковые документы штаммов',
+            },
+        ),
+        migrations.RunPython(
+            run_vendor_sql({'postgresql': POSTGRES_FORWARD, 'sqlite': SQLITE_FORWARD}),
+            run_vendor_sql({'postgresql': POSTGRES_BACKWARD, 'sqlite': SQLITE_BACKWARD}),
+        ),
+        migrations.RunPython(build_search_documents, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+from django.db import migrations
+
+
+# Выражение должно совпадать с catalog.fuzzy.TAXON_EXPRESSION
+POSTGRES_FORWARD = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS catalog_strain_taxon_trgm ON catalog_strain"
+    " USING GIN ((scientific_name || ' ' || genus || ' ' || species) gin_trgm_ops)",
+]
+
+POSTGRES_BACKWARD = [
+    "DROP INDEX IF EXISTS catalog_strain_taxon_trgm",
+]
+
+
+def run_vendor_sql(statements):
+    def run(apps, schema_editor):
+        for statement in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0004_strain_search_document'),
+    ]
+
+    # Для прочих СУБД используется триграммный индекс в памяти (catalog/fuzzy.py)
+    operations = [
+        migrations.RunPython(
+            run_vendor_sql({'postgresql': POSTGRES_FORWARD}),
+            run_vendor_sql({'postgresql': POSTGRES_BACKWARD}),
+        ),
+    ]
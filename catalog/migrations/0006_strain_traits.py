@@ -0,0 +1,62 @@
+# Generated by Django 4.2.8 on 2026-10-18 06:37
+
+import catalog.models
+from django.db import migrations, models
+from django.db.models import Case, Q, Value, When
+
+
+# Порядок битов совпадает с Strain.TRAIT_FIELDS
+EXTREMOPHILE_FIELDS = [
+    'is_psychrophile', 'is_thermophile', 'is_halophile',
+    'is_acidophile', 'is_alkaliphile', 'is_barophile',
+]
+BIOTECH_FIELDS = [
+    'produces_antibiotics', 'produces_enzymes',
+    'produces_metabolites', 'nitrogen_fixation',
+]
+
+
+def any_flag(fields):
+    condition = Q()
+    for field in fields:
+        condition |= Q(**{field: True})
+    return Case(When(condition, then=Value(True)), default=Value(False))
+
+
+def fill_traits(apps, schema_editor):
+    """traits и производные флаги для существующих штаммов одним UPDATE"""
+    Strain = apps.get_model('catalog', 'Strain')
+    traits = Value(0)
+    for bit, field in enumerate(EXTREMOPHILE_FIELDS + BIOTECH_FIELDS):
+        traits = traits + Case(When(**{field: True}, then=Value(1 << bit)), default=Value(0))
+    Strain.objects.update(
+        traits=traits,
+        is_extremophile=any_flag(EXTREMOPHILE_FIELDS),
+        has_biotech_potential=any_flag(BIOTECH_FIELDS),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0005_strain_taxon_trigram_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='strain',
+            name='has_biotech_potential',
+            field=models.BooleanField(db_index=True, default=False, editable=False, verbose_name='Биотехнологический потенциал'),
+        ),
+        migrations.AddField(
+            model_name='strain',
+            name='is_extremophile',
+            field=models.BooleanField(db_index=True, default=False, editable=False, verbose_name='Экстремофил'),
+        ),
+        migrations.AddField(
+            model_name='strain',
+            name='traits',
+            field=catalog.models.TraitsField(default=0, editable=False, verbose_name='Битовая маска свойств'),
+        ),
+        migrations.RunPython(fill_traits, migrations.RunPython.noop),
+    ]
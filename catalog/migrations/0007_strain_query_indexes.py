@@ -0,0 +1,54 @@
+# Generated by Django 4.2.8 on 2026-10-18 06:39
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+import django.db.models.functions.text
+
+
+def fill_collection_code(apps, schema_editor):
+    """Код коллекции для существующих штаммов одним UPDATE"""
+    Strain = apps.get_model('catalog', 'Strain')
+    Collection = apps.get_model('catalog', 'Collection')
+    Strain.objects.update(collection_code=Subquery(
+        Collection.objects.filter(pk=OuterRef('collection_id')).values('code')[:1]
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0006_strain_traits'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='strain',
+            name='collection_code',
+            field=models.CharField(default='', editable=False, max_length=20, verbose_name='Код коллекции'),
+        ),
+        migrations.RunPython(fill_collection_code, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='strain',
+            index=models.Index(condition=models.Q(('is_available', True)), fields=['collection_code', 'strain_number'], name='strain_available_code_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='strain',
+            index=models.Index(condition=models.Q(('is_available', True)), fields=['scientific_name'], name='strain_available_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='strain',
+            index=models.Index(fields=['collection', 'strain_number'], include=('scientific_name', 'is_available'), name='strain_collection_number_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='strain',
+            index=models.Index(django.db.models.functions.text.Upper('scientific_name'), name='strain_upper_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='strain',
+            index=models.Index(django.db.models.functions.text.Upper('genus'), django.db.models.functions.text.Upper('species'), name='strain_upper_taxon_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='strain',
+            index=models.Index(django.db.models.functions.text.Upper('strain_number'), name='strain_upper_number_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.8 on 2026-10-18 06:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0007_strain_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='genomesequence',
+            index=models.Index(fields=['submission_date', 'id'], name='sequence_keyset_idx'),
+        ),
+    ]
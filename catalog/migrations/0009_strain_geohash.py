@@ -0,0 +1,37 @@
+# Generated by Django 4.2.8 on 2026-10-18 06:59
+
+from django.db import migrations, models
+
+from catalog.geohash import encode_geohash
+
+
+def fill_geohash(apps, schema_editor):
+    """Геохеш для существующих штаммов с координатами"""
+    Strain = apps.get_model('catalog', 'Strain')
+    strains = Strain.objects.filter(latitude__isnull=False, longitude__isnull=False).only(
+        'id', 'latitude', 'longitude'
+    )
+    batch = []
+    for strain in strains.iterator(chunk_size=2000):
+        strain.geohash = encode_geohash(strain.latitude, strain.longitude)
+        batch.append(strain)
+        if len(batch) == 2000:
+            Strain.objects.bulk_update(batch, ['geohash'])
+            batch = []
+    Strain.objects.bulk_update(batch, ['geohash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0008_genome_sequence_keyset_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='strain',
+            name='geohash',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=8, verbose_name='Геохеш координат'),
+        ),
+        migrations.RunPython(fill_geohash, migrations.RunPython.noop),
+    ]
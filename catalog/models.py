@@ -1,9 +1,16 @@
-from django.db import models
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models.functions import Upper
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.urls import reverse
 import uuid
 
+from . import nucleotide_codec
+from .geohash import GEOHASH_LENGTH, encode_geohash
+from .sequence_store import get_sequence_store, normalize_sequence, reverse_complement
+from .versions import STRAINS, bump_version_on_commit
+
 
 class Collection(models.Model):
     """Модель коллекции микроорганизмов СИФИБР"""
@@ -73,9 +80,214 @@ class Collection(models.Model):
         return reverse('catalog:collection_detail', kwargs={'pk': self.pk})
 
 
+class TraitsField(models.PositiveIntegerField):
+    """
+    Битовая маска свойств штамма (см. Strain.TRAIT_FIELDS).
+    
+    Поддерживает фильтры ``traits__has_any=маска`` (установлен хотя бы один
+    бит) и ``traits__has_all=маска`` (установлены все биты), которые
+    компилируются в одно побитовое условие.
+    """
+
+
+@TraitsField.register_lookup
+class HasAnyTraits(models.Lookup):
+    lookup_name = 'has_any'
+    
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'({lhs} & {rhs}) <> 0', lhs_params + rhs_params
+
+
+@TraitsField.register_lookup
+class HasAllTraits(models.Lookup):
+    lookup_name = 'has_all'
+    
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'({lhs} & {rhs}) = {rhs}', lhs_params + rhs_params + rhs_params
+
+
+def traits_mask(fields):
+    """Битовая маска для набора полей-флагов Strain"""
+    mask = 0
+    for field in fields:
+        mask |= 1 << Strain.TRAIT_FIELDS.index(field)
+    return mask
+
+
+# Строк на один запрос при пересчете geohash после update()
+GEOHASH_BATCH_SIZE = 500
+
+
+class StrainQuerySet(models.QuerySet):
+    """
+    QuerySet штаммов, поддерживающий traits, is_extremophile и
+    has_biotech_potential при массовых изменениях флагов.
+    
+    update(), bulk_update() и bulk_create() не вызывают save() и сигналы,
+    поэтому сами поддерживают collection_code и geohash, пересчитывают снимок
+    статистики и увеличивают версию данных штаммов.
+    """
+    
+    def update(self, **kwargs):
+        flags = {field: kwargs[field] for field in Strain.TRAIT_FIELDS if field in kwargs}
+        # Явно переданные traits, collection_code и geohash не пересчитываются
+        if flags and 'traits' not in kwargs:
+            kwargs.update(self.derived_trait_updates(flags))
+        for field in ('collection', 'collection_id'):
+            if field in kwargs and 'collection_code' not in kwargs:
+                collection = getattr(kwargs[field], 'pk', kwargs[field])
+                kwargs['collection_code'] = models.Subquery(
+                    Collection.objects.filter(pk=collection).values('code')[:1]
+                )
+        if 'geohash' in kwargs or not {'latitude', 'longitude'}.intersection(kwargs):
+            rows = super().update(**kwargs)
+        else:
+            # geohash вычисляется в Python: после UPDATE пересчитывается по
+            # новым координатам тех же строк
+            with transaction.atomic(using=self.db):
+                pks = list(self.values_list('pk', flat=True))
+                rows = super().update(**kwargs)
+                self.sync_geohash_rows(pks)
+        self.data_changed(kwargs)
+        return rows
+    
+    update.alters_data = True
+    
+    @staticmethod
+    def data_changed(fields):
+        """Снимок статистики (если затронуты его поля) и версия данных после массового изменения"""
+        from .statistics import STATS_FIELDS, rebuild_stats_snapshot
+        
+        if STATS_FIELDS.intersection(fields):
+            rebuild_stats_snapshot()
+        bump_version_on_commit(STRAINS)
+    
+    @staticmethod
+    def derived_trait_updates(flags):
+        """
+        Выражения для traits и производных флагов в том же UPDATE.
+        
+        flags - новые значения (True/False) части флагов; остальные флаги
+        берутся из строки.
+        """
+        set_mask = traits_mask(field for field, value in flags.items() if value)
+        clear_mask = traits_mask(flags)
+        # Маска не превышает 2**len(TRAIT_FIELDS): сброс битов через вычитание
+        # установленных, чтобы не зависеть от поддержки побитового NOT
+        traits = models.F('traits') - models.F('traits').bitand(clear_mask)
+        if set_mask:
+            traits = traits.bitor(set_mask)
+        
+        updates = {'traits': traits}
+        for derived, group in (
+            ('is_extremophile', Strain.EXTREMOPHILE_FIELDS),
+            ('has_biotech_potential', Strain.BIOTECH_FIELDS),
+        ):
+            if not any(field in flags for field in group):
+                continue
+            if any(flags.get(field) for field in group):
+                updates[derived] = True
+                continue
+            # Новые значения флагов группы ложны: решают остальные флаги строки
+            rest = [field for field in group if field not in flags]
+            if not rest:
+                updates[derived] = False
+                continue
+            updates[derived] = models.Case(
+                models.When(traits__has_any=traits_mask(rest), then=models.Value(True)),
+                default=models.Value(False)
+            )
+        return updates
+    
+    def sync_geohash_rows(self, pks):
+        """Пересчитывает geohash строк pks по их координатам в БД"""
+        strains = models.QuerySet(self.model, using=self.db)
+        for offset in range(0, len(pks), GEOHASH_BATCH_SIZE):
+            objs = list(
+                strains.filter(pk__in=pks[offset:offset + GEOHASH_BATCH_SIZE])
+                .only('latitude', 'longitude')
+            )
+            for obj in objs:
+                obj.sync_geohash()
+            strains.bulk_update(objs, ['geohash'])
+    
+    @staticmethod
+    def sync_collection_codes(objs):
+        """collection_code объектов по их коллекциям (один запрос)"""
+        codes = dict(
+            Collection.objects.filter(pk__in={obj.collection_id for obj in objs})
+            .values_list('pk', 'code')
+        )
+        for obj in objs:
+            obj.collection_code = codes[obj.collection_id]
+    
+    def bulk_update(self, objs, fields, batch_size=None):
+        objs = list(objs)
+        fields = list(fields)
+        if any(field in Strain.TRAIT_FIELDS for field in fields):
+            for obj in objs:
+                obj.sync_traits()
+            fields += [field for field in Strain.DERIVED_TRAIT_FIELDS if field not in fields]
+        if {'collection', 'collection_id'}.intersection(fields) and 'collection_code' not in fields:
+            self.sync_collection_codes(objs)
+            fields.append('collection_code')
+        if {'latitude', 'longitude'}.intersection(fields) and 'geohash' not in fields:
+            for obj in objs:
+                obj.sync_geohash()
+            fields.append('geohash')
+        # Базовый update() по пачкам: снимок статистики пересчитывается один раз
+        rows = models.QuerySet(self.model, using=self.db).bulk_update(
+            objs, fields, batch_size=batch_size
+        )
+        self.data_changed(fields)
+        return rows
+    
+    bulk_update.alters_data = True
+    
+    def bulk_create(self, objs, *args, **kwargs):
+        from .statistics import STATS_FIELDS
+        
+        objs = list(objs)
+        for obj in objs:
+            obj.sync_traits()
+            obj.sync_geohash()
+        self.sync_collection_codes(objs)
+        created = super().bulk_create(objs, *args, **kwargs)
+        self.data_changed(STATS_FIELDS)
+        return created
+    
+    bulk_create.alters_data = True
+
+
 class Strain(models.Model):
     """Модель штамма микроорганизма"""
     
+    # Флаги экстремофильности и биотехнологического потенциала:
+    # (значение фильтров и фасетов, поле флага, название)
+    EXTREMOPHILE_TYPES = [
+        ('psychrophile', 'is_psychrophile', 'Психрофил'),
+        ('thermophile', 'is_thermophile', 'Термофил'),
+        ('halophile', 'is_halophile', 'Галофил'),
+        ('acidophile', 'is_acidophile', 'Ацидофил'),
+        ('alkaliphile', 'is_alkaliphile', 'Алкалифил'),
+        ('barophile', 'is_barophile', 'Барофил'),
+    ]
+    BIOTECH_TYPES = [
+        ('antibiotics', 'produces_antibiotics', 'Антибиотики'),
+        ('enzymes', 'produces_enzymes', 'Ферменты'),
+        ('metabolites', 'produces_metabolites', 'Метаболиты'),
+        ('nitrogen_fixation', 'nitrogen_fixation', 'Азотфиксация'),
+    ]
+    EXTREMOPHILE_FIELDS = [field for _, field, _ in EXTREMOPHILE_TYPES]
+    BIOTECH_FIELDS = [field for _, field, _ in BIOTECH_TYPES]
+    # Порядок задает номера битов в traits: менять только с миграцией данных
+    TRAIT_FIELDS = EXTREMOPHILE_FIELDS + BIOTECH_FIELDS
+    DERIVED_TRAIT_FIELDS = ['traits', 'is_extremophile', 'has_biotech_potential']
+    
     ORGANISM_TYPES = [
         ('bacteria', 'Бактерии'),
         ('archaea', 'Археи'),
@@ -105,6 +317,10 @@ class Strain(models.Model):
         ('other', 'Прочие'),
     ]
     
+    BAIKAL_HABITATS = [
+        'baikal_surface', 'baikal_deep', 'baikal_bottom', 'baikal_coastal'
+    ]
+    
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     collection = models.ForeignKey(
         Collection, 
@@ -112,6 +328,13 @@ class Strain(models.Model):
         related_name='strains',
         verbose_name="Коллекция"
     )
+    # Денормализованный код коллекции: сортировка без JOIN с коллекцией
+    collection_code = models.CharField(
+        max_length=20,
+        default='',
+        editable=False,
+        verbose_name="Код коллекции"
+    )
     
     # Основная идентификация
     strain_number = models.CharField(
@@ -175,6 +398,15 @@ class Strain(models.Model):
         validators=[MinValueValidator(-180), MaxValueValidator(180)],
         verbose_name="Долгота"
     )
+    # Заполняется при сохранении по latitude/longitude (кластеры карты)
+    geohash = models.CharField(
+        max_length=GEOHASH_LENGTH,
+        blank=True,
+        default='',
+        editable=False,
+        db_index=True,
+        verbose_name="Геохеш координат"
+    )
     depth_meters = models.PositiveIntegerField(
         null=True, 
         blank=True,
@@ -291,6 +523,25 @@ class Strain(models.Model):
         verbose_name="Геном секвенирован"
     )
     
+    # Производные поля флагов, поддерживаются в save() и StrainQuerySet
+    traits = TraitsField(
+        default=0,
+        editable=False,
+        verbose_name="Битовая маска свойств"
+    )
+    is_extremophile = models.BooleanField(
+        default=False,
+        editable=False,
+        db_index=True,
+        verbose_name="Экстремофил"
+    )
+    has_biotech_potential = models.BooleanField(
+        default=False,
+        editable=False,
+        db_index=True,
+        verbose_name="Биотехнологический потенциал"
+    )
+    
     # Даты и статус
     isolation_date = models.DateField(
         null=True, 
@@ -324,6 +575,8 @@ class Strain(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = StrainQuerySet.as_manager()
+    
     class Meta:
         verbose_name = "Штамм"
         verbose_name_plural = "Штаммы"
@@ -335,44 +588,153 @@ class Strain(models.Model):
             models.Index(fields=['habitat_type']),
             models.Index(fields=['is_psychrophile']),
             models.Index(fields=['latitude', 'longitude']),
+            # Почти все запросы отбирают is_available=True и сортируют по
+            # коду коллекции и номеру или по научному названию
+            models.Index(
+                fields=['collection_code', 'strain_number'],
+                condition=models.Q(is_available=True),
+                name='strain_available_code_idx'
+            ),
+            models.Index(
+                fields=['scientific_name'],
+                condition=models.Q(is_available=True),
+                name='strain_available_name_idx'
+            ),
+            # Штаммы коллекции по номеру без обращения к таблице
+            # (INCLUDE поддерживается PostgreSQL, в остальных СУБД - обычный
+            # составной индекс)
+            models.Index(
+                fields=['collection', 'strain_number'],
+                include=['scientific_name', 'is_available'],
+                name='strain_collection_number_idx'
+            ),
+            # Регистронезависимые сравнения (iexact, istartswith) в PostgreSQL
+            # компилируются в UPPER(...)
+            models.Index(Upper('scientific_name'), name='strain_upper_name_idx'),
+            models.Index(Upper('genus'), Upper('species'), name='strain_upper_taxon_idx'),
+            models.Index(Upper('strain_number'), name='strain_upper_number_idx'),
         ]
     
     def __str__(self):
         return f"{self.collection.code}-{self.strain_number}: {self.scientific_name}"
     
+    def save(self, *args, **kwargs):
+        self.sync_traits()
+        self.collection_code = self.collection.code
+        self.sync_geohash()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            if update_fields & set(self.TRAIT_FIELDS):
+                update_fields |= set(self.DERIVED_TRAIT_FIELDS)
+            if 'collection' in update_fields:
+                update_fields.add('collection_code')
+            if update_fields & {'latitude', 'longitude'}:
+                update_fields.add('geohash')
+            kwargs['update_fields'] = update_fields
+        super().save(*args, **kwargs)
+    
+    def sync_traits(self):
+        """Пересчитывает traits, is_extremophile и has_biotech_potential по флагам"""
+        self.traits = traits_mask(field for field in self.TRAIT_FIELDS if getattr(self, field))
+        self.is_extremophile = any(getattr(self, field) for field in self.EXTREMOPHILE_FIELDS)
+        self.has_biotech_potential = any(getattr(self, field) for field in self.BIOTECH_FIELDS)
+    
+    def sync_geohash(self):
+        if self.latitude is None or self.longitude is None:
+            self.geohash = ''
+        else:
+            self.geohash = encode_geohash(self.latitude, self.longitude)
+    
     def get_absolute_url(self):
         return reverse('catalog:strain_detail', kwargs={'pk': self.pk})
     
     @property
     def full_name(self):
         """Полное название с коллекцией и номером"""
-        return f"{self.collection.code}-{self.strain_number}"
+        # collection_code заполняется при сохранении; без него - код из коллекции
+        return f"{self.collection_code or self.collection.code}-{self.strain_number}"
     
     @property
     def is_baikal_endemic(self):
         """Проверка на эндемичность для Байкала"""
-        baikal_habitats = [
-            'baikal_surface', 'baikal_deep', 'baikal_bottom', 'baikal_coastal'
-        ]
-        return self.habitat_type in baikal_habitats
+        return self.habitat_type in self.BAIKAL_HABITATS
     
     @property
     def extremophile_types(self):
         """Список типов экстремофильности"""
-        types = []
-        if self.is_psychrophile:
-            types.append('Психрофил')
-        if self.is_thermophile:
-            types.append('Термофил')
-        if self.is_halophile:
-            types.append('Галофил')
-        if self.is_acidophile:
-            types.append('Ацидофил')
-        if self.is_alkaliphile:
-            types.append('Алкалифил')
-        if self.is_barophile:
-            types.append('Барофил')
-        return types
+        return [label for _, field, label in self.EXTREMOPHILE_TYPES if getattr(self, field)]
+
+
+class StrainSearchDocument(models.Model):
+    """
+    Денормализованный поисковый документ штамма.
+    
+    Поля сгруппированы по весу в полнотекстовом поиске (A > B > C > D).
+    По ним строится tsvector с GIN-индексом в PostgreSQL или виртуальная
+    таблица FTS5 в SQLite (см. catalog/fulltext.py и миграцию 0004).
+    Целочисленный первичный ключ документа служит rowid в FTS5
+    (первичный ключ штамма - UUID).
+    """
+    
+    strain = models.OneToOneField(
+        Strain,
+        on_delete=models.CASCADE,
+        related_name='search_document',
+        verbose_name="Штамм"
+    )
+    names = models.TextField(blank=True, verbose_name="Названия (вес A)")
+    identifiers = models.TextField(blank=True, verbose_name="Номера (вес B)")
+    context = models.TextField(blank=True, verbose_name="Происхождение (вес C)")
+    details = models.TextField(blank=True, verbose_name="Описание (вес D)")
+    
+    class Meta:
+        verbose_name = "Поисковый документ штамма"
+        verbose_name_plural = "Поисковые документы штаммов"
+    
+    def __str__(self):
+        return f"Поисковый документ: {self.strain_id}"
+    
+    @staticmethod
+    def build_fields(strain, collection=None):
+        """Значения полей документа для штамма"""
+        collection = collection or strain.collection
+        return {
+            'names': ' '.join(filter(None, [
+                strain.scientific_name, strain.genus,
+                strain.species, strain.subspecies,
+            ])),
+            'identifiers': ' '.join(filter(None, [
+                strain.strain_number, strain.alternative_numbers,
+                collection.code, f"{collection.code}-{strain.strain_number}",
+            ])),
+            'context': ' '.join(filter(None, [
+                strain.isolation_source, strain.geographic_location,
+                collection.name,
+            ])),
+            'details': ' '.join(filter(None, [
+                strain.description, strain.special_properties,
+            ])),
+        }
+    
+    @classmethod
+    def update_for(cls, strain):
+        cls.objects.update_or_create(strain=strain, defaults=cls.build_fields(strain))
+
+
+class GenomeSequenceQuerySet(models.QuerySet):
+    """QuerySet геномных последовательностей"""
+    
+    def without_data(self):
+        """
+        Без колонки sequence_data (для списков); признак ее заполненности -
+        в аннотации has_sequence_data, которую использует has_sequence.
+        """
+        return self.defer('sequence_data').annotate(
+            has_sequence_data=models.ExpressionWrapper(
+                ~models.Q(sequence_data=''), output_field=models.BooleanField()
+            )
+        )
 
 
 class GenomeSequence(models.Model):
@@ -417,7 +779,28 @@ class GenomeSequence(models.Model):
     # FASTA последовательность (для небольших последовательностей)
     sequence_data = models.TextField(
         blank=True,
-        verbose_name="Данные последовательности"
+        verbose_name="Данные последовательности",
+        help_text="При сохранении переносится во внешнее хранилище последовательностей"
+    )
+    
+    # Последовательность во внешнем хранилище (см. catalog/sequence_store.py)
+    sequence_handle = models.CharField(
+        max_length=100,
+        blank=True,
+        editable=False,
+        verbose_name="Дескриптор в хранилище"
+    )
+    stored_length = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name="Длина сохраненной последовательности"
+    )
+    sequence_checksum = models.CharField(
+        max_length=64,
+        blank=True,
+        editable=False,
+        verbose_name="SHA-256 последовательности"
     )
     
     # Метаданные
@@ -442,13 +825,89 @@ class GenomeSequence(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = GenomeSequenceQuerySet.as_manager()
+    
     class Meta:
         verbose_name = "Геномная последовательность"
         verbose_name_plural = "Геномные последовательности"
         ordering = ['-submission_date']
+        indexes = [
+            # Ключ курсорной пагинации (catalog/pagination.py)
+            models.Index(fields=['submission_date', 'id'], name='sequence_keyset_idx'),
+        ]
     
     def __str__(self):
         return f"{self.strain.full_name} - {self.get_sequence_type_display()} ({self.accession_number})"
+    
+    def save(self, *args, **kwargs):
+        if self.sequence_data and getattr(settings, 'SEQUENCE_STORE_OFFLOAD', False):
+            self.offload_sequence()
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | {
+                    'sequence_data', 'sequence_handle',
+                    'stored_length', 'sequence_checksum',
+                }
+        super().save(*args, **kwargs)
+    
+    def offload_sequence(self):
+        """Переносит sequence_data во внешнее хранилище (без сохранения строки)"""
+        sequence = normalize_sequence(self.sequence_data)
+        if sequence:
+            handle, length, checksum = get_sequence_store().put(sequence)
+        else:
+            handle, length, checksum = '', None, ''
+        self.sequence_handle = handle
+        self.stored_length = length
+        self.sequence_checksum = checksum
+        self.sequence_data = ''
+    
+    @property
+    def has_sequence(self):
+        if self.sequence_handle:
+            return True
+        if 'sequence_data' in self.get_deferred_fields() and hasattr(self, 'has_sequence_data'):
+            return self.has_sequence_data
+        return bool(self.sequence_data)
+    
+    def iter_sequence_chunks(self):
+        """Последовательность по частям (из хранилища или из строки БД)"""
+        if self.sequence_handle:
+            yield from get_sequence_store().iter_chunks(self.sequence_handle)
+        elif self.sequence_data:
+            yield normalize_sequence(self.sequence_data)
+    
+    def get_sequence(self):
+        """Полная последовательность без заголовков и пробелов"""
+        return ''.join(self.iter_sequence_chunks())
+    
+    def get_gc_content(self):
+        """GC-состав (%) сохраненной последовательности"""
+        if self.sequence_handle:
+            return get_sequence_store().gc_content(self.sequence_handle)
+        sequence = normalize_sequence(self.sequence_data)
+        return nucleotide_codec.gc_content(nucleotide_codec.encode(sequence)) if sequence else None
+    
+    @property
+    def available_length(self):
+        """Длина доступной последовательности (0, если данных нет)"""
+        if self.sequence_handle:
+            return self.stored_length or 0
+        return len(normalize_sequence(self.sequence_data))
+    
+    def read_region(self, start, end, strand='+'):
+        """
+        Участок [start, end) последовательности (0-based).
+        
+        Для strand='-' возвращается обратно-комплементарная цепь участка.
+        """
+        if self.sequence_handle:
+            region = get_sequence_store().read(self.sequence_handle, start, end)
+        else:
+            region = normalize_sequence(self.sequence_data)[max(0, start):end]
+        if strand == '-':
+            region = reverse_complement(region)
+        return region
 
 
 class Publication(models.Model):
@@ -493,3 +952,93 @@ class Publication(models.Model):
     
     def __str__(self):
         return f"{self.title} ({self.year})"
+
+
+class CatalogStatsSnapshot(models.Model):
+    """
+    Снимок глобальной статистики каталога.
+
+    Единственная строка, которая поддерживается сигналами ``post_save`` /
+    ``post_delete`` моделей Strain и Collection (см. ``catalog/signals.py``)
+    и полностью пересчитывается командой ``rebuild_stats``.
+    """
+    
+    SINGLETON_ID = 1
+    
+    # Поля, значения которых берутся из compute_strain_statistics()
+    COUNTER_FIELDS = [
+        'total_strains', 'total_extremophiles', 'baikal_strains',
+        'biotech_potential', 'genome_sequenced',
+        'genome_size_sum', 'genome_size_count',
+        'gc_content_sum', 'gc_content_count',
+        'extremophiles', 'biotechnology',
+        'organism_counts', 'habitat_counts', 'collection_counts',
+    ]
+    
+    id = models.PositiveSmallIntegerField(primary_key=True, default=SINGLETON_ID, editable=False)
+    
+    # Общие счетчики (только доступные штаммы и активные коллекции)
+    total_collections = models.IntegerField(default=0, verbose_name="Активных коллекций")
+    total_strains = models.IntegerField(default=0, verbose_name="Доступных штаммов")
+    total_extremophiles = models.IntegerField(default=0, verbose_name="Экстремофилов")
+    baikal_strains = models.IntegerField(default=0, verbose_name="Байкальских штаммов")
+    biotech_potential = models.IntegerField(default=0, verbose_name="С биотех потенциалом")
+    genome_sequenced = models.IntegerField(default=0, verbose_name="С секвенированным геномом")
+    
+    # Суммы для средних геномных показателей
+    genome_size_sum = models.BigIntegerField(default=0)
+    genome_size_count = models.IntegerField(default=0)
+    gc_content_sum = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    gc_content_count = models.IntegerField(default=0)
+    
+    # Счетчики флагов и распределения {код: количество}
+    extremophiles = models.JSONField(default=dict, verbose_name="Экстремофилы по типам")
+    biotechnology = models.JSONField(default=dict, verbose_name="Биотех потенциал по типам")
+    organism_counts = models.JSONField(default=dict, verbose_name="По типам организмов")
+    habitat_counts = models.JSONField(default=dict, verbose_name="По средам обитания")
+    collection_counts = models.JSONField(default=dict, verbose_name="По коллекциям")
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = "Снимок статистики"
+        verbose_name_plural = "Снимки статистики"
+    
+    def __str__(self):
+        return f"Статистика каталога ({self.updated_at:%Y-%m-%d %H:%M})"
+    
+    def apply_delta(self, delta):
+        """Применяет плоский словарь приращений (см. strain_contribution)"""
+        for key, value in delta.items():
+            field, _, item = key.partition('.')
+            if not item:
+                setattr(self, field, getattr(self, field) + value)
+                continue
+            counts = getattr(self, field)
+            counts[item] = counts.get(item, 0) + value
+    
+    def as_stats(self):
+        """Статистика в формате compute_strain_statistics()"""
+        return {
+            'total_collections': self.total_collections,
+            'total_strains': self.total_strains,
+            'collections_count': sum(
+                1 for count in self.collection_counts.values() if count > 0
+            ),
+            'total_extremophiles': self.total_extremophiles,
+            'baikal_strains': self.baikal_strains,
+            'biotech_potential': self.biotech_potential,
+            'genome_sequenced': self.genome_sequenced,
+            'avg_genome_size': (
+                self.genome_size_sum / self.genome_size_count
+                if self.genome_size_count else None
+            ),
+            'avg_gc_content': (
+                round(self.gc_content_sum / self.gc_content_count, 2)
+                if self.gc_content_count else None
+            ),
+            'extremophiles': dict(self.extremophiles),
+            'biotechnology': dict(self.biotechnology),
+            'organism_counts': dict(self.organism_counts),
+            'habitat_counts': dict(self.habitat_counts),
+        }
@@ -0,0 +1,256 @@
+"""
+Компактное 2-битное представление нуклеотидных последовательностей.
+
+A/C/G/T кодируются числами 0..3, по четыре нуклеотида в байте (первый
+нуклеотид - в старших битах). Всё, что после приведения к верхнему регистру
+не является A/C/G/T (серии N, коды неоднозначности IUPAC), хранится в таблице
+исключений сериями ``(start, length, символ)``, а позиции строчных букв
+(soft-masking) - сериями ``(start, length)``.
+
+Сериализованный формат (он же формат файла для чтения через mmap)::
+
+    заголовок  <4sBQII>  magic, версия, длина, число исключений, число масок
+    исключения <QIc>     start, length, символ
+    маски      <QI>      start, length
+    данные               упакованные байты
+
+При наличии NumPy кодирование и декодирование векторизованы, иначе
+используются таблицы подстановки на чистом Python.
+"""
+import re
+import struct
+from bisect import bisect_right
+from collections import Counter, namedtuple
+
+try:
+    import numpy as np
+except ImportError:  # NumPy не обязателен
+    np = None
+
+
+MAGIC = b'SF2B'
+VERSION = 1
+
+HEADER = struct.Struct('<4sBQII')
+EXCEPTION_RUN = struct.Struct('<QIc')
+MASK_RUN = struct.Struct('<QI')
+
+BASES = 'ACGT'
+
+PackedSequence = namedtuple('PackedSequence', ['length', 'data', 'exceptions', 'mask'])
+
+# Таблицы подстановки для реализации на чистом Python
+PACK_TABLE = {}
+UNPACK_TABLE = []
+for _byte in range(256):
+    _quad = ''.join(BASES[(_byte >> shift) & 3] for shift in (6, 4, 2, 0))
+    PACK_TABLE[_quad] = _byte
+    UNPACK_TABLE.append(_quad.encode('ascii'))
+# Количество G/C среди четырех нуклеотидов байта
+GC_PER_BYTE = [quad.count(b'G') + quad.count(b'C') for quad in UNPACK_TABLE]
+
+NON_ACGT_RUN = re.compile(r'([^ACGT])\1*')
+LOWERCASE_RUN = re.compile(r'[a-z]+')
+
+if np is not None:
+    CODE_LOOKUP = np.full(256, 255, dtype=np.uint8)
+    for _code, _base in enumerate(BASES):
+        CODE_LOOKUP[ord(_base)] = _code
+    LETTER_LOOKUP = np.frombuffer(BASES.encode('ascii'), dtype=np.uint8)
+    GC_LOOKUP = np.array(GC_PER_BYTE, dtype=np.int64)
+
+
+def _runs_numpy(positions, values=None):
+    """Серии подряд идущих позиций (и одинаковых значений) из массива индексов"""
+    if not positions.size:
+        return []
+    breaks = np.diff(positions) != 1
+    if values is not None:
+        breaks |= np.diff(values) != 0
+    starts = np.concatenate(([0], np.flatnonzero(breaks) + 1))
+    ends = np.concatenate((starts[1:], [positions.size]))
+    if values is None:
+        return [(int(positions[s]), int(e - s)) for s, e in zip(starts, ends)]
+    return [
+        (int(positions[s]), int(e - s), chr(values[s]))
+        for s, e in zip(starts, ends)
+    ]
+
+
+def encode(sequence):
+    """Упаковывает строку нуклеотидов в PackedSequence"""
+    if np is not None:
+        return _encode_numpy(sequence)
+    return _encode_python(sequence)
+
+
+def _encode_numpy(sequence):
+    raw = np.frombuffer(sequence.encode('ascii'), dtype=np.uint8)
+    lower = (raw >= ord('a')) & (raw <= ord('z'))
+    upper = np.where(lower, raw - 32, raw).astype(np.uint8)
+    codes = CODE_LOOKUP[upper]
+    is_exception = codes == 255
+
+    exception_positions = np.flatnonzero(is_exception)
+    exceptions = _runs_numpy(exception_positions, upper[exception_positions])
+    mask = _runs_numpy(np.flatnonzero(lower))
+
+    codes[is_exception] = 0
+    padded = np.zeros(-(-codes.size // 4) * 4, dtype=np.uint8)
+    padded[:codes.size] = codes
+    quads = padded.reshape(-1, 4)
+    data = (quads[:, 0] << 6) | (quads[:, 1] << 4) | (quads[:, 2] << 2) | quads[:, 3]
+    return PackedSequence(len(sequence), data.astype(np.uint8).tobytes(), exceptions, mask)
+
+
+def _encode_python(sequence):
+    upper = sequence.upper()
+    exceptions = [
+        (match.start(), match.end() - match.start(), match.group(1))
+        for match in NON_ACGT_RUN.finditer(upper)
+    ]
+    mask = [
+        (match.start(), match.end() - match.start())
+        for match in LOWERCASE_RUN.finditer(sequence)
+    ]
+    clean = NON_ACGT_RUN.sub(lambda match: 'A' * len(match.group(0)), upper)
+    clean += 'A' * (-len(clean) % 4)
+    data = bytes(PACK_TABLE[clean[i:i + 4]] for i in range(0, len(clean), 4))
+    return PackedSequence(len(sequence), data, exceptions, mask)
+
+
+def _overlapping(runs, start, end):
+    """
+    Серии, пересекающиеся с [start, end); runs отсортированы по началу и
+    не перекрываются, поэтому поиск начинается с бинарного поиска.
+    """
+    index = max(bisect_right(runs, (start, float('inf'))) - 1, 0)
+    for index in range(index, len(runs)):
+        run = runs[index]
+        if run[0] >= end:
+            break
+        if run[0] + run[1] > start:
+            yield run
+
+
+def decode(packed, start=0, end=None):
+    """Участок [start, end) упакованной последовательности в виде строки"""
+    end = packed.length if end is None else min(end, packed.length)
+    start = max(0, start)
+    if start >= end:
+        return ''
+
+    first_byte, last_byte = start // 4, -(-end // 4)
+    block = packed.data[first_byte:last_byte]
+    if np is not None:
+        quads = np.frombuffer(block, dtype=np.uint8)
+        codes = np.stack(
+            [(quads >> 6) & 3, (quads >> 4) & 3, (quads >> 2) & 3, quads & 3],
+            axis=1
+        ).ravel()
+        letters = LETTER_LOOKUP[codes].tobytes()
+    else:
+        letters = b''.join(UNPACK_TABLE[byte] for byte in block)
+
+    offset = start - first_byte * 4
+    region = bytearray(letters[offset:offset + end - start])
+
+    for run_start, run_length, char in _overlapping(packed.exceptions, start, end):
+        a, b = max(run_start, start), min(run_start + run_length, end)
+        region[a - start:b - start] = char.encode('ascii') * (b - a)
+    for run_start, run_length in _overlapping(packed.mask, start, end):
+        a, b = max(run_start, start), min(run_start + run_length, end)
+        region[a - start:b - start] = region[a - start:b - start].lower()
+    return region.decode('ascii')
+
+
+def gc_counts(packed):
+    """
+    Число G/C и число определенных нуклеотидов по упакованным данным.
+
+    Позиции из таблицы исключений (N, коды IUPAC) в расчете не участвуют:
+    в упакованных данных они, как и выравнивание последнего байта, равны A.
+    """
+    data = bytes(packed.data)
+    if np is not None:
+        gc = int(GC_LOOKUP[np.frombuffer(data, dtype=np.uint8)].sum())
+    else:
+        gc = sum(GC_PER_BYTE[byte] * count for byte, count in Counter(data).items())
+    determined = packed.length - sum(run[1] for run in packed.exceptions)
+    return gc, determined
+
+
+def gc_content(packed):
+    """GC-состав (%) по упакованным данным, без декодирования"""
+    gc, determined = gc_counts(packed)
+    if determined <= 0:
+        return None
+    return round(gc * 100 / determined, 2)
+
+
+def to_bytes(packed):
+    """Сериализация PackedSequence"""
+    parts = [HEADER.pack(MAGIC, VERSION, packed.length, len(packed.exceptions), len(packed.mask))]
+    parts.extend(
+        EXCEPTION_RUN.pack(run_start, run_length, char.encode('ascii'))
+        for run_start, run_length, char in packed.exceptions
+    )
+    parts.extend(MASK_RUN.pack(run_start, run_length) for run_start, run_length in packed.mask)
+    parts.append(packed.data)
+    return b''.join(parts)
+
+
+def from_buffer(buffer):
+    """
+    PackedSequence из сериализованных данных (bytes или mmap).
+
+    Данные и таблицы серий не копируются: decode() читает только байты
+    запрошенного участка и серии, найденные бинарным поиском.
+    """
+    magic, version, length, exception_count, mask_count = HEADER.unpack_from(buffer, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError('Неизвестный формат упакованной последовательности')
+    offset = HEADER.size
+    exceptions = _RunTable(buffer, offset, exception_count, EXCEPTION_RUN)
+    offset += exception_count * EXCEPTION_RUN.size
+    mask = _RunTable(buffer, offset, mask_count, MASK_RUN)
+    offset += mask_count * MASK_RUN.size
+    return PackedSequence(length, _BufferSlice(buffer, offset), exceptions, mask)
+
+
+class _RunTable:
+    """Таблица серий в буфере: запись разбирается при обращении по индексу"""
+
+    def __init__(self, buffer, offset, count, record):
+        self.buffer = buffer
+        self.offset = offset
+        self.count = count
+        self.record = record
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+        run = self.record.unpack_from(self.buffer, self.offset + index * self.record.size)
+        if self.record is EXCEPTION_RUN:
+            return run[0], run[1], run[2].decode('ascii')
+        return run
+
+
+class _BufferSlice:
+    """Срез буфера без копирования: копируются только запрошенные байты"""
+
+    def __init__(self, buffer, offset):
+        self.buffer = buffer
+        self.offset = offset
+
+    def __getitem__(self, item):
+        return self.buffer[self.offset + item.start:self.offset + item.stop]
+
+    def __len__(self):
+        return len(self.buffer) - self.offset
+
+    def __bytes__(self):
+        return self.buffer[self.offset:]
@@ -0,0 +1,210 @@
+"""
+Пагинация по ключу (keyset) для списков и экспортов.
+
+Страница ``PageNumberPagination`` стоит COUNT(*) плюс OFFSET-сканирование,
+и глубокие страницы становятся линейно медленнее. В режиме курсора
+следующая страница отбирается условием «ключ сортировки больше последнего
+выданного», поэтому любая страница стоит столько же, сколько первая.
+
+Режим включается параметром ``?pagination=cursor`` (первая страница) или
+наличием ``?cursor=`` (следующие страницы, ссылка ``next`` в ответе).
+Сортировка в этом режиме фиксирована (KEYSET_ORDERINGS); ``?ordering=`` и
+сортировка по релевантности не применяются. Курсоры непрозрачны для
+клиента: это base64 от JSON-массива значений ключа последней записи.
+"""
+import base64
+import binascii
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .models import GenomeSequence, Strain
+
+
+# Стабильные (уникальные) ключи сортировки для режима курсора
+KEYSET_ORDERINGS = {
+    Strain: ('collection_code', 'strain_number', 'id'),
+    GenomeSequence: ('-submission_date', '-id'),
+}
+
+# Заголовок ответа экспорта с курсором следующей части
+NEXT_CURSOR_HEADER = 'X-Next-Cursor'
+
+
+def encode_cursor(values):
+    payload = json.dumps(
+        list(values), cls=DjangoJSONEncoder, ensure_ascii=False, separators=(',', ':')
+    )
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, model, ordering):
+    """
+    Значения ключа из курсора, приведенные к типам полей сортировки model;
+    NotFound для испорченного курсора.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (binascii.Error, UnicodeError, ValueError):
+        raise NotFound('Некорректный курсор')
+    if not isinstance(values, list) or len(values) != len(ordering):
+        raise NotFound('Некорректный курсор')
+    try:
+        values = [
+            model._meta.get_field(field.lstrip('-')).to_python(value)
+            for field, value in zip(ordering, values)
+        ]
+    except (DjangoValidationError, TypeError, ValueError):
+        raise NotFound('Некорректный курсор')
+    # Поля ключей не допускают NULL
+    if any(value is None for value in values):
+        raise NotFound('Некорректный курсор')
+    return values
+
+
+def keyset_after(ordering, values):
+    """
+    Q-условие «запись идет после ключа values» для сортировки ordering:
+    (a > x) OR (a = x AND b > y) OR ...
+    """
+    condition = Q()
+    equal = {}
+    for field, value in zip(ordering, values):
+        name = field.lstrip('-')
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        condition |= Q(**equal, **{f'{name}__{lookup}': value})
+        equal[name] = value
+    return condition
+
+
+def keyset_values(obj, ordering):
+    """Значения ключа сортировки объекта (или словаря values())"""
+    names = [field.lstrip('-') for field in ordering]
+    if isinstance(obj, dict):
+        return [obj[name] for name in names]
+    return [getattr(obj, name) for name in names]
+
+
+def keyset_slice(queryset, cursor=None, limit=None):
+    """
+    Окно queryset после курсора в порядке ключа модели.
+
+    Возвращает (queryset окна, курсор следующего окна или None). Курсор
+    следующего окна вычисляется заранее - по ключу последней записи окна,
+    поэтому его можно отдать в заголовке потокового ответа.
+    """
+    ordering = KEYSET_ORDERINGS[queryset.model]
+    queryset = queryset.order_by(*ordering)
+    if cursor:
+        values = decode_cursor(cursor, queryset.model, ordering)
+        queryset = queryset.filter(keyset_after(ordering, values))
+    if not limit:
+        return queryset, None
+
+    names = [field.lstrip('-') for field in ordering]
+    boundary = list(queryset.values_list(*names)[limit - 1:limit + 1])
+    next_cursor = encode_cursor(boundary[0]) if len(boundary) == 2 else None
+    return queryset[:limit], next_cursor
+
+
+def export_window(queryset, params):
+    """
+    Часть экспорта по параметрам ``?cursor=`` и ``?limit=``.
+
+    Без них queryset возвращается без изменений (весь экспорт одним
+    ответом). Иначе - (окно, курсор следующей части): прерванную выгрузку
+    можно продолжить с последнего полученного курсора.
+    """
+    if 'cursor' not in params and 'limit' not in params:
+        return queryset, None
+    return keyset_slice(queryset, params.get('cursor'), export_limit(params))
+
+
+def export_limit(params):
+    """Значение ``?limit=`` экспорта (None - не задано)"""
+    limit = params.get('limit')
+    if not limit:
+        return None
+    try:
+        limit = int(limit)
+    except ValueError:
+        limit = 0
+    if limit <= 0:
+        raise ValidationError({'limit': 'Ожидается положительное целое число'})
+    return limit
+
+
+def export_within(queryset, params, max_rows):
+    """
+    Не больше ли max_rows строк в части экспорта по параметрам запроса
+    (см. export_window). Считается не больше max_rows + 1 строки.
+    """
+    limit = export_limit(params)
+    if limit and limit <= max_rows:
+        return True
+    if 'cursor' in params or limit:
+        queryset, _ = keyset_slice(queryset, params.get('cursor'))
+    return queryset.order_by()[:max_rows + 1].count() <= max_rows
+
+
+class KeysetPageNumberPagination(PageNumberPagination):
+    """
+    Постраничная навигация DRF с необязательным режимом курсора.
+
+    Без параметров ведет себя как PageNumberPagination (с count и номерами
+    страниц); с ``?pagination=cursor`` или ``?cursor=`` - как keyset-пагинация
+    без COUNT(*) и OFFSET.
+    """
+    cursor_query_param = 'cursor'
+    mode_query_param = 'pagination'
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+    def use_cursor(self, request, queryset):
+        if queryset.model not in KEYSET_ORDERINGS:
+            return False
+        params = request.query_params
+        return self.cursor_query_param in params or params.get(self.mode_query_param) == 'cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_mode = self.use_cursor(request, queryset)
+        if not self.cursor_mode:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.ordering = KEYSET_ORDERINGS[queryset.model]
+        page_size = self.get_page_size(request)
+        window, _ = keyset_slice(queryset, request.query_params.get(self.cursor_query_param))
+        page = list(window[:page_size + 1])
+        self.has_next = len(page) > page_size
+        page = page[:page_size]
+        self.next_cursor = (
+            encode_cursor(keyset_values(page[-1], self.ordering))
+            if self.has_next else None
+        )
+        return page
+
+    def get_next_link(self):
+        if not self.cursor_mode:
+            return super().get_next_link()
+        if not self.next_cursor:
+            return None
+        url = remove_query_param(self.request.build_absolute_uri(), self.mode_query_param)
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        if not self.cursor_mode:
+            return super().get_paginated_response(data)
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('next_cursor', self.next_cursor),
+            ('results', data),
+        ]))
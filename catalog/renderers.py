@@ -0,0 +1,65 @@
+"""
+JSON-рендерер REST API на orjson.
+
+orjson сериализует dict/list/str/int/float, UUID, date и datetime на C и
+на порядок быстрее ``json.dumps`` с ``JSONEncoder`` DRF. Остальные типы
+(Decimal, ленивые строки, QuerySet) передаются в ``default`` - тот же
+``JSONEncoder.default`` DRF, поэтому результат совпадает с
+``JSONRenderer`` (компактный вывод в UTF-8, как при настройках DRF по
+умолчанию).
+
+orjson не обязателен: без него, а также для данных, которые orjson не
+поддерживает (целые больше 64 бит), используется стандартный ``json``.
+"""
+import json
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # orjson не обязателен
+    orjson = None
+
+
+ORJSON_OPTIONS = (orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+# Разделители JSON для JavaScript: DRF всегда экранирует их
+JS_LINE_SEPARATORS = ((b'\xe2\x80\xa8', b'\\u2028'), (b'\xe2\x80\xa9', b'\\u2029'))
+
+
+def default(obj):
+    return JSONEncoder().default(obj)
+
+
+def dumps(data):
+    """Компактный JSON (bytes, UTF-8); orjson, если установлен"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(data, default=default, option=ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            pass
+    return json.dumps(
+        data, cls=JSONEncoder, ensure_ascii=False, separators=(',', ':')
+    ).encode('utf-8')
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer на orjson. Форматированный вывод (``indent`` в Accept или
+    в контексте, например для Browsable API) и нестандартные настройки DRF
+    обрабатывает родительский класс.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if orjson is None or indent is not None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        content = dumps(data)
+        for separator, escaped in JS_LINE_SEPARATORS:
+            if separator in content:
+                content = content.replace(separator, escaped)
+        return content
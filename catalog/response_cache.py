@@ -0,0 +1,162 @@
+"""
+Кэш ответов API только для чтения.
+
+Ключ ответа - его ETag (``ConditionalResponseMixin``): путь, параметры
+запроса, отсортированные по имени, формат ответа и версии данных, от
+которых зависит представление. Сигналы моделей увеличивают версию
+(``catalog/versions.py``), после чего старые ключи больше не запрашиваются
+и вытесняются из кэша по времени жизни - удалять или перебирать их не нужно.
+
+Повторный запрос той же страницы или того же поиска отдается из кэша без
+обращения к БД.
+
+Небольшие часто запрашиваемые ответы (``local_response_cache``) хранятся
+и в памяти процесса (``catalog/local_cache.py``).
+
+Выгрузки (``cached_export_response``) кэшируются так же, но пересчитываются
+с защитой от одновременного пересчета (``catalog/stampede.py``); длинные
+выгрузки не кэшируются и отдаются потоком.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from rest_framework import status
+
+from .conditional import ConditionalResponseMixin
+from .local_cache import local_cache
+from .stampede import get_or_recompute
+
+
+RESPONSE_KEY = 'catalog:response:{}'
+EXPORT_KEY = 'catalog:export:{}'
+
+# Заголовки, которые сохраняются вместе с телом ответа
+CACHED_HEADERS = ['Content-Disposition', 'X-Next-Cursor']
+
+
+def response_cache_timeout():
+    return getattr(settings, 'CATALOG_RESPONSE_CACHE_TIMEOUT', 600)
+
+
+def response_cache_max_size():
+    """Ответы больше этого размера (байт) не кэшируются"""
+    return getattr(settings, 'CATALOG_RESPONSE_CACHE_MAX_SIZE', 1024 * 1024)
+
+
+def local_response_max_size():
+    """Ответы больше этого размера (байт) не хранятся в памяти процесса"""
+    return getattr(settings, 'CATALOG_L1_RESPONSE_MAX_SIZE', 64 * 1024)
+
+
+def export_cache_timeout():
+    return getattr(settings, 'CATALOG_EXPORT_CACHE_TIMEOUT', 600)
+
+
+def export_cache_max_rows():
+    """Выгрузки длиннее этого числа строк отдаются потоком без кэша"""
+    return getattr(settings, 'CATALOG_EXPORT_CACHE_MAX_ROWS', 2000)
+
+
+def response_entry(response, content):
+    """Запись кэша: (тело, Content-Type, сохраняемые заголовки)"""
+    headers = {name: response[name] for name in CACHED_HEADERS if response.has_header(name)}
+    return content, response['Content-Type'], headers
+
+
+def entry_response(entry):
+    content, content_type, headers = entry
+    response = HttpResponse(content, content_type=content_type)
+    for name, value in headers.items():
+        response[name] = value
+    return response
+
+
+def materialize_export(response):
+    """Тело потокового ответа целиком"""
+    return response_entry(response, b''.join(response.streaming_content))
+
+
+def cached_export_response(etag, build_response, is_small):
+    """
+    Ответ выгрузки из кэша по ETag запроса. build_response() строит
+    потоковый ответ; при промахе его выполняет один процесс, остальные ждут
+    результата.
+
+    Кэшируются только выгрузки, для которых is_small(max_rows) - проверка
+    числа строк до рендеринга. Для остальных в кэше запоминается None, и
+    они отдаются потоком: выгрузка никогда не выполняется дважды.
+    """
+    if not etag:
+        return build_response()
+
+    def compute():
+        if not is_small(export_cache_max_rows()):
+            return None
+        return materialize_export(build_response())
+
+    entry = get_or_recompute(EXPORT_KEY.format(etag), compute, export_cache_timeout())
+    if entry is None:
+        return build_response()
+    return entry_response(entry)
+
+
+class CachedResponse(Exception):
+    """Ответ найден в кэше: обработчик представления не выполняется"""
+
+    def __init__(self, response):
+        super().__init__()
+        self.response = response
+
+
+def store_local(key, entry):
+    # Ключ содержит версии данных, поэтому запись не требует инвалидации
+    if len(entry[0]) <= local_response_max_size():
+        local_cache.set(key, entry)
+
+
+def store_response(key, response, local=False):
+    if response.status_code != status.HTTP_200_OK or len(response.content) > response_cache_max_size():
+        return
+    entry = response_entry(response, response.content)
+    cache.set(key, entry, response_cache_timeout())
+    if local:
+        store_local(key, entry)
+
+
+class CachedResponseMixin(ConditionalResponseMixin):
+    """
+    ConditionalResponseMixin с кэшем отрендеренных ответов GET/HEAD.
+    Потоковые ответы здесь не кэшируются (см. cached_export_response).
+    """
+    # Хранить ответы и в памяти процесса
+    local_response_cache = False
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if not self.conditional_etag:
+            return
+
+        key = RESPONSE_KEY.format(self.conditional_etag)
+        cached = local_cache.get(key) if self.local_response_cache else None
+        if cached is None:
+            cached = cache.get(key)
+            if cached is not None and self.local_response_cache:
+                store_local(key, cached)
+        if cached is not None:
+            raise CachedResponse(entry_response(cached))
+
+    def handle_exception(self, exc):
+        if isinstance(exc, CachedResponse):
+            return exc.response
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if (self.conditional_etag and request.method == 'GET'
+                and response.status_code == status.HTTP_200_OK
+                and not response.streaming and hasattr(response, 'add_post_render_callback')):
+            key = RESPONSE_KEY.format(self.conditional_etag)
+            response.add_post_render_callback(
+                lambda rendered: store_response(key, rendered, self.local_response_cache)
+            )
+        return response
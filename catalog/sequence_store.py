@@ -0,0 +1,255 @@
+"""
+Внешнее хранилище геномных последовательностей.
+
+Последовательности хранятся вне таблицы GenomeSequence: в строке БД остаются
+только дескриптор (``sequence_handle``), длина и контрольная сумма.
+Бэкенд выбирается настройкой ``SEQUENCE_STORE``::
+
+    SEQUENCE_STORE = {
+        'BACKEND': 'catalog.sequence_store.LocalChunkStore',
+        'OPTIONS': {'root': '/var/lib/sifibr/sequences'},
+    }
+
+LocalChunkStore режет последовательность на чанки фиксированной длины,
+сжимает их zlib и сохраняет по SHA-256 содержимого (одинаковые чанки
+хранятся один раз). Манифест с перечнем чанков адресуется контрольной
+суммой всей последовательности, она же служит дескриптором.
+
+Чанки кодируются 2-битной упаковкой (``catalog/nucleotide_codec.py``)
+перед сжатием; кодек записывается в манифест, чанки старого формата
+(``'text'``, сжатый текст) продолжают читаться.
+
+Для произвольного доступа к участкам последовательность при первом
+обращении разворачивается в файл в 2-битном формате, который читается через
+mmap: распаковываются только байты запрошенного участка.
+"""
+import hashlib
+import json
+import mmap
+import os
+import re
+import tempfile
+import zlib
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from . import nucleotide_codec
+
+
+DEFAULT_CHUNK_SIZE = 1 << 20  # 1 млн нуклеотидов на чанк
+
+
+class SequenceNotFound(Exception):
+    """Дескриптор не найден в хранилище"""
+
+
+# Комплементарные нуклеотиды, включая коды неоднозначности IUPAC
+COMPLEMENT = str.maketrans(
+    'ACGTURYKMBVDHNSWacgturykmbvdhnsw',
+    'TGCAAYRMKVBHDNSWtgcaayrmkvbhdnsw'
+)
+
+
+def reverse_complement(sequence):
+    return sequence.translate(COMPLEMENT)[::-1]
+
+
+# Символы, не входящие в алфавит IUPAC (в том числе не-ASCII)
+NON_IUPAC = re.compile(r'[^ACGTURYKMBVDHNSWacgturykmbvdhnsw]')
+
+
+def normalize_sequence(sequence_data):
+    """
+    Последовательность без строк-заголовков FASTA и пробельных символов;
+    символы вне алфавита IUPAC заменяются на N.
+    """
+    if sequence_data.startswith('>'):
+        sequence_data = '\n'.join(
+            line for line in sequence_data.splitlines()
+            if not line.startswith('>')
+        )
+    return NON_IUPAC.sub('N', ''.join(sequence_data.split()))
+
+
+def sequence_checksum(sequence):
+    return hashlib.sha256(sequence.encode('ascii')).hexdigest()
+
+
+class LocalChunkStore:
+    """Сжатые чанки с адресацией по содержимому на локальном диске"""
+
+    CODECS = ('2bit', 'text')
+
+    def __init__(self, root, chunk_size=DEFAULT_CHUNK_SIZE, compress_level=6, codec='2bit'):
+        if codec not in self.CODECS:
+            raise ValueError(f'Неизвестный кодек последовательностей: {codec}')
+        self.root = Path(root)
+        # Границы чанков должны совпадать с границами байтов 2-битных данных
+        self.chunk_size = chunk_size - chunk_size % 4
+        self.compress_level = compress_level
+        self.codec = codec
+
+    # Пути
+    def _chunk_path(self, digest):
+        return self.root / 'chunks' / digest[:2] / f'{digest}.z'
+
+    def _manifest_path(self, handle):
+        return self.root / 'manifests' / handle[:2] / f'{handle}.json'
+
+    def _flat_path(self, handle):
+        return self.root / 'flat' / handle[:2] / f'{handle}.2bit'
+
+    def _write_atomic(self, path, data):
+        """Запись через временный файл, чтобы не оставлять обрывков"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as tmp:
+                tmp.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    # Запись
+    def put(self, sequence):
+        """Сохраняет последовательность, возвращает (handle, length, checksum)"""
+        checksum = sequence_checksum(sequence)
+        manifest_path = self._manifest_path(checksum)
+        if manifest_path.exists():
+            return checksum, len(sequence), checksum
+
+        chunks = []
+        gc_total = determined_total = 0
+        for offset in range(0, len(sequence), self.chunk_size):
+            text = sequence[offset:offset + self.chunk_size]
+            if self.codec == '2bit':
+                packed = nucleotide_codec.encode(text)
+                gc, determined = nucleotide_codec.gc_counts(packed)
+                gc_total += gc
+                determined_total += determined
+                raw = nucleotide_codec.to_bytes(packed)
+            else:
+                raw = text.encode('ascii')
+            digest = hashlib.sha256(raw).hexdigest()
+            chunk_path = self._chunk_path(digest)
+            if not chunk_path.exists():
+                self._write_atomic(chunk_path, zlib.compress(raw, self.compress_level))
+            chunks.append(digest)
+
+        manifest = {
+            'length': len(sequence),
+            'checksum': checksum,
+            'chunk_size': self.chunk_size,
+            'codec': self.codec,
+            'gc_content': (
+                round(gc_total * 100 / determined_total, 2) if determined_total else None
+            ),
+            'chunks': chunks,
+        }
+        self._write_atomic(manifest_path, json.dumps(manifest).encode('utf-8'))
+        return checksum, len(sequence), checksum
+
+    # Чтение
+    def manifest(self, handle):
+        try:
+            with open(self._manifest_path(handle), 'rb') as manifest_file:
+                return json.load(manifest_file)
+        except FileNotFoundError:
+            raise SequenceNotFound(handle)
+
+    def exists(self, handle):
+        return self._manifest_path(handle).exists()
+
+    def _read_raw_chunk(self, digest):
+        try:
+            with open(self._chunk_path(digest), 'rb') as chunk_file:
+                return zlib.decompress(chunk_file.read())
+        except FileNotFoundError:
+            raise SequenceNotFound(digest)
+
+    def _iter_packed_chunks(self, manifest):
+        """Чанки в виде PackedSequence (текстовые чанки упаковываются на лету)"""
+        codec = manifest.get('codec', 'text')
+        for digest in manifest['chunks']:
+            raw = self._read_raw_chunk(digest)
+            if codec == '2bit':
+                yield nucleotide_codec.from_buffer(raw)
+            else:
+                yield nucleotide_codec.encode(raw.decode('ascii'))
+
+    def iter_chunks(self, handle):
+        """Последовательность по чанкам, без загрузки целиком"""
+        manifest = self.manifest(handle)
+        if manifest.get('codec', 'text') == 'text':
+            for digest in manifest['chunks']:
+                yield self._read_raw_chunk(digest).decode('ascii')
+            return
+        for packed in self._iter_packed_chunks(manifest):
+            yield nucleotide_codec.decode(packed)
+
+    def get(self, handle):
+        return ''.join(self.iter_chunks(handle))
+
+    def length(self, handle):
+        return self.manifest(handle)['length']
+
+    def gc_content(self, handle):
+        """GC-состав (%), вычисленный по упакованным данным при сохранении"""
+        return self.manifest(handle).get('gc_content')
+
+    def _materialize(self, handle):
+        """Последовательность одним файлом в 2-битном формате для чтения через mmap"""
+        flat_path = self._flat_path(handle)
+        if flat_path.exists():
+            return flat_path
+        manifest = self.manifest(handle)
+
+        # Первый проход: таблицы исключений и масок со сдвигом по чанкам
+        exceptions, mask = [], []
+        for index, packed in enumerate(self._iter_packed_chunks(manifest)):
+            offset = index * manifest['chunk_size']
+            exceptions.extend(
+                (offset + run_start, run_length, char)
+                for run_start, run_length, char in packed.exceptions
+            )
+            mask.extend(
+                (offset + run_start, run_length)
+                for run_start, run_length in packed.mask
+            )
+
+        # Второй проход: упакованные данные (границы чанков кратны 4)
+        flat_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=flat_path.parent, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as tmp:
+                header = nucleotide_codec.PackedSequence(manifest['length'], b'', exceptions, mask)
+                tmp.write(nucleotide_codec.to_bytes(header))
+                for packed in self._iter_packed_chunks(manifest):
+                    tmp.write(bytes(packed.data))
+            os.replace(tmp_path, flat_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        return flat_path
+
+    def read(self, handle, start, end):
+        """Участок [start, end) из отображенного в память 2-битного файла"""
+        flat_path = self._materialize(handle)
+        with open(flat_path, 'rb') as flat_file:
+            with mmap.mmap(flat_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                packed = nucleotide_codec.from_buffer(mapped)
+                return nucleotide_codec.decode(packed, start, end)
+
+
+@lru_cache(maxsize=None)
+def get_sequence_store():
+    """Экземпляр хранилища согласно настройке SEQUENCE_STORE"""
+    config = settings.SEQUENCE_STORE
+    backend = import_string(config['BACKEND'])
+    return backend(**config.get('OPTIONS', {}))
@@ -1,7 +1,140 @@
+import re
+
+from django.db.models import Count, OuterRef, Prefetch, Subquery
+from django.db.models.functions import Coalesce
 from rest_framework import serializers
 from .models import Collection, Strain, GenomeSequence, Publication
 
 
+# Источник вида get_<поле>_display -> <поле>
+DISPLAY_SOURCE = re.compile(r'^get_(\w+)_display$')
+
+
+def field_list(params, name):
+    """Имена из параметра запроса: через запятую и/или повторением параметра"""
+    return [
+        value.strip()
+        for param in params.getlist(name)
+        for value in param.split(',') if value.strip()
+    ]
+
+
+def select_fields(serializer_class, params):
+    """
+    Поля serializer_class, выбранные параметрами ?fields= и ?exclude=.
+    
+    None, если параметров нет; ValidationError для неизвестных полей.
+    """
+    fields = field_list(params, 'fields')
+    exclude = field_list(params, 'exclude')
+    if not fields and not exclude:
+        return None
+    available = serializer_class.Meta.fields
+    unknown = sorted(set(fields + exclude) - set(available))
+    if unknown:
+        raise serializers.ValidationError({
+            'fields': f"Неизвестные поля: {', '.join(unknown)}",
+            'available_fields': available,
+        })
+    return [
+        name for name in available
+        if (not fields or name in fields) and name not in exclude
+    ]
+
+
+def project_queryset(queryset, serializer_class, fields=None, required=()):
+    """
+    Ограничивает queryset колонками и связями, нужными для вывода полей
+    fields сериализатора (по умолчанию всех): only(), select_related() и
+    prefetch_related() только для используемых связей.
+    
+    Вычисляемые поля описываются в Meta сериализатора: field_dependencies
+    (нужные колонки), field_annotations (аннотации) и prefetch_querysets
+    (queryset для вложенных списков); required - колонки, нужные помимо
+    полей (например, ключ пагинации).
+    """
+    serializer = serializer_class()
+    meta = serializer_class.Meta
+    dependencies = getattr(meta, 'field_dependencies', {})
+    annotations = getattr(meta, 'field_annotations', {})
+    prefetch_querysets = getattr(meta, 'prefetch_querysets', {})
+    model_fields = {field.name for field in queryset.model._meta.concrete_fields}
+    columns, related, prefetch = set(required), set(), []
+    
+    for name in fields or serializer.fields:
+        field = serializer.fields[name]
+        if isinstance(field, serializers.ListSerializer):
+            if name in prefetch_querysets:
+                prefetch.append(Prefetch(field.source, queryset=prefetch_querysets[name]))
+            else:
+                prefetch.append(field.source)
+            continue
+        if name in annotations:
+            queryset = queryset.annotate(**annotations[name])
+        if name in dependencies:
+            paths = dependencies[name]
+        elif field.source == '*':
+            paths = []
+        else:
+            paths = [DISPLAY_SOURCE.sub(r'\1', field.source).replace('.', '__')]
+        for path in paths:
+            head = path.split('__')[0]
+            if head not in model_fields:
+                continue
+            columns.add(path)
+            if '__' in path:
+                related.add(head)
+    
+    queryset = queryset.select_related(None)
+    if related:
+        # select_related() без аргументов присоединил бы все связи
+        queryset = queryset.select_related(*sorted(related))
+    return queryset.prefetch_related(*prefetch).only(*sorted(columns))
+
+
+class SparseFieldsetMixin:
+    """
+    Сериализатор, выводящий только поля context['fields'] (если заданы),
+    например выбранные select_fields() по ?fields=/?exclude=.
+    """
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        selected = self.context.get('fields')
+        if selected is not None:
+            for name in set(self.fields) - set(selected):
+                self.fields.pop(name)
+
+
+# Колонки, по которым вычисляются свойства штамма
+STRAIN_FIELD_DEPENDENCIES = {
+    'full_name': ['collection_code', 'strain_number'],
+    'is_baikal_endemic': ['habitat_type'],
+    'extremophile_types': Strain.EXTREMOPHILE_FIELDS,
+    'genome_count': [],
+}
+
+# Число последовательностей штамма подзапросом, а не JOIN + GROUP BY: так
+# аннотация не зависит от прочих аннотаций списка (релевантность поиска)
+GENOME_SEQUENCE_COUNT = Coalesce(
+    Subquery(
+        GenomeSequence.objects.filter(strain=OuterRef('pk')).order_by().values(
+            'strain'
+        ).annotate(count=Count('pk')).values('count')
+    ),
+    0
+)
+
+# Сколько связанных штаммов выводится у публикации
+RELATED_STRAINS_LIMIT = 5
+
+
+def annotated_count(obj, annotation, manager):
+    """Счетчик из аннотации queryset (или отдельным запросом без нее)"""
+    count = getattr(obj, annotation, None)
+    return manager.count() if count is None else count
+
+
 class CollectionSerializer(serializers.ModelSerializer):
     """Сериализатор для коллекций"""
     strain_count = serializers.SerializerMethodField()
@@ -19,31 +152,44 @@ class CollectionSerializer(serializers.ModelSerializer):
         ]
     
     def get_strain_count(self, obj):
-        return obj.strains.filter(is_available=True).count()
+        return annotated_count(
+            obj, 'available_strain_count', obj.strains.filter(is_available=True)
+        )
     
     def get_curator_name(self, obj):
         return obj.curator.get_full_name() if obj.curator else None
 
 
 class GenomeSequenceSerializer(serializers.ModelSerializer):
-    """Сериализатор для геномных последовательностей"""
+    """Сериализатор для геномных последовательностей (без самих данных)"""
     strain_name = serializers.CharField(source='strain.full_name', read_only=True)
     sequence_type_display = serializers.CharField(source='get_sequence_type_display', read_only=True)
+    has_sequence = serializers.BooleanField(read_only=True)
     
     class Meta:
         model = GenomeSequence
         fields = [
             'id', 'strain', 'strain_name', 'sequence_type', 'sequence_type_display',
-            'accession_number', 'database', 'sequence_length', 'sequence_data',
+            'accession_number', 'database', 'sequence_length',
+            'has_sequence', 'stored_length', 'sequence_checksum',
             'submission_date', 'quality_score', 'coverage', 'notes',
             'created_at', 'updated_at'
         ]
 
 
-class StrainSerializer(serializers.ModelSerializer):
+class GenomeSequenceDetailSerializer(GenomeSequenceSerializer):
+    """Сериализатор геномной последовательности с данными из хранилища"""
+    sequence_data = serializers.CharField(source='get_sequence', read_only=True)
+    sequence_gc_content = serializers.FloatField(source='get_gc_content', read_only=True)
+    
+    class Meta(GenomeSequenceSerializer.Meta):
+        fields = GenomeSequenceSerializer.Meta.fields + ['sequence_gc_content', 'sequence_data']
+
+
+class StrainSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Основной сериализатор для штаммов"""
     collection_name = serializers.CharField(source='collection.name', read_only=True)
-    collection_code = serializers.CharField(source='collection.code', read_only=True)
+    collection_code = serializers.CharField(read_only=True)
     full_name = serializers.CharField(read_only=True)
     organism_type_display = serializers.CharField(source='get_organism_type_display', read_only=True)
     habitat_type_display = serializers.CharField(source='get_habitat_type_display', read_only=True)
@@ -72,15 +218,22 @@ class StrainSerializer(serializers.ModelSerializer):
             'is_baikal_endemic', 'extremophile_types', 'genome_sequences',
             'genome_count', 'created_at', 'updated_at'
         ]
+        field_dependencies = STRAIN_FIELD_DEPENDENCIES
+        field_annotations = {
+            'genome_count': {'genome_sequence_count': GENOME_SEQUENCE_COUNT},
+        }
+        prefetch_querysets = {
+            'genome_sequences': GenomeSequence.objects.without_data(),
+        }
     
     def get_genome_count(self, obj):
-        return obj.genome_sequences.count()
+        return annotated_count(obj, 'genome_sequence_count', obj.genome_sequences)
 
 
 class StrainListSerializer(serializers.ModelSerializer):
     """Облегченный сериализатор для списков штаммов"""
     collection_name = serializers.CharField(source='collection.name', read_only=True)
-    collection_code = serializers.CharField(source='collection.code', read_only=True)
+    collection_code = serializers.CharField(read_only=True)
     full_name = serializers.CharField(read_only=True)
     organism_type_display = serializers.CharField(source='get_organism_type_display', read_only=True)
     habitat_type_display = serializers.CharField(source='get_habitat_type_display', read_only=True)
@@ -98,6 +251,7 @@ class StrainListSerializer(serializers.ModelSerializer):
             'has_genome_sequence', 'is_available', 'is_type_strain',
             'extremophile_types'
         ]
+        field_dependencies = STRAIN_FIELD_DEPENDENCIES
 
 
 class StrainSearchSerializer(serializers.ModelSerializer):
@@ -122,33 +276,11 @@ class StrainSearchSerializer(serializers.ModelSerializer):
     
     def get_extremophile_summary(self, obj):
         """Краткое описание экстремофильных свойств"""
-        types = []
-        if obj.is_psychrophile:
-            types.append('Психрофил')
-        if obj.is_thermophile:
-            types.append('Термофил')
-        if obj.is_halophile:
-            types.append('Галофил')
-        if obj.is_acidophile:
-            types.append('Ацидофил')
-        if obj.is_alkaliphile:
-            types.append('Алкалифил')
-        if obj.is_barophile:
-            types.append('Барофил')
-        return types
+        return obj.extremophile_types
     
     def get_biotechnology_summary(self, obj):
         """Краткое описание биотехнологического потенциала"""
-        potential = []
-        if obj.produces_antibiotics:
-            potential.append('Антибиотики')
-        if obj.produces_enzymes:
-            potential.append('Ферменты')
-        if obj.produces_metabolites:
-            potential.append('Метаболиты')
-        if obj.nitrogen_fixation:
-            potential.append('Азотфиксация')
-        return potential
+        return [label for _, field, label in Strain.BIOTECH_TYPES if getattr(obj, field)]
 
 
 class PublicationSerializer(serializers.ModelSerializer):
@@ -165,23 +297,27 @@ class PublicationSerializer(serializers.ModelSerializer):
         ]
     
     def get_strain_count(self, obj):
-        return obj.strains.count()
+        return annotated_count(obj, 'strain_total', obj.strains)
     
     def get_related_strains(self, obj):
-        """Список связанных штаммов"""
+        """Список связанных штаммов (первые RELATED_STRAINS_LIMIT)"""
+        strains = getattr(obj, 'top_strains', None)
+        if strains is None:
+            strains = obj.strains.all()[:RELATED_STRAINS_LIMIT]
         return [
             {
                 'id': strain.id,
                 'full_name': strain.full_name,
                 'scientific_name': strain.scientific_name
             }
-            for strain in obj.strains.all()[:5]  # Ограничиваем до 5 для производительности
+            for strain in strains
         ]
 
 
 class StrainGeoSerializer(serializers.ModelSerializer):
     """Сериализатор для геопространственных данных штаммов"""
-    collection_code = serializers.CharField(source='collection.code', read_only=True)
+    # Денормализованный код коллекции: без JOIN
+    collection_code = serializers.CharField(read_only=True)
     full_name = serializers.CharField(read_only=True)
     
     class Meta:
@@ -192,12 +328,13 @@ class StrainGeoSerializer(serializers.ModelSerializer):
             'latitude', 'longitude', 'depth_meters',
             'is_psychrophile', 'is_thermophile', 'is_halophile'
         ]
+        field_dependencies = STRAIN_FIELD_DEPENDENCIES
     
     def to_representation(self, instance):
         """Преобразуем в GeoJSON формат для карт"""
         data = super().to_representation(instance)
         
-        if instance.latitude and instance.longitude:
+        if instance.latitude is not None and instance.longitude is not None:
             return {
                 'type': 'Feature',
                 'properties': {
@@ -0,0 +1,118 @@
+"""
+Сигналы каталога.
+
+Инкрементально поддерживают CatalogStatsSnapshot: при сохранении штамма
+вычитается вклад его прежнего состояния и прибавляется вклад нового.
+Также поддерживают в актуальном состоянии StrainSearchDocument и после
+фиксации транзакции увеличивают версии данных (catalog/versions.py) для
+производных индексов, кэшей и условных ответов API.
+"""
+from django.db import models
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .fuzzy import FUZZY_THRESHOLD
+from .models import Collection, GenomeSequence, Publication, Strain, StrainSearchDocument
+from .statistics import apply_stats_delta, contribution_delta, strain_contribution
+from .versions import PUBLICATIONS, SEQUENCES, STRAINS, bump_version_on_commit
+
+
+@receiver(pre_save, sender=Strain)
+def remember_strain_state(sender, instance, raw=False, **kwargs):
+    """Запоминает вклад штамма в статистику до сохранения"""
+    if raw or instance._state.adding:
+        instance._stats_previous = {}
+        return
+    previous = Strain.objects.filter(pk=instance.pk).first()
+    instance._stats_previous = strain_contribution(previous)
+
+
+@receiver(post_save, sender=Strain)
+def update_stats_on_strain_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_stats_previous', {})
+    apply_stats_delta(contribution_delta(previous, strain_contribution(instance)))
+    instance._stats_previous = strain_contribution(instance)
+    StrainSearchDocument.update_for(instance)
+    bump_version_on_commit(STRAINS)
+
+
+@receiver(post_delete, sender=Strain)
+def update_stats_on_strain_delete(sender, instance, **kwargs):
+    apply_stats_delta(contribution_delta(strain_contribution(instance), {}))
+    bump_version_on_commit(STRAINS)
+
+
+@receiver(pre_save, sender=Collection)
+def remember_collection_state(sender, instance, raw=False, **kwargs):
+    """Запоминает активность, код и название коллекции до сохранения"""
+    previous = None
+    if not raw and not instance._state.adding:
+        previous = Collection.objects.filter(pk=instance.pk).values(
+            'is_active', 'code', 'name'
+        ).first()
+    instance._stats_was_active = bool(previous and previous['is_active'])
+    instance._search_identity = previous and (previous['code'], previous['name'])
+
+
+@receiver(post_save, sender=Collection)
+def update_stats_on_collection_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    was_active = getattr(instance, '_stats_was_active', False)
+    if was_active != instance.is_active:
+        apply_stats_delta({'total_collections': 1 if instance.is_active else -1})
+    instance._stats_was_active = instance.is_active
+
+    # Код и название коллекции входят в поисковые документы ее штаммов и
+    # (код) в Strain.collection_code
+    identity = getattr(instance, '_search_identity', None)
+    if identity and identity[0] != instance.code:
+        # Денормализованный ключ сортировки штаммов. Базовый update(): версию
+        # данных штаммов увеличивает само сохранение коллекции (ниже)
+        models.QuerySet(Strain).filter(collection=instance).update(collection_code=instance.code)
+    if identity and identity != (instance.code, instance.name):
+        for strain in instance.strains.all():
+            strain.collection = instance
+            StrainSearchDocument.update_for(strain)
+    instance._search_identity = (instance.code, instance.name)
+    bump_version_on_commit(STRAINS)
+
+
+@receiver(post_delete, sender=Collection)
+def update_stats_on_collection_delete(sender, instance, **kwargs):
+    # Штаммы коллекции удаляются каскадно и вычитаются своими сигналами
+    if instance.is_active:
+        apply_stats_delta({'total_collections': -1})
+    bump_version_on_commit(STRAINS)
+
+
+@receiver([post_save, post_delete], sender=GenomeSequence)
+def bump_sequences_version(sender, raw=False, **kwargs):
+    if not raw:
+        bump_version_on_commit(SEQUENCES)
+
+
+@receiver([post_save, post_delete], sender=Publication)
+def bump_publications_version(sender, raw=False, **kwargs):
+    if not raw:
+        bump_version_on_commit(PUBLICATIONS)
+
+
+@receiver(m2m_changed, sender=Publication.strains.through)
+def bump_publications_version_on_strains_change(sender, action, **kwargs):
+    if action.startswith('post_'):
+        bump_version_on_commit(PUBLICATIONS)
+
+
+@receiver(connection_created)
+def configure_trigram_threshold(sender, connection, **kwargs):
+    """Порог оператора <% pg_trgm для нечеткого поиска (catalog/fuzzy.py)"""
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT set_config('pg_trgm.word_similarity_threshold', %s, false)",
+                [str(FUZZY_THRESHOLD)]
+            )
@@ -0,0 +1,75 @@
+"""
+Защита кэша от «набегов» (cache stampede) при пересчете дорогих значений.
+
+Когда популярный ключ истекает (или меняется версия данных в ключе), все
+процессы одновременно получают промах и начинают пересчет. Здесь пересчет
+выполняет только процесс, захвативший блокировку ключа (``cache.add`` -
+атомарная операция, в Redis это SET NX); остальные отдают прежнее
+значение, а если его нет - ждут результата.
+
+Кроме того, значение обновляется заранее с вероятностью, растущей к концу
+срока жизни (XFetch: Vattani, Chierichetti, Lowenstein, «Optimal
+Probabilistic Cache Stampede Prevention», 2015), поэтому истечение
+популярного ключа почти никогда не приводит к ожиданию.
+"""
+import math
+import random
+import time
+
+from django.core.cache import cache
+
+
+LOCK_KEY = '{}:lock'
+
+# Время жизни блокировки: если пересчитывающий процесс завершился аварийно,
+# ключ снова можно пересчитать не позже чем через это время
+LOCK_TIMEOUT = 60
+
+LOCK_POLL_INTERVAL = 0.05
+
+
+def should_refresh(entry, beta=1.0):
+    """
+    Решение XFetch: обновить ли значение досрочно. delta - время последнего
+    пересчета; чем дороже пересчет и ближе срок, тем вероятнее обновление.
+    """
+    value, delta, expires_at = entry
+    return time.time() - delta * beta * math.log(1.0 - random.random()) >= expires_at
+
+
+def recompute(key, compute, timeout):
+    started = time.monotonic()
+    value = compute()
+    delta = time.monotonic() - started
+    # Значение хранится вдвое дольше срока, чтобы во время пересчета
+    # остальные процессы могли отдавать прежнее
+    cache.set(key, (value, delta, time.time() + timeout), timeout * 2)
+    return value
+
+
+def get_or_recompute(key, compute, timeout, beta=1.0, lock_timeout=LOCK_TIMEOUT):
+    """
+    Значение ключа key из кэша; при промахе или досрочном обновлении -
+    compute(), выполняемый одним процессом.
+    """
+    entry = cache.get(key)
+    if entry is not None and not should_refresh(entry, beta):
+        return entry[0]
+
+    lock_key = LOCK_KEY.format(key)
+    deadline = time.monotonic() + lock_timeout
+    while True:
+        if cache.add(lock_key, True, lock_timeout):
+            try:
+                return recompute(key, compute, timeout)
+            finally:
+                cache.delete(lock_key)
+        if entry is not None:
+            # Пересчитывает другой процесс: пока отдается прежнее значение
+            return entry[0]
+        if time.monotonic() >= deadline:
+            return compute()
+        time.sleep(LOCK_POLL_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry[0]
@@ -0,0 +1,296 @@
+"""
+Агрегированная статистика по штаммам.
+
+Все счетчики, распределения и средние значения вычисляются за два запроса:
+один ``aggregate()`` с условными ``Count(filter=Q(...))`` и один
+``values().annotate()`` с группировкой по типу организма и среде обитания.
+
+Глобальная статистика хранится в CatalogStatsSnapshot и обновляется
+приращениями (``strain_contribution`` / ``apply_stats_delta``), поэтому
+чтение статистики - это выборка одной строки по первичному ключу.
+Результат кэшируется по версии данных штаммов (``cached_stats``).
+"""
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Avg, Count, Q, Sum
+
+from .models import CatalogStatsSnapshot, Collection, Strain
+from .local_cache import get_local
+from .stampede import get_or_recompute
+from .versions import STRAINS, get_version, shared_versions
+
+
+STATS_KEY = 'catalog:stats:{}'
+
+
+# Флаги экстремофильности и биотехнологического потенциала:
+# (ключ статистики, поле модели)
+EXTREMOPHILE_FLAGS = [(f'{value}s', field) for value, field, _ in Strain.EXTREMOPHILE_TYPES]
+BIOTECH_FLAGS = [(value, field) for value, field, _ in Strain.BIOTECH_TYPES]
+
+
+# Поля Strain, от которых зависит вклад штамма в статистику (strain_contribution)
+STATS_FIELDS = frozenset([
+    'is_available', 'organism_type', 'habitat_type', 'collection', 'collection_id',
+    'is_extremophile', 'has_biotech_potential', 'has_genome_sequence',
+    'genome_size', 'gc_content',
+    *(field for _, field in EXTREMOPHILE_FLAGS + BIOTECH_FLAGS),
+])
+
+
+# Производные флаги поддерживаются моделью (Strain.sync_traits)
+EXTREMOPHILE_Q = Q(is_extremophile=True)
+BIOTECH_Q = Q(has_biotech_potential=True)
+BAIKAL_Q = Q(habitat_type__in=Strain.BAIKAL_HABITATS)
+
+
+def compute_strain_statistics(queryset=None):
+    """
+    Вычисляет сводную статистику по набору штаммов.
+
+    Возвращает словарь с общими счетчиками, счетчиками флагов,
+    средними геномными показателями и распределениями по кодам
+    ``organism_type`` и ``habitat_type``.
+    """
+    if queryset is None:
+        queryset = Strain.objects.filter(is_available=True)
+    queryset = queryset.order_by()
+
+    aggregates = {
+        'total_strains': Count('pk'),
+        'collections_count': Count('collection', distinct=True),
+        'total_extremophiles': Count('pk', filter=EXTREMOPHILE_Q),
+        'baikal_strains': Count('pk', filter=BAIKAL_Q),
+        'biotech_potential': Count('pk', filter=BIOTECH_Q),
+        'genome_sequenced': Count('pk', filter=Q(has_genome_sequence=True)),
+        'avg_genome_size': Avg('genome_size'),
+        'avg_gc_content': Avg('gc_content'),
+        'genome_size_sum': Sum('genome_size'),
+        'genome_size_count': Count('genome_size'),
+        'gc_content_sum': Sum('gc_content'),
+        'gc_content_count': Count('gc_content'),
+    }
+    for key, field in EXTREMOPHILE_FLAGS + BIOTECH_FLAGS:
+        aggregates[f'flag_{key}'] = Count('pk', filter=Q(**{field: True}))
+
+    totals = queryset.aggregate(**aggregates)
+
+    organism_counts = {}
+    habitat_counts = {}
+    collection_counts = {}
+    rows = queryset.values(
+        'organism_type', 'habitat_type', 'collection'
+    ).annotate(count=Count('pk'))
+    for row in rows:
+        for counts, key in (
+            (organism_counts, row['organism_type']),
+            (habitat_counts, row['habitat_type']),
+            (collection_counts, str(row['collection'])),
+        ):
+            counts[key] = counts.get(key, 0) + row['count']
+
+    return {
+        'total_strains': totals['total_strains'],
+        'collections_count': totals['collections_count'],
+        'total_extremophiles': totals['total_extremophiles'],
+        'baikal_strains': totals['baikal_strains'],
+        'biotech_potential': totals['biotech_potential'],
+        'genome_sequenced': totals['genome_sequenced'],
+        'avg_genome_size': totals['avg_genome_size'],
+        'avg_gc_content': totals['avg_gc_content'],
+        'genome_size_sum': totals['genome_size_sum'] or 0,
+        'genome_size_count': totals['genome_size_count'],
+        'gc_content_sum': totals['gc_content_sum'] or 0,
+        'gc_content_count': totals['gc_content_count'],
+        'extremophiles': {key: totals[f'flag_{key}'] for key, _ in EXTREMOPHILE_FLAGS},
+        'biotechnology': {key: totals[f'flag_{key}'] for key, _ in BIOTECH_FLAGS},
+        'organism_counts': organism_counts,
+        'habitat_counts': habitat_counts,
+        'collection_counts': collection_counts,
+    }
+
+
+def strain_contribution(strain):
+    """
+    Вклад одного штамма в глобальную статистику.
+
+    Возвращает плоский словарь ``{счетчик: приращение}``; ключи вида
+    ``'habitat_counts.soil'`` адресуют элементы распределений. Недоступные
+    для заказа штаммы (и ``None``) не учитываются.
+    """
+    if strain is None or not strain.is_available:
+        return {}
+
+    contribution = {
+        'total_strains': 1,
+        f'organism_counts.{strain.organism_type}': 1,
+        f'habitat_counts.{strain.habitat_type}': 1,
+        f'collection_counts.{strain.collection_id}': 1,
+    }
+    if strain.is_extremophile:
+        contribution['total_extremophiles'] = 1
+    if strain.has_biotech_potential:
+        contribution['biotech_potential'] = 1
+    if strain.habitat_type in Strain.BAIKAL_HABITATS:
+        contribution['baikal_strains'] = 1
+    if strain.has_genome_sequence:
+        contribution['genome_sequenced'] = 1
+    for key, field in EXTREMOPHILE_FLAGS:
+        if getattr(strain, field):
+            contribution[f'extremophiles.{key}'] = 1
+    for key, field in BIOTECH_FLAGS:
+        if getattr(strain, field):
+            contribution[f'biotechnology.{key}'] = 1
+    if strain.genome_size is not None:
+        contribution['genome_size_sum'] = strain.genome_size
+        contribution['genome_size_count'] = 1
+    if strain.gc_content is not None:
+        contribution['gc_content_sum'] = Decimal(str(strain.gc_content))
+        contribution['gc_content_count'] = 1
+    return contribution
+
+
+def contribution_delta(old, new):
+    """Разность двух вкладов: new - old, без нулевых элементов"""
+    delta = dict(new)
+    for key, value in old.items():
+        delta[key] = delta.get(key, 0) - value
+    return {key: value for key, value in delta.items() if value}
+
+
+def rebuild_stats_snapshot():
+    """Полностью пересчитывает снимок статистики по таблице Strain"""
+    stats = compute_strain_statistics()
+    defaults = {field: stats[field] for field in CatalogStatsSnapshot.COUNTER_FIELDS}
+    defaults['total_collections'] = Collection.objects.filter(is_active=True).count()
+    # У первичного ключа есть default, поэтому save() нового экземпляра
+    # всегда выполняет INSERT; существующий снимок нужно обновлять
+    snapshot, _ = CatalogStatsSnapshot.objects.update_or_create(
+        pk=CatalogStatsSnapshot.SINGLETON_ID, defaults=defaults
+    )
+    return snapshot
+
+
+def get_stats_snapshot():
+    """Снимок статистики (выборка одной строки по первичному ключу)"""
+    snapshot = CatalogStatsSnapshot.objects.filter(
+        pk=CatalogStatsSnapshot.SINGLETON_ID
+    ).first()
+    if snapshot is None:
+        snapshot = rebuild_stats_snapshot()
+    return snapshot
+
+
+def cached_stats():
+    """
+    ``get_stats_snapshot().as_stats()`` из кэша (в памяти процесса, затем
+    общего). Ключ включает версию данных штаммов; после ее изменения
+    статистику пересчитывает один процесс. С кэшем в памяти процесса
+    снимок читается из БД при каждом вызове.
+    """
+    if not shared_versions():
+        return get_stats_snapshot().as_stats()
+    key = STATS_KEY.format(get_version(STRAINS))
+    return get_local(key, lambda: get_or_recompute(
+        key,
+        lambda: get_stats_snapshot().as_stats(),
+        getattr(settings, 'CATALOG_STATS_CACHE_TIMEOUT', 300)
+    ))
+
+
+def apply_stats_delta(delta):
+    """Атомарно применяет приращения счетчиков к снимку статистики"""
+    if not delta:
+        return
+    with transaction.atomic():
+        snapshot = CatalogStatsSnapshot.objects.select_for_update().filter(
+            pk=CatalogStatsSnapshot.SINGLETON_ID
+        ).first()
+        if snapshot is None:
+            # Первый снимок строится целиком и уже учитывает изменение
+            rebuild_stats_snapshot()
+            return
+        snapshot.apply_delta(delta)
+        snapshot.save()
+
+
+def labelled_counts(counts, choices, skip_empty=False):
+    """Список {'type': название, 'count': n} в порядке choices"""
+    result = []
+    for code, display_name in choices:
+        count = counts.get(code, 0)
+        if skip_empty and not count:
+            continue
+        result.append({'type': display_name, 'count': count})
+    return result
+
+
+# Фасеты: значения совпадают со значениями фильтров StrainFilter
+# (organism_type, habitat_type, collection, extremophile_types, biotech_types)
+EXTREMOPHILE_FACET = Strain.EXTREMOPHILE_TYPES
+BIOTECH_FACET = Strain.BIOTECH_TYPES
+
+GROUPED_FACETS = ['organism_type', 'habitat_type', 'collection']
+FLAG_FACETS = {'extremophile': EXTREMOPHILE_FACET, 'biotech': BIOTECH_FACET}
+FACETS = GROUPED_FACETS + list(FLAG_FACETS)
+
+
+def compute_facets(queryset, facets):
+    """
+    Распределения штаммов queryset по запрошенным фасетам.
+
+    Не более двух запросов независимо от числа фасетов и их значений:
+    один ``values().annotate()`` с группировкой по типу организма, среде
+    обитания и коллекции и один ``aggregate()`` с условными счетчиками флагов.
+    """
+    queryset = queryset.order_by()
+    result = {}
+
+    grouped = [facet for facet in GROUPED_FACETS if facet in facets]
+    if grouped:
+        fields = list(grouped)
+        if 'collection' in grouped:
+            fields += ['collection__code', 'collection__name']
+        counts = {facet: {} for facet in grouped}
+        collections = {}
+        for row in queryset.values(*fields).annotate(count=Count('pk')):
+            for facet in grouped:
+                key = row[facet]
+                counts[facet][key] = counts[facet].get(key, 0) + row['count']
+            if 'collection' in grouped:
+                collections[row['collection']] = (row['collection__code'], row['collection__name'])
+
+        for facet, choices in (
+            ('organism_type', Strain.ORGANISM_TYPES),
+            ('habitat_type', Strain.HABITAT_TYPES),
+        ):
+            if facet in counts:
+                result[facet] = [
+                    {'value': code, 'label': label, 'count': counts[facet][code]}
+                    for code, label in choices if counts[facet].get(code)
+                ]
+        if 'collection' in counts:
+            result['collection'] = sorted(
+                (
+                    {'value': str(pk), 'label': code, 'name': name, 'count': counts['collection'][pk]}
+                    for pk, (code, name) in collections.items()
+                ),
+                key=lambda item: item['label']
+            )
+
+    flag_facets = [facet for facet in FLAG_FACETS if facet in facets]
+    if flag_facets:
+        totals = queryset.aggregate(**{
+            value: Count('pk', filter=Q(**{field: True}))
+            for facet in flag_facets
+            for value, field, _ in FLAG_FACETS[facet]
+        })
+        for facet in flag_facets:
+            result[facet] = [
+                {'value': value, 'label': label, 'count': totals[value]}
+                for value, _, label in FLAG_FACETS[facet]
+            ]
+
+    return result
@@ -1,3 +1,1184 @@
-from django.test import TestCase
+import csv
+import io
+import shutil
+import json
+import re
+import tempfile
+import threading
+import time
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache, caches
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+
+from . import fuzzy, nucleotide_codec
+from .exports import stream_csv
+from .fast_serializers import compile_serializer
+from .geo import strain_clusters
+from .renderers import ORJSONRenderer
+from .sequence_store import get_sequence_store, sequence_checksum
+from .models import (
+    CatalogStatsSnapshot, Collection, GenomeSequence, Publication, Strain, traits_mask
+)
+from .pagination import NEXT_CURSOR_HEADER, encode_cursor
+from .local_cache import LocalLRUCache, SocketTransport, local_cache, start_listener
+from .stampede import LOCK_KEY, get_or_recompute
+from .statistics import compute_strain_statistics, get_stats_snapshot, rebuild_stats_snapshot
+from .views import ExportAPIView
+from .versions import STRAINS, bump_version, get_version, shared_versions
+from .serializers import (
+    RELATED_STRAINS_LIMIT, StrainListSerializer, StrainSearchSerializer, StrainSerializer
+)
+
+
+# Кэш в памяти процесса вместо таблицы БД: тесты выполняются в одном
+# процессе, и обращения к кэшу не входят в число запросов к БД
+LOCAL_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=LOCAL_CACHES, CATALOG_SHARED_CACHE=True)
+class CatalogTestCase(APITestCase):
+    """Коллекции, штаммы, последовательности и публикации для тестов API"""
+
+    @classmethod
+    def setUpTestData(cls):
+        curator = User.objects.create_user('curator', first_name='Иван', last_name='Петров')
+        collections = [
+            Collection.objects.create(
+                name=f'Коллекция {code}', code=code, collection_type='bacteria',
+                description='', established_date=date(2000, 1, 1), curator=curator
+            )
+            for code in ('AAA', 'BBB', 'CCC')
+        ]
+        strains = [
+            Strain.objects.create(
+                collection=collections[number % len(collections)],
+                strain_number=f'{number:03d}', scientific_name=f'Bacillus species{number}',
+                genus='Bacillus', species=f'species{number}', organism_type='bacteria',
+                isolation_source='Вода', habitat_type='baikal_deep',
+                geographic_location='оз. Байкал', deposit_date=date(2020, 1, 1),
+                latitude=Decimal('51.85') + number, longitude=Decimal('104.8'),
+                optimal_temperature=Decimal('4.5') if number % 2 else None,
+                is_psychrophile=number % 2 == 0, is_barophile=number % 4 == 0,
+                produces_enzymes=number % 3 == 0, nitrogen_fixation=number % 5 == 0
+            )
+            for number in range(12)
+        ]
+        for number, strain in enumerate(strains[:8]):
+            for index in range(1 + number % 3):
+                GenomeSequence.objects.create(
+                    strain=strain, sequence_type='draft',
+                    accession_number=f'ACC{number:03d}{index}', sequence_length=1000,
+                    submission_date=date(2021, 1, 1 + index)
+                )
+        for number in range(3):
+            publication = Publication.objects.create(
+                title=f'Публикация {number}', authors='Петров П.П.',
+                journal='Microbiology', year=2020 + number
+            )
+            publication.strains.set(strains[number:number + 7])
+        cls.collection = collections[0]
+        cls.strains = strains
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Как в процессе сервера (wsgi.py): L1 и прием сообщений об инвалидации
+        start_listener()
+
+    def setUp(self):
+        # Кэш (версии данных и ответы API) общий для всех тестов процесса
+        cache.clear()
+        local_cache.clear()
+
+
+class ListQueryCountTests(CatalogTestCase):
+    """Списки API выполняются за постоянное число запросов (без N+1)"""
+
+    def assert_constant_queries(self, url, expected):
+        """expected запросов и для страницы из одной записи, и для полной"""
+        separator = '&' if '?' in url else '?'
+        for page_size in (1, 50):
+            with self.assertNumQueries(expected):
+                response = self.client.get(f'{url}{separator}page_size={page_size}')
+            self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_collections(self):
+        data = self.assert_constant_queries('/api/collections/', 2)
+        counts = {item['code']: item['strain_count'] for item in data['results']}
+        self.assertEqual(counts, {'AAA': 4, 'BBB': 4, 'CCC': 4})
+        self.assertEqual(data['results'][0]['curator_name'], 'Иван Петров')
+
+    def test_collection_strains(self):
+        data = self.assert_constant_queries(f'/api/collections/{self.collection.pk}/strains/', 4)
+        self.assertEqual(data['count'], 4)
+
+    def test_strains(self):
+        self.assert_constant_queries('/api/strains/', 2)
+        self.assert_constant_queries('/api/strains/extremophiles/', 2)
+        self.assert_constant_queries('/api/strains/baikal/', 2)
+
+    def test_strains_full_serializer(self):
+        data = self.assert_constant_queries('/api/strains/?exclude=description', 3)
+        for item in data['results']:
+            self.assertEqual(item['genome_count'], len(item['genome_sequences']))
+        self.assertEqual(sum(item['genome_count'] for item in data['results']), 15)
+
+    def test_genome_sequences(self):
+        data = self.assert_constant_queries('/api/genome-sequences/', 2)
+        self.assertFalse(data['results'][0]['has_sequence'])
+
+    def test_publications(self):
+        data = self.assert_constant_queries('/api/publications/', 3)
+        for item in data['results']:
+            self.assertEqual(item['strain_count'], 7)
+            self.assertEqual(len(item['related_strains']), RELATED_STRAINS_LIMIT)
+
+    def test_advanced_search(self):
+        self.assert_constant_queries('/api/search/?organism_type=bacteria', 2)
+
+    def test_cursor_pagination_has_no_count(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/strains/?pagination=cursor&page_size=5')
+        self.assertEqual(len(queries), 1)
+        seen = [item['id'] for item in response.json()['results']]
+        while response.json()['next']:
+            response = self.client.get(response.json()['next'])
+            seen += [item['id'] for item in response.json()['results']]
+        self.assertEqual(sorted(seen), sorted(str(strain.pk) for strain in self.strains))
+
+
+class CursorTests(CatalogTestCase):
+    """Курсоры списков и продолжаемых выгрузок"""
+
+    bad_cursors = [
+        'not-base64!', encode_cursor(['AAA', '000']),
+        encode_cursor(['a', 'b', 'notauuid']), encode_cursor(['AAA', None, 'notauuid']),
+    ]
+
+    def test_bad_cursor(self):
+        for cursor in self.bad_cursors:
+            for url in ('/api/strains/', '/api/export/csv/', '/api/strains/export_csv/'):
+                response = self.client.get(url, {'cursor': cursor})
+                self.assertEqual(response.status_code, 404, (url, cursor))
+        response = self.client.get(
+            '/api/genome-sequences/', {'cursor': encode_cursor(['2021-13-01', 'x'])}
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_resumable_export(self):
+        numbers = []
+        params = {'limit': 5}
+        while True:
+            response = self.client.get('/api/export/csv/', params)
+            rows = list(csv.reader(io.StringIO(response_body(response).decode('utf-8-sig'))))
+            numbers += [row[1] for row in rows[1:]]
+            if NEXT_CURSOR_HEADER not in response:
+                break
+            params['cursor'] = response[NEXT_CURSOR_HEADER]
+        self.assertEqual(len(numbers), 12)
+        self.assertEqual(numbers[:4], ['000', '003', '006', '009'])
+
+
+class SparseFieldsetTests(CatalogTestCase):
+    """?fields= и ?exclude= ограничивают вывод и колонки запроса"""
+
+    def get(self, url, params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json(), [query['sql'] for query in queries]
+
+    def test_list_serializer_by_default(self):
+        data, _ = self.get('/api/strains/', {})
+        self.assertEqual(list(data['results'][0]), StrainListSerializer.Meta.fields)
+
+    def test_fields(self):
+        data, queries = self.get(
+            '/api/strains/', {'fields': 'scientific_name,full_name', 'pagination': 'cursor'}
+        )
+        self.assertEqual(list(data['results'][0]), ['full_name', 'scientific_name'])
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('"description"', queries[0])
+        self.assertNotIn('"catalog_collection"', queries[0])
+
+    def test_exclude(self):
+        data, queries = self.get(
+            f'/api/strains/{self.strains[0].pk}/', {'exclude': 'genome_sequences,description'}
+        )
+        self.assertNotIn('genome_sequences', data)
+        self.assertNotIn('description', data)
+        self.assertEqual(data['genome_count'], 1)
+        self.assertFalse(any('"catalog_genomesequence"."accession_number"' in sql
+                             for sql in queries))
+
+    def test_nested_fields_are_prefetched(self):
+        data, queries = self.get(
+            '/api/strains/',
+            {'fields': 'strain_number,genome_sequences', 'ordering': 'strain_number', 'page_size': 3}
+        )
+        self.assertEqual([len(item['genome_sequences']) for item in data['results']], [1, 2, 3])
+        self.assertEqual(len(queries), 3)
+
+    def test_unknown_field(self):
+        response = self.client.get('/api/strains/', {'fields': 'scientific_name,secret'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('secret', response.json()['fields'])
+
+
+class FastSerializerTests(CatalogTestCase):
+    """FastSerializer выводит тот же JSON, что и сериализаторы DRF"""
+
+    def assert_same_json(self, serializer_class, fields=None):
+        queryset = Strain.objects.select_related('collection').order_by(
+            'collection_code', 'strain_number'
+        )
+        fast = compile_serializer(serializer_class, fields)
+        self.assertIsNotNone(fast)
+        renderer = JSONRenderer()
+        self.assertEqual(
+            renderer.render(fast.serialize(fast.rows(queryset))),
+            renderer.render(serializer_class(queryset, many=True, context={'fields': fields}).data)
+        )
+
+    def test_list_serializer(self):
+        self.assert_same_json(StrainListSerializer)
+
+    def test_search_serializer(self):
+        self.assert_same_json(StrainSearchSerializer)
+
+    def test_sparse_fields(self):
+        fields = [
+            name for name in StrainSerializer.Meta.fields
+            if name not in ('genome_sequences', 'genome_count')
+        ]
+        self.assert_same_json(StrainSerializer, fields)
+
+    def test_fields_without_conversion(self):
+        self.assert_same_json(StrainSerializer, ['strain_number'])
+        self.assert_same_json(StrainSerializer, ['strain_number', 'genus', 'is_psychrophile'])
+
+    def test_nested_fields_are_not_compiled(self):
+        self.assertIsNone(compile_serializer(StrainSerializer))
+
+
+class ORJSONRendererTests(CatalogTestCase):
+    """ORJSONRenderer выводит тот же JSON, что и JSONRenderer DRF"""
+
+    def test_api_payloads(self):
+        for url in ('/api/strains/?exclude=description', '/api/collections/',
+                    '/api/publications/', '/api/search/'):
+            data = self.client.get(url).data
+            self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data), url)
+
+    def test_indent_is_rendered_by_drf(self):
+        data = {'id': self.collection.pk, 'codes': ['AAA', 'BBB']}
+        self.assertEqual(
+            ORJSONRenderer().render(data, 'application/json; indent=2'),
+            JSONRenderer().render(data, 'application/json; indent=2')
+        )
+
+
+class ConditionalResponseTests(CatalogTestCase):
+    """ETag и Last-Modified по версиям данных каталога"""
+
+    def test_not_modified_without_queries(self):
+        response = self.client.get('/api/strains/')
+        with self.assertNumQueries(0):
+            not_modified = self.client.get('/api/strains/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified['ETag'], response['ETag'])
+
+    def test_etag_depends_on_query_and_data(self):
+        etag = self.client.get('/api/publications/')['ETag']
+        self.assertNotEqual(self.client.get('/api/publications/?year=2020')['ETag'], etag)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.strains[0].publications.clear()
+        response = self.client.get('/api/publications/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_if_modified_since_is_not_answered(self):
+        # Изменение в ту же секунду не меняет Last-Modified
+        last_modified = self.client.get('/api/strains/')['Last-Modified']
+        response = self.client.get('/api/strains/', HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 200)
+
+    def test_version_changes_after_commit(self):
+        etag = self.client.get('/api/strains/')['ETag']
+        strain = Strain.objects.get(pk=self.strains[0].pk)
+        strain.scientific_name = 'Bacillus renamed'
+        with self.captureOnCommitCallbacks() as callbacks:
+            strain.save()
+        # До фиксации транзакции прежний ETag остается действительным
+        response = self.client.get('/api/strains/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        for callback in callbacks:
+            callback()
+        response = self.client.get('/api/strains/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+class ResponseCacheTests(CatalogTestCase):
+    """Повторные запросы отдаются из кэша, изменения данных его сбрасывают"""
+
+    def test_repeated_search_without_queries(self):
+        url = '/api/search/?organism_type=bacteria&page_size=5'
+        response = self.client.get(url)
+        with self.assertNumQueries(0):
+            cached = self.client.get('/api/search/?page_size=5&organism_type=bacteria')
+        self.assertEqual(cached.content, response.content)
+        self.assertEqual(cached['ETag'], response['ETag'])
+
+    def test_save_invalidates(self):
+        url = f'/api/strains/{self.strains[0].pk}/'
+        self.client.get(url)
+        strain = Strain.objects.get(pk=self.strains[0].pk)
+        strain.scientific_name = 'Bacillus renamed'
+        with self.captureOnCommitCallbacks(execute=True):
+            strain.save()
+        self.assertEqual(self.client.get(url).json()['scientific_name'], 'Bacillus renamed')
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class StampedeTests(SimpleTestCase):
+    """Истекший ключ пересчитывает один поток, остальные ждут результата"""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_single_recompute(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return 'stats'
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(get_or_recompute('hot', compute, 60)))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ['stats'] * 8)
+
+    def test_stale_value_while_locked(self):
+        cache.set('hot', ('old', 1.0, time.time() - 1), 60)
+        cache.add(LOCK_KEY.format('hot'), True, 60)
+        self.assertEqual(get_or_recompute('hot', lambda: 'new', 60), 'old')
+
+
+class ProcessLocalCacheTests(CatalogTestCase):
+    """С кэшем в памяти процесса версии не общие: ETag и кэш ответов отключены"""
+
+    @override_settings(CATALOG_SHARED_CACHE=None)
+    def test_no_etag_or_cached_responses(self):
+        self.assertFalse(shared_versions())
+        for url in ('/api/strains/', '/api/export/csv/?limit=5', '/api/stats/'):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, url)
+            self.assertFalse(response.has_header('ETag'), url)
+            with CaptureQueriesContext(connection) as queries:
+                response_body(self.client.get(url))
+            self.assertTrue(queries, url)
+
+
+class ExportCacheTests(CatalogTestCase):
+    """Повторная выгрузка отдается из кэша"""
+
+    def test_repeated_export(self):
+        response = self.client.get('/api/export/csv/?limit=5')
+        with self.assertNumQueries(0):
+            cached = self.client.get('/api/export/csv/?limit=5')
+        self.assertEqual(cached.content, response.content)
+        self.assertEqual(cached['Content-Disposition'], 'attachment; filename="strains.csv"')
+        self.assertEqual(cached['X-Next-Cursor'], response['X-Next-Cursor'])
+
+    @override_settings(CATALOG_EXPORT_CACHE_MAX_ROWS=5)
+    def test_large_export_streams_once(self):
+        export_response = ExportAPIView.export_response
+        with mock.patch.object(
+            ExportAPIView, 'export_response', autospec=True, side_effect=export_response
+        ) as patched:
+            small = self.client.get('/api/export/json/?limit=5')
+            self.assertFalse(small.streaming)
+            for _ in range(2):
+                response = self.client.get('/api/export/json/')
+                self.assertTrue(response.streaming)
+                self.assertEqual(len(json.loads(response_body(response))), 12)
+            # Подсчет строк выполняется один раз, каждая выгрузка - тоже
+            with self.assertNumQueries(1):
+                response_body(self.client.get('/api/export/json/'))
+        self.assertEqual(patched.call_count, 4)
+
+
+class LocalCacheTests(CatalogTestCase):
+    """Кэш в памяти процесса перед общим кэшем"""
+
+    def test_lru_limits(self):
+        lru = LocalLRUCache(max_entries=2, timeout=60)
+        lru.set('a', 1)
+        lru.set('b', 2)
+        lru.get('a')
+        lru.set('c', 3)
+        self.assertEqual((lru.get('a'), lru.get('b'), lru.get('c')), (1, None, 3))
+        # Значение, прочитанное до инвалидации, не сохраняется
+        generation = lru.generation
+        lru.delete_many(['a'])
+        lru.set('a', 'stale', generation)
+        self.assertIsNone(lru.get('a'))
+
+    def test_socket_invalidation(self):
+        directory = tempfile.mkdtemp()
+        received = []
+        delivered = threading.Event()
+        SocketTransport(directory, 'receiver').start(
+            lambda keys: (received.extend(keys), delivered.set())
+        )
+        SocketTransport(directory, 'sender').publish(['catalog:version:strains'])
+        self.assertTrue(delivered.wait(5))
+        self.assertEqual(received, ['catalog:version:strains'])
+
+    def test_hot_responses_without_shared_cache(self):
+        for url in ('/api/collections/', '/api/stats/'):
+            response = self.client.get(url)
+            with mock.patch.object(caches['default'], 'get', side_effect=AssertionError), \
+                    mock.patch.object(caches['default'], 'get_many', side_effect=AssertionError), \
+                    self.assertNumQueries(0):
+                cached = self.client.get(url)
+            self.assertEqual(cached.content, response.content, url)
+        with self.captureOnCommitCallbacks(execute=True):
+            Collection.objects.create(
+                name='Коллекция DDD', code='DDD', collection_type='bacteria',
+                description='', established_date=date(2000, 1, 1)
+            )
+        response = self.client.get('/api/collections/?ordering=code')
+        codes = [item['code'] for item in response.json()['results']]
+        self.assertEqual(codes, ['AAA', 'BBB', 'CCC', 'DDD'])
+
+    def test_l1_only_in_server_processes(self):
+        with mock.patch('catalog.local_cache.listener_pid', None):
+            get_version(STRAINS)
+            with mock.patch.object(caches['default'], 'get_many', wraps=cache.get_many) as get_many:
+                get_version(STRAINS)
+            get_many.assert_called_once()
+
+
+class GeoTests(CatalogTestCase):
+    """Кластеры и точки штаммов для карты"""
+
+    def test_clusters(self):
+        data = self.client.get('/api/strains/geo/?zoom=6&bbox=100,50,110,60').json()
+        self.assertTrue(data['clustered'])
+        self.assertEqual(sum(feature['properties']['count'] for feature in data['features']), 9)
+        clusters = [feature['properties'] for feature in data['features']]
+        self.assertEqual({cluster['dominant_habitat'] for cluster in clusters}, {'baikal_deep'})
+        self.assertEqual(
+            sum(cluster['extremophiles']['psychrophile'] for cluster in clusters),
+            sum(1 for strain in self.strains[:9] if strain.is_psychrophile)
+        )
+
+    def test_features(self):
+        with self.assertNumQueries(2):
+            data = self.client.get('/api/strains/geo/?zoom=14&bbox=100,50,110,54').json()
+        self.assertFalse(data['clustered'])
+        self.assertEqual(
+            [feature['properties']['full_name'] for feature in data['features']],
+            ['AAA-000', 'BBB-001', 'CCC-002']
+        )
+        self.assertEqual(data['features'][0]['geometry']['coordinates'], [104.8, 51.85])
+
+    def test_payload_is_bounded(self):
+        with mock.patch('catalog.views.GEO_MAX_FEATURES', 2):
+            data = self.client.get('/api/strains/geo/?zoom=14&bbox=100,50,110,54').json()
+        self.assertTrue(data['clustered'])
+        with mock.patch('catalog.geo.GEO_MAX_CLUSTERS', 4):
+            data = self.client.get('/api/strains/geo/?zoom=12').json()
+        self.assertLessEqual(len(data['features']), 4)
+
+    def test_cluster_center_across_antimeridian(self):
+        strains = Strain.objects.filter(pk__in=[self.strains[0].pk, self.strains[1].pk])
+        strains.filter(pk=self.strains[0].pk).update(latitude=Decimal('60'), longitude=Decimal('179.9'))
+        strains.filter(pk=self.strains[1].pk).update(latitude=Decimal('60'), longitude=Decimal('-179.9'))
+        clusters = strain_clusters(strains, 1)
+        self.assertEqual(
+            sorted(cluster['geometry']['coordinates'][0] for cluster in clusters), [-179.9, 179.9]
+        )
+        # Ячейка с точками по обе стороны меридиана (геохеш задан явно)
+        strains.update(geohash='zzzzzzzz')
+        [cluster] = strain_clusters(strains, 1)
+        self.assertAlmostEqual(abs(cluster['geometry']['coordinates'][0]), 180, places=4)
+
+    def cells(self, bbox):
+        data = self.client.get(f'/api/strains/geo/?zoom=3&bbox={bbox}').json()
+        self.assertTrue(data['clustered'])
+        return {
+            feature['properties']['geohash']: feature['properties']['count']
+            for feature in data['features']
+        }
+
+    def test_bulk_changes_move_strains(self):
+        etag = self.client.get('/api/strains/geo/?zoom=3&bbox=0,0,10,10')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            Strain.objects.filter(pk=self.strains[0].pk).update(latitude=Decimal('1.5'))
+        self.assertEqual(self.cells('104,0,105,10'), {'w2': 1})
+        strain = Strain.objects.get(pk=self.strains[1].pk)
+        strain.latitude, strain.longitude = Decimal('2.5'), Decimal('3.5')
+        Strain.objects.bulk_update([strain], ['latitude', 'longitude'])
+        with self.captureOnCommitCallbacks(execute=True):
+            Strain.objects.bulk_create([Strain(
+                collection=self.collection, strain_number='100', scientific_name='Bacillus novus',
+                genus='Bacillus', species='novus', organism_type='bacteria',
+                isolation_source='Вода', habitat_type='baikal_deep',
+                geographic_location='оз. Байкал', deposit_date=date(2020, 1, 1),
+                latitude=Decimal('4.5'), longitude=Decimal('5.5')
+            )])
+        response = self.client.get('/api/strains/geo/?zoom=3&bbox=0,0,10,10', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.cells('0,0,10,10'), {'s0': 2})
+
+
+class CollectionCodeTests(CatalogTestCase):
+    """Денормализованный код коллекции для сортировки и EXPLAIN запросов API"""
+
+    def codes(self):
+        return set(Strain.objects.values_list('collection__code', 'collection_code'))
+
+    def test_code_follows_collection(self):
+        self.assertEqual(self.codes(), {('AAA', 'AAA'), ('BBB', 'BBB'), ('CCC', 'CCC')})
+        collection = Collection.objects.get(pk=self.collection.pk)
+        collection.code = 'AAB'
+        collection.save()
+        strain = Strain.objects.get(pk=self.strains[1].pk)
+        strain.collection = collection
+        strain.save(update_fields=['collection'])
+        self.assertEqual(self.codes(), {('AAB', 'AAB'), ('BBB', 'BBB'), ('CCC', 'CCC')})
+        strains = self.client.get('/api/strains/?ordering=collection_code').json()['results']
+        self.assertEqual(strains[0]['full_name'], 'AAB-000')
+
+    def test_bulk_changes(self):
+        collection = Collection.objects.get(code='BBB')
+        Strain.objects.filter(pk=self.strains[0].pk).update(collection=collection)
+        strain = Strain.objects.get(pk=self.strains[2].pk)
+        strain.collection = self.collection
+        Strain.objects.bulk_update([strain], ['collection'])
+        self.assertEqual(self.codes(), {('AAA', 'AAA'), ('BBB', 'BBB'), ('CCC', 'CCC')})
+        self.assertEqual(Strain.objects.get(pk=self.strains[0].pk).collection_code, 'BBB')
+        self.assertEqual(Strain.objects.get(pk=self.strains[2].pk).collection_code, 'AAA')
+
+    def test_explain_queries(self):
+        output = io.StringIO()
+        call_command('explain_queries', stdout=output)
+        for title in ('GET /api/strains/', 'GET /api/genome-sequences/', 'GET /api/export/csv/',
+                      f'GET /api/collections/{self.collection.pk}/strains/'):
+            self.assertIn(title, output.getvalue())
+
+
+class StatisticsTests(CatalogTestCase):
+    """Статистика API совпадает с подсчетом по штаммам"""
+
+    def count(self, predicate):
+        return sum(1 for strain in self.strains if predicate(strain))
+
+    def test_statistics_action(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for strain, genome_size, gc_content in (
+                (self.strains[0], 4000000, Decimal('40.5')),
+                (self.strains[1], 5000000, Decimal('60.5')),
+            ):
+                strain = Strain.objects.get(pk=strain.pk)
+                strain.genome_size, strain.gc_content = genome_size, gc_content
+                strain.save()
+        data = self.client.get('/api/strains/statistics/').json()
+        self.assertEqual(data['total_strains'], 12)
+        self.assertEqual(data['collections_count'], 3)
+        self.assertEqual(data['extremophiles'], {
+            'psychrophiles': self.count(lambda strain: strain.is_psychrophile),
+            'thermophiles': 0, 'halophiles': 0, 'acidophiles': 0, 'alkaliphiles': 0,
+            'barophiles': self.count(lambda strain: strain.is_barophile),
+        })
+        self.assertEqual(data['biotechnology'], {
+            'antibiotic_producers': 0,
+            'enzyme_producers': self.count(lambda strain: strain.produces_enzymes),
+            'nitrogen_fixers': self.count(lambda strain: strain.nitrogen_fixation),
+            'metabolite_producers': 0,
+        })
+        self.assertEqual(data['habitat_distribution'], {dict(Strain.HABITAT_TYPES)['baikal_deep']: 12})
+        self.assertEqual(data['organism_types'], {'Бактерии': 12})
+        self.assertEqual(data['genomics']['avg_genome_size'], 4500000)
+        self.assertEqual(Decimal(str(data['genomics']['avg_gc_content'])), Decimal('50.5'))
+
+    def test_stats_view(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            strain = Strain.objects.get(pk=self.strains[3].pk)
+            strain.is_available = False
+            strain.save()
+        available = [strain for strain in self.strains if strain.pk != self.strains[3].pk]
+        self.assertEqual(self.client.get('/api/stats/').json(), {
+            'total_collections': 3,
+            'total_strains': 11,
+            'total_extremophiles': sum(1 for strain in available if strain.is_extremophile),
+            'baikal_strains': 11,
+            'genome_sequenced': sum(1 for strain in available if strain.has_genome_sequence),
+            'biotech_potential': sum(1 for strain in available if strain.has_biotech_potential),
+        })
+
+
+class StatsSnapshotTests(CatalogTestCase):
+    """Снимок статистики, обновляемый приращениями, совпадает с пересчетом"""
+
+    def assert_snapshot_is_live(self):
+        snapshot = get_stats_snapshot()
+        live = compute_strain_statistics()
+        for field in CatalogStatsSnapshot.COUNTER_FIELDS:
+            value, expected = getattr(snapshot, field), live[field]
+            if isinstance(value, dict):
+                # Нулевые счетчики распределений не различаются
+                value = {key: count for key, count in value.items() if count}
+                expected = {key: count for key, count in expected.items() if count}
+            self.assertEqual(value, expected, field)
+        self.assertEqual(snapshot.total_collections, Collection.objects.count())
+
+    def test_save_and_delete(self):
+        self.assert_snapshot_is_live()
+        strain = Strain.objects.get(pk=self.strains[1].pk)
+        strain.is_psychrophile = True
+        strain.habitat_type = 'soil'
+        strain.genome_size = 4200000
+        strain.save()
+        self.assert_snapshot_is_live()
+        strain.is_available = False
+        strain.save()
+        self.assert_snapshot_is_live()
+        Strain.objects.get(pk=self.strains[2].pk).delete()
+        self.assert_snapshot_is_live()
+
+    def test_update(self):
+        strains = Strain.objects.filter(pk__in=[self.strains[0].pk, self.strains[2].pk])
+        strains.update(is_psychrophile=False, is_thermophile=True)
+        self.assert_snapshot_is_live()
+        Strain.objects.filter(pk=self.strains[4].pk).update(is_available=False)
+        self.assert_snapshot_is_live()
+
+    def test_bulk_update(self):
+        strains = list(Strain.objects.filter(collection=self.collection))
+        for strain in strains:
+            strain.produces_antibiotics = True
+            strain.gc_content = Decimal('51.5')
+        with mock.patch(
+            'catalog.statistics.rebuild_stats_snapshot', wraps=rebuild_stats_snapshot
+        ) as rebuild:
+            Strain.objects.bulk_update(strains, ['produces_antibiotics'], batch_size=2)
+        # Один пересчет снимка на весь bulk_update, а не на каждую пачку
+        self.assertEqual(rebuild.call_count, 1)
+        self.assert_snapshot_is_live()
+        Strain.objects.bulk_update(strains, ['gc_content'])
+        self.assert_snapshot_is_live()
+
+    def test_bulk_create(self):
+        etag = self.client.get('/api/stats/')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            Strain.objects.bulk_create(
+                Strain(
+                    collection=self.collection, strain_number=f'1{number:02d}',
+                    scientific_name='Bacillus novus', genus='Bacillus', species='novus',
+                    organism_type='bacteria', isolation_source='Почва', habitat_type='soil',
+                    geographic_location='Иркутск', deposit_date=date(2020, 1, 1),
+                    is_thermophile=True, produces_antibiotics=True
+                )
+                for number in range(3)
+            )
+        self.assert_snapshot_is_live()
+        response = self.client.get('/api/stats/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['total_strains'], len(self.strains) + 3)
+
+    def test_update_bumps_version_on_commit(self):
+        etag = self.client.get('/api/stats/')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            Strain.objects.filter(pk=self.strains[0].pk).update(is_available=False)
+        response = self.client.get('/api/stats/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['total_strains'], len(self.strains) - 1)
+
+    def test_collection_changes(self):
+        self.collection.is_active = False
+        self.collection.save()
+        self.assertEqual(get_stats_snapshot().total_collections, 2)
+        self.collection.is_active = True
+        self.collection.save()
+        Collection.objects.get(code='BBB').delete()
+        self.assert_snapshot_is_live()
+
+
+def response_body(response):
+    if response.streaming:
+        return b''.join(response.streaming_content)
+    return response.content
+
+
+class ExportTests(CatalogTestCase):
+    """Потоковые выгрузки штаммов"""
+
+    def test_csv_header_before_rows(self):
+        def rows():
+            raise AssertionError('строки читаются до отправки заголовка')
+            yield
+
+        self.assertEqual(next(stream_csv(['a', 'b'], rows())), 'a,b\r\n')
+
+    def test_strains_csv(self):
+        response = self.client.get('/api/strains/export_csv/?is_psychrophile=true')
+        self.assertEqual(response.status_code, 200)
+        rows = list(csv.reader(io.StringIO(response_body(response).decode('utf-8'))))
+        self.assertEqual(rows[0][:2], ['Штамм', 'Научное название'])
+        self.assertEqual(len(rows) - 1, sum(1 for strain in self.strains if strain.is_psychrophile))
+        self.assertEqual(rows[1][0], 'AAA-000')
+        self.assertEqual(rows[1][11], 'Да')
+
+    def test_export_csv(self):
+        response = self.client.get('/api/export/csv/')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="strains.csv"')
+        rows = list(csv.reader(io.StringIO(response_body(response).decode('utf-8'))))
+        self.assertEqual(len(rows) - 1, len(self.strains))
+        self.assertEqual(rows[1][:2], ['AAA', '000'])
+        self.assertEqual(rows[1][3], dict(Strain.ORGANISM_TYPES)['bacteria'])
+
+    def test_export_json(self):
+        response = self.client.get('/api/export/json/?organism_type=bacteria')
+        self.assertEqual(response['Content-Type'], 'application/json')
+        records = json.loads(response_body(response))
+        self.assertEqual(len(records), len(self.strains))
+        self.assertEqual(records[0]['collection'], 'AAA')
+        self.assertEqual(records[0]['coordinates'], {'latitude': 51.85, 'longitude': 104.8})
+
+    def test_export_ndjson(self):
+        response = self.client.get('/api/export/ndjson/?limit=5')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = response_body(response).decode('utf-8').splitlines()
+        records = [json.loads(line) for line in lines]
+        self.assertEqual(len(records), 5)
+        self.assertEqual(
+            records[0]['extremophile_properties']['is_psychrophile'],
+            self.strains[0].is_psychrophile
+        )
+
+    def test_empty_json_array(self):
+        response = self.client.get('/api/export/json/?organism_type=fungi')
+        self.assertEqual(json.loads(response_body(response)), [])
+
+
+@override_settings(SEQUENCE_STORE_OFFLOAD=False)
+class FastaExportTests(CatalogTestCase):
+    """Выгрузка геномных последовательностей в FASTA"""
+
+    def setUp(self):
+        super().setUp()
+        GenomeSequence.objects.filter(accession_number='ACC0000').update(
+            sequence_data='>ACC0000\n' + 'ACGT' * 40 + '\nGG\n'
+        )
+        GenomeSequence.objects.filter(accession_number='ACC0010').update(sequence_data='ttaa')
+
+    def test_fasta(self):
+        response = self.client.get('/api/strains/export_fasta/?line_width=60')
+        self.assertEqual(
+            response['Content-Disposition'], 'attachment; filename="sequences_export.fasta"'
+        )
+        lines = response_body(response).decode('ascii').splitlines()
+        self.assertTrue(lines[0].startswith('>ACC0000 AAA-000 Bacillus species0 [type=draft]'))
+        self.assertEqual([len(line) for line in lines[1:4]], [60, 60, 42])
+        self.assertEqual(''.join(lines[1:4]), 'ACGT' * 40 + 'GG')
+        self.assertTrue(lines[4].startswith('>ACC0010 BBB-001'))
+        self.assertEqual(lines[5], 'ttaa')
+
+    def test_filters(self):
+        response = self.client.get(f'/api/strains/export_fasta/?collection={self.collection.pk}')
+        headers = [
+            line for line in response_body(response).decode('ascii').splitlines()
+            if line.startswith('>')
+        ]
+        self.assertEqual(len(headers), 1)
+        response = self.client.get('/api/strains/export_fasta/?sequence_type=complete')
+        self.assertEqual(response_body(response), b'')
+
+    def test_line_width(self):
+        response = self.client.get('/api/strains/export_fasta/?line_width=70')
+        self.assertEqual(response.status_code, 400)
+
+
+class SequenceStoreTestCase(CatalogTestCase):
+    """Хранилище последовательностей с маленькими чанками во временном каталоге"""
+
+    def setUp(self):
+        super().setUp()
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root, ignore_errors=True)
+        store_settings = override_settings(
+            SEQUENCE_STORE_OFFLOAD=True,
+            SEQUENCE_STORE={
+                'BACKEND': 'catalog.sequence_store.LocalChunkStore',
+                'OPTIONS': {'root': root, 'chunk_size': 64},
+            }
+        )
+        store_settings.enable()
+        self.addCleanup(store_settings.disable)
+        get_sequence_store.cache_clear()
+        self.addCleanup(get_sequence_store.cache_clear)
+        self.root = Path(root)
+
+    def store_sequence(self, sequence, accession='ACC0000'):
+        genome_sequence = GenomeSequence.objects.get(accession_number=accession)
+        genome_sequence.sequence_data = sequence
+        genome_sequence.save()
+        return genome_sequence
+
+
+class SequenceStoreTests(SequenceStoreTestCase):
+    """Перенос последовательностей во внешнее хранилище чанков"""
+
+    def test_chunks_round_trip(self):
+        store = get_sequence_store()
+        sequence = 'ACGT' * 40 + 'ACGT' * 16 + 'NNAC'
+        handle, length, checksum = store.put(sequence)
+        self.assertEqual((length, checksum), (len(sequence), handle))
+        self.assertEqual(store.get(handle), sequence)
+        self.assertEqual(''.join(store.iter_chunks(handle)), sequence)
+        # Одинаковые чанки хранятся один раз
+        self.assertEqual(len(store.manifest(handle)['chunks']), 4)
+        self.assertEqual(len(list((self.root / 'chunks').glob('*/*.z'))), 2)
+        self.assertEqual(store.put(sequence)[0], handle)
+
+    def test_offload_on_save(self):
+        sequence = 'GATTACA' * 30
+        self.store_sequence('>ACC0000 header\n' + sequence)
+        row = GenomeSequence.objects.get(accession_number='ACC0000')
+        self.assertEqual(row.sequence_data, '')
+        self.assertEqual(row.stored_length, len(sequence))
+        self.assertEqual(row.get_sequence(), sequence)
+        self.assertEqual(row.sequence_checksum, sequence_checksum(sequence))
+
+    def test_non_iupac_characters(self):
+        row = self.store_sequence('ACGT–AC gtÄ')
+        self.assertEqual(row.get_sequence(), 'ACGTNACgtN')
+        response = self.client.get('/api/strains/export_fasta/')
+        self.assertIn('ACGTNACgtN', response_body(response).decode('ascii'))
+
+    def test_offload_command_follows_setting(self):
+        GenomeSequence.objects.filter(accession_number='ACC0010').update(sequence_data='ACGT')
+        with override_settings(SEQUENCE_STORE_OFFLOAD=False):
+            with self.assertRaises(CommandError):
+                call_command('offload_sequences', stdout=io.StringIO())
+        self.assertEqual(
+            GenomeSequence.objects.get(accession_number='ACC0010').sequence_data, 'ACGT'
+        )
+        call_command('offload_sequences', stdout=io.StringIO())
+        row = GenomeSequence.objects.get(accession_number='ACC0010')
+        self.assertEqual((row.sequence_data, row.get_sequence()), ('', 'ACGT'))
+
+    def test_sequence_data_is_opt_in_in_lists(self):
+        sequence = 'GATTACA' * 30
+        self.store_sequence(sequence)
+        item = self.client.get('/api/genome-sequences/?search=ACC0000').json()['results'][0]
+        self.assertNotIn('sequence_data', item)
+        self.assertTrue(item['has_sequence'])
+        url = '/api/genome-sequences/?include_sequence=true&sequence_type=draft'
+        data = {item['accession_number']: item for item in self.client.get(url).json()['results']}
+        self.assertEqual(data['ACC0000']['sequence_data'], sequence)
+        self.assertEqual(data['ACC0010']['sequence_data'], '')
+
+
+class SequenceRegionTests(SequenceStoreTestCase):
+    """Участки последовательности и заголовок Range"""
+
+    sequence = 'ACGTTGCA' * 20 + 'NNNNacgt'
+
+    def setUp(self):
+        super().setUp()
+        self.url = f'/api/genome-sequences/{self.store_sequence(self.sequence).pk}/sequence/'
+
+    def test_region(self):
+        response = self.client.get(f'{self.url}?start=60&end=75')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response.content.decode(), self.sequence[60:75])
+        response = self.client.get(f'{self.url}?start=150')
+        self.assertEqual(response.content.decode(), self.sequence[150:])
+
+    def test_reverse_strand(self):
+        response = self.client.get(f'{self.url}?start=156&end=168&strand=-')
+        self.assertEqual(response.content.decode(), 'acgtNNNNTGCA')
+
+    def test_byte_range(self):
+        response = self.client.get(f'{self.url}?start=10&end=30', HTTP_RANGE='bytes=2-5')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 2-5/20')
+        self.assertEqual(response.content.decode(), self.sequence[12:16])
+
+    def test_suffix_range(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-6')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 162-167/{len(self.sequence)}')
+        self.assertEqual(response.content.decode(), 'NNacgt')
+
+    def test_range_on_reverse_strand(self):
+        # Смещения Range отсчитываются в выдаваемой (обратной) цепи
+        response = self.client.get(
+            f'{self.url}?start=156&end=168&strand=-', HTTP_RANGE='bytes=0-3'
+        )
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response.content.decode(), 'acgt')
+
+    def test_unsatisfiable_range(self):
+        response = self.client.get(f'{self.url}?start=0&end=10', HTTP_RANGE='bytes=10-20')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */10')
+
+    def test_region_without_store(self):
+        sequence = GenomeSequence.objects.get(accession_number='ACC0010')
+        GenomeSequence.objects.filter(pk=sequence.pk).update(sequence_data='AACCGGTT')
+        url = f'/api/genome-sequences/{sequence.pk}/sequence/?start=2&end=6&strand=-'
+        self.assertEqual(self.client.get(url).content.decode(), 'CCGG')
+        self.assertEqual(self.client.get(f'{url}&start=9').status_code, 400)
+
+
+class NucleotideCodecTests(SimpleTestCase):
+    """2-битная упаковка нуклеотидов"""
+
+    sequences = [
+        '', 'A', 'ACG', 'ACGT' * 5, 'acgtNNNNNRYacgTTGCAnnnA', 'NNNN', 'GATTACAgattacaK',
+    ]
+
+    def assert_round_trip(self):
+        for sequence in self.sequences:
+            packed = nucleotide_codec.encode(sequence)
+            self.assertEqual(len(packed.data), -(-len(sequence) // 4))
+            self.assertEqual(nucleotide_codec.decode(packed), sequence)
+            restored = nucleotide_codec.from_buffer(nucleotide_codec.to_bytes(packed))
+            self.assertEqual(nucleotide_codec.decode(restored), sequence)
+            for start, end in ((1, 5), (3, 9), (6, 7), (5, 100), (20, 10)):
+                self.assertEqual(
+                    nucleotide_codec.decode(restored, start, end), sequence[start:end]
+                )
+
+    def test_round_trip(self):
+        self.assert_round_trip()
+
+    def test_round_trip_without_numpy(self):
+        with mock.patch.object(nucleotide_codec, 'np', None):
+            self.assert_round_trip()
+
+    def test_implementations_agree(self):
+        for sequence in self.sequences:
+            with mock.patch.object(nucleotide_codec, 'np', None):
+                expected = nucleotide_codec.encode(sequence)
+            self.assertEqual(nucleotide_codec.encode(sequence), expected)
+
+    def test_gc_content(self):
+        self.assertEqual(nucleotide_codec.gc_content(nucleotide_codec.encode('GCNNAT')), 50.0)
+        self.assertIsNone(nucleotide_codec.gc_content(nucleotide_codec.encode('NNN')))
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            nucleotide_codec.from_buffer(b'XXXX' + bytes(nucleotide_codec.HEADER.size))
+
+    def test_region_reads_only_overlapping_runs(self):
+        sequence = 'ACGTNacgt' * 2000
+        packed = nucleotide_codec.from_buffer(
+            nucleotide_codec.to_bytes(nucleotide_codec.encode(sequence))
+        )
+        self.assertEqual((len(packed.exceptions), len(packed.mask)), (2000, 2000))
+        get_run = nucleotide_codec._RunTable.__getitem__
+        with mock.patch.object(
+            nucleotide_codec._RunTable, '__getitem__', autospec=True, side_effect=get_run
+        ) as patched:
+            self.assertEqual(nucleotide_codec.decode(packed, 9000, 9020), sequence[9000:9020])
+        self.assertLess(patched.call_count, 50)
+
+
+class FullTextSearchTests(CatalogTestCase):
+    """Полнотекстовый поиск с сортировкой по релевантности"""
+
+    def setUp(self):
+        super().setUp()
+        described = Strain.objects.get(pk=self.strains[7].pk)
+        described.description = 'Близок к Bacillus psychrotolerans по морфологии'
+        described.save()
+        named = Strain.objects.get(pk=self.strains[4].pk)
+        named.scientific_name = 'Bacillus psychrotolerans'
+        named.species = 'psychrotolerans'
+        named.save()
+
+    def search(self, query):
+        response = self.client.get('/api/strains/', {'search': query})
+        self.assertEqual(response.status_code, 200)
+        return [item['strain_number'] for item in response.json()['results']]
+
+    def test_name_ranks_above_description(self):
+        self.assertEqual(self.search('psychrotolerans'), ['004', '007'])
+
+    def test_prefix_and_all_words(self):
+        self.assertEqual(self.search('psychro'), ['004', '007'])
+        self.assertEqual(self.search('psychrotolerans морфологии'), ['007'])
+
+    def test_explicit_ordering(self):
+        response = self.client.get(
+            '/api/strains/', {'search': 'psychrotolerans', 'ordering': '-strain_number'}
+        )
+        self.assertEqual(
+            [item['strain_number'] for item in response.json()['results']], ['007', '004']
+        )
+
+    def test_document_follows_collection(self):
+        self.collection.name = 'Коллекция термальных источников'
+        self.collection.save()
+        self.assertEqual(len(self.search('термальных')), 4)
+
+
+class FuzzySearchTests(CatalogTestCase):
+    """Нечеткий поиск по названиям (индекс триграмм в памяти процесса)"""
+
+    def search(self, **params):
+        response = self.client.get('/api/strains/', params)
+        self.assertEqual(response.status_code, 200)
+        return [item['strain_number'] for item in response.json()['results']]
+
+    def test_typo(self):
+        self.assertEqual(self.search(fuzzy='Bacilus specis7')[0], '007')
+        self.assertEqual(self.search(fuzzy='Pseudomonas'), [])
+
+    def test_limit_applies_after_filters(self):
+        with mock.patch('catalog.fuzzy.FUZZY_LIMIT', 3):
+            numbers = self.search(fuzzy='Bacilus', collection=self.strains[2].collection_id)
+        self.assertEqual(len(numbers), 3)
+        self.assertTrue(all(int(number) % 3 == 2 for number in numbers))
+
+    def test_index_follows_changes(self):
+        strain = Strain.objects.get(pk=self.strains[5].pk)
+        strain.scientific_name = 'Rhodococcus erythropolis'
+        strain.save()
+        self.assertEqual(self.search(fuzzy='Rodococcus'), ['005'])
+
+    def test_many_matches(self):
+        template = self.strains[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            Strain.objects.bulk_create([
+                Strain(
+                    collection=self.collection, strain_number=f'M{number:04d}',
+                    scientific_name=f'Bacillus species{number}', genus='Bacillus',
+                    species=f'species{number}', organism_type='bacteria',
+                    isolation_source='Вода', habitat_type='baikal_deep',
+                    geographic_location='оз. Байкал', deposit_date=template.deposit_date
+                )
+                for number in range(1100)
+            ])
+        with CaptureQueriesContext(connection) as queries:
+            numbers = self.search(fuzzy='Bacilus', collection=self.strains[2].collection_id)
+        self.assertEqual(sorted(numbers), ['002', '005', '008', '011'])
+        # Первичные ключи передаются частями, а не все совпадения сразу
+        self.assertLessEqual(
+            max(len(re.findall('[0-9a-f]{32}', query['sql'])) for query in queries),
+            fuzzy.FUZZY_BATCH_SIZE + 1
+        )
+
+
+class FacetTests(CatalogTestCase):
+    """Фасеты списка штаммов считаются по отфильтрованному набору"""
+
+    def counts(self, facet):
+        return {item['value']: item['count'] for item in facet}
+
+    def test_facet_counts(self):
+        response = self.client.get(
+            '/api/strains/?is_psychrophile=true&facets=organism_type,collection,extremophile,biotech'
+        )
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        facets = data['facets']
+        self.assertEqual(data['count'], 6)
+        self.assertEqual(self.counts(facets['organism_type']), {'bacteria': 6})
+        self.assertEqual(
+            [(item['label'], item['count']) for item in facets['collection']],
+            [('AAA', 2), ('BBB', 2), ('CCC', 2)]
+        )
+        extremophile = self.counts(facets['extremophile'])
+        self.assertEqual((extremophile['psychrophile'], extremophile['barophile']), (6, 3))
+        self.assertEqual(extremophile['thermophile'], 0)
+        biotech = self.counts(facets['biotech'])
+        self.assertEqual((biotech['enzymes'], biotech['nitrogen_fixation']), (2, 2))
+        self.assertNotIn('habitat_type', facets)
+
+    def test_facets_use_two_queries(self):
+        with self.assertNumQueries(2):
+            self.client.get('/api/strains/?page_size=5')
+        cache.clear()
+        local_cache.clear()
+        with self.assertNumQueries(4):
+            self.client.get('/api/strains/?page_size=5&facets=habitat_type,collection,extremophile')
+
+    def test_unknown_facet(self):
+        response = self.client.get('/api/strains/?facets=color')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('available_facets', response.json())
+
+
+class TraitTests(CatalogTestCase):
+    """traits и производные флаги при save(), update() и bulk_update()"""
+
+    def assert_traits_consistent(self):
+        for strain in Strain.objects.all():
+            expected = Strain(**{
+                field: getattr(strain, field) for field in Strain.TRAIT_FIELDS
+            })
+            expected.sync_traits()
+            for field in Strain.DERIVED_TRAIT_FIELDS:
+                self.assertEqual(getattr(strain, field), getattr(expected, field), field)
+
+    def test_save(self):
+        strain = Strain.objects.get(pk=self.strains[1].pk)
+        self.assertFalse(strain.is_extremophile)
+        strain.is_halophile = True
+        strain.save(update_fields=['is_halophile'])
+        strain.refresh_from_db()
+        self.assertTrue(strain.is_extremophile)
+        self.assert_traits_consistent()
+
+    def test_update(self):
+        Strain.objects.filter(strain_number__in=['000', '004']).update(
+            is_psychrophile=False, is_barophile=False
+        )
+        Strain.objects.filter(strain_number='003').update(produces_enzymes=False)
+        Strain.objects.filter(strain_number='001').update(is_acidophile=True)
+        self.assert_traits_consistent()
+        self.assertFalse(Strain.objects.get(strain_number='000').is_extremophile)
+
+    def test_bulk_update(self):
+        strains = list(Strain.objects.all())
+        for strain in strains:
+            strain.nitrogen_fixation = not strain.nitrogen_fixation
+        Strain.objects.bulk_update(strains, ['nitrogen_fixation'])
+        self.assert_traits_consistent()
+
+    def test_filters(self):
+        mask = traits_mask(['is_psychrophile', 'produces_enzymes'])
+        self.assertEqual(
+            Strain.objects.filter(traits__has_all=mask).count(),
+            sum(1 for strain in self.strains if strain.is_psychrophile and strain.produces_enzymes)
+        )
+        self.assertEqual(
+            Strain.objects.filter(traits__has_any=mask).count(),
+            sum(1 for strain in self.strains if strain.is_psychrophile or strain.produces_enzymes)
+        )
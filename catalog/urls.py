@@ -16,5 +16,5 @@ urlpatterns = [
     path('', include(router.urls)),
     path('search/', views.AdvancedSearchAPIView.as_view(), name='api_search'),
     path('stats/', views.StatisticsAPIView.as_view(), name='api_stats'),  
-    path('export/<str:format>/', views.ExportAPIView.as_view(), name='api_export'),
+    path('export/<str:export_format>/', views.ExportAPIView.as_view(), name='api_export'),
 ] 
\ No newline at end of file
@@ -0,0 +1,117 @@
+"""
+Счетчики версий данных каталога.
+
+Версия пространства имен (например, ``'strains'``) увеличивается сигналами
+при любом изменении соответствующих данных. Производные структуры
+(индексы в памяти процесса, кэши) запоминают версию, для которой они
+построены, и перестраиваются, когда она меняется.
+
+Вместе со счетчиком хранится время последнего изменения (для заголовка
+Last-Modified ответов API).
+
+Счетчики хранятся в кэше Django, поэтому при общем бэкенде кэша (Redis,
+таблица БД) изменения видны всем процессам. Процессы читают их из кэша в
+памяти (``catalog/local_cache.py``); ``bump_version`` рассылает
+инвалидацию. В кэше в памяти процесса (LocMemCache) у каждого процесса
+свои счетчики, и ``shared_versions()`` ложно: ответы API по версиям не
+кэшируются.
+
+Изменения данных отмечаются ``bump_version_on_commit``: версия меняется
+только после фиксации транзакции. Иначе конкурентный запрос мог бы увидеть
+новую версию раньше новых данных и закэшировать прежние данные под ней.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.dispatch import Signal
+
+from .local_cache import get_many_local, invalidate
+
+
+# Штаммы и коллекции (код и название коллекции входят в данные штаммов)
+STRAINS = 'strains'
+SEQUENCES = 'sequences'
+PUBLICATIONS = 'publications'
+
+VERSION_KEY = 'catalog:version:{}'
+MODIFIED_KEY = 'catalog:modified:{}'
+
+# Отправляется после bump_version() в процессе, увеличившем версию:
+# аргументы namespace и version (новая версия)
+version_bumped = Signal()
+
+
+def shared_versions():
+    """
+    Видны ли изменения версий всем процессам (общий кэш). Настройка
+    CATALOG_SHARED_CACHE (None - по бэкенду кэша default).
+    """
+    shared = getattr(settings, 'CATALOG_SHARED_CACHE', None)
+    if shared is None:
+        return not isinstance(caches['default'], (LocMemCache, DummyCache))
+    return shared
+
+
+def initial_version():
+    """
+    Начальное значение счетчика - текущее время в миллисекундах: если счетчик
+    вытеснен из кэша, новые версии не совпадут с уже выданными.
+    """
+    return int(time.time() * 1000)
+
+
+def load_many(keys, initial):
+    """Значения ключей из общего кэша; отсутствующие создаются через initial()"""
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            # add() не перезапишет значение, установленное другим процессом
+            value = initial()
+            cache.add(key, value, timeout=None)
+            found[key] = cache.get(key, value)
+    return found
+
+
+def get_versions(namespaces):
+    """Версии нескольких пространств имен одним обращением к кэшу"""
+    keys = {VERSION_KEY.format(namespace): namespace for namespace in namespaces}
+    found = get_many_local(list(keys), lambda missing: load_many(missing, initial_version))
+    return {namespace: found[key] for key, namespace in keys.items()}
+
+
+def get_version(namespace):
+    """Текущая версия данных пространства имен"""
+    return get_versions([namespace])[namespace]
+
+
+def get_last_modified(namespaces):
+    """
+    Время (Unix, секунды) последнего изменения данных пространств имен.
+    Если отметка вытеснена из кэша, изменение считается произошедшим сейчас.
+    """
+    keys = [MODIFIED_KEY.format(namespace) for namespace in namespaces]
+    return max(get_many_local(keys, lambda missing: load_many(missing, time.time)).values())
+
+
+def bump_version(namespace):
+    """Отмечает изменение данных пространства имен, возвращает новую версию"""
+    key = VERSION_KEY.format(namespace)
+    cache.set(MODIFIED_KEY.format(namespace), time.time(), timeout=None)
+    try:
+        version = cache.incr(key)
+    except ValueError:
+        # Счетчика еще нет (или он вытеснен из кэша)
+        cache.add(key, initial_version(), timeout=None)
+        version = cache.incr(key)
+    invalidate([key, MODIFIED_KEY.format(namespace)])
+    version_bumped.send(sender=None, namespace=namespace, version=version)
+    return version
+
+
+def bump_version_on_commit(namespace):
+    """bump_version() после фиксации текущей транзакции (вне транзакции - сразу)"""
+    transaction.on_commit(lambda: bump_version(namespace))
@@ -1,7 +1,7 @@
 from django.shortcuts import render, get_object_or_404
 from django.views.generic import ListView, DetailView, TemplateView
-from django.db.models import Q, Count, Avg
-from django.http import JsonResponse, HttpResponse
+from django.db.models import Q, Count, Avg, Prefetch
+from django.http import JsonResponse, HttpResponse, StreamingHttpResponse
 from django.core.paginator import Paginator
 from rest_framework import viewsets, generics, status
 from rest_framework.decorators import action
@@ -11,13 +11,34 @@ from rest_framework.filters import SearchFilter, OrderingFilter
 import csv
 import json
 
-from .models import Collection, Strain, GenomeSequence, Publication
+from .models import Collection, Strain, GenomeSequence, Publication, traits_mask
 from .serializers import (
-    CollectionSerializer, StrainSerializer, 
-    GenomeSequenceSerializer, PublicationSerializer,
-    StrainSearchSerializer
+    CollectionSerializer, StrainSerializer, StrainListSerializer,
+    GenomeSequenceSerializer, GenomeSequenceDetailSerializer,
+    PublicationSerializer, StrainSearchSerializer, StrainGeoSerializer,
+    RELATED_STRAINS_LIMIT, project_queryset, select_fields
+)
+from .conditional import ConditionalResponseMixin
+from .fast_serializers import compile_serializer
+from .filters import RelevanceOrderingFilter, StrainFilter
+from .geo import (
+    GEO_CLUSTER_MAX_ZOOM, GEO_MAX_FEATURES, bbox_filter, cluster_precision,
+    parse_bbox, parse_zoom, strain_clusters
+)
+from .response_cache import CachedResponseMixin, cached_export_response
+from .pagination import (
+    KEYSET_ORDERINGS, NEXT_CURSOR_HEADER, KeysetPageNumberPagination, export_window,
+    export_within
+)
+from .fulltext import RANK_ANNOTATION, search_strains
+from .statistics import FACETS, cached_stats, compute_facets, labelled_counts
+from .versions import PUBLICATIONS, SEQUENCES, STRAINS
+from .exports import (
+    FASTA_CHUNK_SIZE, FASTA_EXPORT_FIELDS, FASTA_LINE_WIDTHS,
+    HABITAT_TYPE_LABELS, ORGANISM_TYPE_LABELS, STRAIN_EXPORT_FIELDS,
+    iterate_rows, stream_csv, stream_fasta, stream_json_array, stream_ndjson,
+    strain_export_record, streaming_attachment
 )
-from .filters import StrainFilter
 
 
 # Веб-интерфейс представления
@@ -28,21 +49,13 @@ class CatalogHomeView(TemplateView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         
-        # Общая статистика
+        # Общая статистика (из снимка, см. CatalogStatsSnapshot)
+        stats = cached_stats()
         context.update({
-            'total_collections': Collection.objects.filter(is_active=True).count(),
-            'total_strains': Strain.objects.filter(is_available=True).count(),
-            'total_extremophiles': Strain.objects.filter(
-                Q(is_psychrophile=True) | Q(is_thermophile=True) | 
-                Q(is_halophile=True) | Q(is_acidophile=True) | 
-                Q(is_alkaliphile=True) | Q(is_barophile=True)
-            ).count(),
-            'baikal_strains': Strain.objects.filter(
-                habitat_type__in=[
-                    'baikal_surface', 'baikal_deep', 
-                    'baikal_bottom', 'baikal_coastal'
-                ]
-            ).count(),
+            'total_collections': stats['total_collections'],
+            'total_strains': stats['total_strains'],
+            'total_extremophiles': stats['total_extremophiles'],
+            'baikal_strains': stats['baikal_strains'],
             'recent_strains': Strain.objects.filter(
                 is_available=True
             ).order_by('-created_at')[:5],
@@ -98,16 +111,9 @@ class CollectionDetailView(DetailView):
         context.update({
             'strains': strains.order_by('strain_number')[:10],
             'total_strains': strains.count(),
-            'extremophile_count': strains.filter(
-                Q(is_psychrophile=True) | Q(is_thermophile=True) | 
-                Q(is_halophile=True) | Q(is_acidophile=True) | 
-                Q(is_alkaliphile=True) | Q(is_barophile=True)
-            ).count(),
+            'extremophile_count': strains.filter(is_extremophile=True).count(),
             'genome_count': strains.filter(has_genome_sequence=True).count(),
-            'biotech_count': strains.filter(
-                Q(produces_antibiotics=True) | Q(produces_enzymes=True) | 
-                Q(produces_metabolites=True) | Q(nitrogen_fixation=True)
-            ).count(),
+            'biotech_count': strains.filter(has_biotech_potential=True).count(),
         })
         
         return context
@@ -127,7 +133,7 @@ class StrainListView(ListView):
             'collection'
         ).prefetch_related(
             'genome_sequences'
-        ).order_by('collection__code', 'strain_number')
+        ).order_by('collection_code', 'strain_number')
         
         # Фильтры
         collection_id = self.request.GET.get('collection')
@@ -142,24 +148,16 @@ class StrainListView(ListView):
         if habitat_type:
             queryset = queryset.filter(habitat_type=habitat_type)
         
-        # Поиск
-        search = self.request.GET.get('search')
+        # Полнотекстовый поиск: сначала наиболее релевантные
+        search = self.request.GET.get('search', '').strip()
         if search:
-            queryset = queryset.filter(
-                Q(scientific_name__icontains=search) |
-                Q(genus__icontains=search) |
-                Q(species__icontains=search) |
-                Q(strain_number__icontains=search) |
-                Q(isolation_source__icontains=search)
+            queryset = search_strains(queryset, search).order_by(
+                f'-{RANK_ANNOTATION}', 'collection_code', 'strain_number'
             )
         
         # Специальные фильтры
         if self.request.GET.get('extremophiles'):
-            queryset = queryset.filter(
-                Q(is_psychrophile=True) | Q(is_thermophile=True) | 
-                Q(is_halophile=True) | Q(is_acidophile=True) | 
-                Q(is_alkaliphile=True) | Q(is_barophile=True)
-            )
+            queryset = queryset.filter(is_extremophile=True)
         
         if self.request.GET.get('baikal'):
             queryset = queryset.filter(
@@ -170,10 +168,7 @@ class StrainListView(ListView):
             )
         
         if self.request.GET.get('biotech'):
-            queryset = queryset.filter(
-                Q(produces_antibiotics=True) | Q(produces_enzymes=True) | 
-                Q(produces_metabolites=True) | Q(nitrogen_fixation=True)
-            )
+            queryset = queryset.filter(has_biotech_potential=True)
         
         return queryset
     
@@ -254,53 +249,31 @@ class StrainSearchView(TemplateView):
         queryset = Strain.objects.filter(is_available=True).select_related('collection')
         params = self.request.GET
         
-        # Общий поиск по тексту
+        # Общий поиск по тексту (полнотекстовый индекс)
         q = params.get('q', '').strip()
+        ordering = ['collection_code', 'strain_number']
         if q:
-            queryset = queryset.filter(
-                Q(scientific_name__icontains=q) |
-                Q(genus__icontains=q) |
-                Q(species__icontains=q) |
-                Q(strain_number__icontains=q) |
-                Q(isolation_source__icontains=q) |
-                Q(geographic_location__icontains=q) |
-                Q(alternative_numbers__icontains=q)
-            )
+            queryset = search_strains(queryset, q)
+            ordering.insert(0, f'-{RANK_ANNOTATION}')
         
         # Фильтр по коллекции
         collection_id = params.get('collection')
         if collection_id:
             queryset = queryset.filter(collection_id=collection_id)
         
-        # Фильтры экстремофилов
-        extremophile_filters = Q()
-        if params.get('is_psychrophile'):
-            extremophile_filters |= Q(is_psychrophile=True)
-        if params.get('is_thermophile'):
-            extremophile_filters |= Q(is_thermophile=True)
-        if params.get('is_halophile'):
-            extremophile_filters |= Q(is_halophile=True)
-        if params.get('is_acidophile'):
-            extremophile_filters |= Q(is_acidophile=True)
-        if params.get('is_alkaliphile'):
-            extremophile_filters |= Q(is_alkaliphile=True)
-        if params.get('is_barophile'):
-            extremophile_filters |= Q(is_barophile=True)
-        
-        if extremophile_filters:
-            queryset = queryset.filter(extremophile_filters)
-        
-        # Фильтры биотехнологий
-        biotech_filters = Q()
-        if params.get('produces_antibiotics'):
-            biotech_filters |= Q(produces_antibiotics=True)
-        if params.get('produces_enzymes'):
-            biotech_filters |= Q(produces_enzymes=True)
-        if params.get('nitrogen_fixation'):
-            biotech_filters |= Q(nitrogen_fixation=True)
-        
-        if biotech_filters:
-            queryset = queryset.filter(biotech_filters)
+        # Фильтры экстремофилов и биотехнологий: одно побитовое условие
+        extremophile_fields = [
+            field for field in Strain.EXTREMOPHILE_FIELDS if params.get(field)
+        ]
+        if extremophile_fields:
+            queryset = queryset.filter(traits__has_any=traits_mask(extremophile_fields))
+        
+        biotech_fields = [
+            field for field in ('produces_antibiotics', 'produces_enzymes', 'nitrogen_fixation')
+            if params.get(field)
+        ]
+        if biotech_fields:
+            queryset = queryset.filter(traits__has_any=traits_mask(biotech_fields))
         
         # Фильтр по среде обитания
         habitat_type = params.get('habitat_type')
@@ -312,7 +285,7 @@ class StrainSearchView(TemplateView):
         if organism_type:
             queryset = queryset.filter(organism_type=organism_type)
         
-        return queryset.order_by('collection__code', 'strain_number')[:100]  # Ограничиваем результаты
+        return queryset.order_by(*ordering)[:100]  # Ограничиваем результаты
 
 
 class BaikalExtremophilesView(ListView):
@@ -328,11 +301,8 @@ class BaikalExtremophilesView(ListView):
                 'baikal_surface', 'baikal_deep', 
                 'baikal_bottom', 'baikal_coastal'
             ],
-            is_available=True
-        ).filter(
-            Q(is_psychrophile=True) | Q(is_thermophile=True) | 
-            Q(is_halophile=True) | Q(is_acidophile=True) | 
-            Q(is_alkaliphile=True) | Q(is_barophile=True)
+            is_available=True,
+            is_extremophile=True
         ).select_related('collection').order_by('-depth_meters', 'strain_number')
 
 
@@ -345,8 +315,7 @@ class BiotechnologyView(ListView):
     
     def get_queryset(self):
         return Strain.objects.filter(
-            Q(produces_antibiotics=True) | Q(produces_enzymes=True) | 
-            Q(produces_metabolites=True) | Q(nitrogen_fixation=True),
+            has_biotech_potential=True,
             is_available=True
         ).select_related('collection').order_by('scientific_name')
 
@@ -358,58 +327,33 @@ class StatisticsView(TemplateView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         
-        # Общая статистика
-        total_strains = Strain.objects.filter(is_available=True)
+        stats = cached_stats()
         
         context.update({
-            'total_collections': Collection.objects.filter(is_active=True).count(),
-            'total_strains': total_strains.count(),
+            'total_collections': stats['total_collections'],
+            'total_strains': stats['total_strains'],
             
             # По типам организмов
-            'organism_stats': [
-                {
-                    'type': display_name,
-                    'count': total_strains.filter(organism_type=code).count()
-                }
-                for code, display_name in Strain.ORGANISM_TYPES
-            ],
+            'organism_stats': labelled_counts(
+                stats['organism_counts'], Strain.ORGANISM_TYPES
+            ),
             
             # По средам обитания
-            'habitat_stats': [
-                {
-                    'type': display_name,
-                    'count': total_strains.filter(habitat_type=code).count()
-                }
-                for code, display_name in Strain.HABITAT_TYPES
-            ],
+            'habitat_stats': labelled_counts(
+                stats['habitat_counts'], Strain.HABITAT_TYPES
+            ),
             
             # Экстремофилы
-            'extremophile_stats': {
-                'psychrophiles': total_strains.filter(is_psychrophile=True).count(),
-                'thermophiles': total_strains.filter(is_thermophile=True).count(),
-                'halophiles': total_strains.filter(is_halophile=True).count(),
-                'acidophiles': total_strains.filter(is_acidophile=True).count(),
-                'alkaliphiles': total_strains.filter(is_alkaliphile=True).count(),
-                'barophiles': total_strains.filter(is_barophile=True).count(),
-            },
+            'extremophile_stats': stats['extremophiles'],
             
             # Биотехнология
-            'biotech_stats': {
-                'antibiotics': total_strains.filter(produces_antibiotics=True).count(),
-                'enzymes': total_strains.filter(produces_enzymes=True).count(),
-                'metabolites': total_strains.filter(produces_metabolites=True).count(),
-                'nitrogen_fixation': total_strains.filter(nitrogen_fixation=True).count(),
-            },
+            'biotech_stats': stats['biotechnology'],
             
             # Геномика
             'genome_stats': {
-                'sequenced': total_strains.filter(has_genome_sequence=True).count(),
-                'avg_genome_size': total_strains.exclude(
-                    genome_size__isnull=True
-                ).aggregate(Avg('genome_size'))['genome_size__avg'],
-                'avg_gc_content': total_strains.exclude(
-                    gc_content__isnull=True
-                ).aggregate(Avg('gc_content'))['gc_content__avg'],
+                'sequenced': stats['genome_sequenced'],
+                'avg_genome_size': stats['avg_genome_size'],
+                'avg_gc_content': stats['avg_gc_content'],
             },
         })
         
@@ -417,21 +361,62 @@ class StatisticsView(TemplateView):
 
 
 # API представления
-class CollectionViewSet(viewsets.ReadOnlyModelViewSet):
+class FastListMixin:
+    """
+    Списки через скомпилированный FastSerializer (строки values_list без
+    объектов моделей), если все выводимые поля сводятся к колонкам; иначе -
+    через сериализатор DRF. JSON ответа в обоих случаях одинаков.
+    """
+    
+    def get_fast_serializer(self):
+        return compile_serializer(
+            self.get_serializer_class(), self.get_serializer_context().get('fields')
+        )
+    
+    def list_response(self, queryset):
+        """Ответ со списком (страницей) queryset"""
+        fast = self.get_fast_serializer()
+        if fast is not None:
+            # Курсорной пагинации нужны значения ключа сортировки в строках
+            keyset = KEYSET_ORDERINGS.get(queryset.model, ())
+            queryset = fast.rows(queryset, extra=[field.lstrip('-') for field in keyset])
+        
+        page = self.paginate_queryset(queryset)
+        rows = queryset if page is None else page
+        if fast is not None:
+            data = fast.serialize(rows)
+        else:
+            data = self.get_serializer(rows, many=True).data
+        if page is None:
+            return Response(data)
+        return self.get_paginated_response(data)
+
+
+class CollectionViewSet(CachedResponseMixin, viewsets.ReadOnlyModelViewSet):
     """API для коллекций"""
-    queryset = Collection.objects.filter(is_active=True)
+    queryset = Collection.objects.filter(is_active=True).select_related('curator').annotate(
+        available_strain_count=Count('strains', filter=Q(strains__is_available=True))
+    )
     serializer_class = CollectionSerializer
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
     search_fields = ['name', 'code', 'description']
     filterset_fields = ['collection_type', 'access_level']
     ordering_fields = ['name', 'code', 'established_date']
     ordering = ['name']
+    # Для штаммов коллекции доступен режим ?pagination=cursor
+    pagination_class = KeysetPageNumberPagination
+    version_namespaces = [STRAINS, SEQUENCES]
+    # Список коллекций запрашивается на каждой странице приложения
+    local_response_cache = True
     
     @action(detail=True, methods=['get'])
     def strains(self, request, pk=None):
         """Получить штаммы конкретной коллекции"""
         collection = self.get_object()
-        strains = collection.strains.filter(is_available=True)
+        # Порядок по номеру - по индексу (collection, strain_number)
+        strains = project_queryset(
+            collection.strains.filter(is_available=True), StrainSerializer
+        ).order_by('strain_number')
         
         page = self.paginate_queryset(strains)
         if page is not None:
@@ -442,40 +427,88 @@ class CollectionViewSet(viewsets.ReadOnlyModelViewSet):
         return Response(serializer.data)
 
 
-class StrainViewSet(viewsets.ReadOnlyModelViewSet):
-    """API для штаммов"""
+class StrainViewSet(CachedResponseMixin, FastListMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    API для штаммов.
+    
+    Списки по умолчанию выводятся облегченным StrainListSerializer; с
+    ?fields=a,b и/или ?exclude=c - выбранными полями StrainSerializer. Из БД
+    загружаются только колонки и связи, нужные выводимым полям.
+    """
     queryset = Strain.objects.filter(is_available=True).select_related('collection')
     serializer_class = StrainSerializer
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    # ?search= обрабатывается StrainFilter.filter_search (полнотекстовый индекс)
+    filter_backends = [DjangoFilterBackend, RelevanceOrderingFilter]
     filterset_class = StrainFilter
-    search_fields = [
-        'scientific_name', 'genus', 'species', 'strain_number',
-        'isolation_source', 'geographic_location'
-    ]
     ordering_fields = [
         'scientific_name', 'genus', 'species', 'strain_number',
         'isolation_date', 'deposit_date'
     ]
-    ordering = ['collection__code', 'strain_number']
+    ordering = ['collection_code', 'strain_number']
+    pagination_class = KeysetPageNumberPagination
+    version_namespaces = [STRAINS, SEQUENCES]
+    list_actions = ['list', 'extremophiles', 'baikal']
+    
+    def get_sparse_fields(self):
+        """Поля StrainSerializer по ?fields=/?exclude= (None - параметров нет)"""
+        if not hasattr(self, 'sparse_fields'):
+            self.sparse_fields = select_fields(StrainSerializer, self.request.query_params)
+        return self.sparse_fields
+    
+    def get_serializer_class(self):
+        if self.action in self.list_actions and self.get_sparse_fields() is None:
+            return StrainListSerializer
+        return StrainSerializer
+    
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.request is not None:
+            context['fields'] = self.get_sparse_fields()
+        return context
+    
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action not in self.list_actions and self.action != 'retrieve':
+            return queryset
+        return project_queryset(
+            queryset, self.get_serializer_class(), self.get_sparse_fields(),
+            required=[field.lstrip('-') for field in KEYSET_ORDERINGS[Strain]]
+        )
+    
+    def list(self, request, *args, **kwargs):
+        """
+        Список штаммов; с ?facets=organism_type,habitat_type,... в ответ
+        добавляются распределения по фасетам для текущих фильтров.
+        """
+        facets = [
+            facet.strip()
+            for value in request.query_params.getlist('facets')
+            for facet in value.split(',') if facet.strip()
+        ]
+        if not facets:
+            return self.list_response(self.filter_queryset(self.get_queryset()))
+        
+        unknown = sorted(set(facets) - set(FACETS))
+        if unknown:
+            return Response(
+                {'error': f"Неизвестные фасеты: {', '.join(unknown)}", 'available_facets': FACETS},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        queryset = self.filter_queryset(self.get_queryset())
+        response = self.list_response(queryset)
+        if isinstance(response.data, list):
+            response.data = {'results': response.data}
+        response.data['facets'] = compute_facets(queryset, facets)
+        return response
     
     @action(detail=False, methods=['get'])
     def extremophiles(self, request):
         """Получить все экстремофильные штаммы"""
         queryset = self.filter_queryset(
-            self.get_queryset().filter(
-                Q(is_psychrophile=True) | Q(is_thermophile=True) | 
-                Q(is_halophile=True) | Q(is_acidophile=True) | 
-                Q(is_alkaliphile=True) | Q(is_barophile=True)
-            )
+            self.get_queryset().filter(is_extremophile=True)
         )
-        
-        page = self.paginate_queryset(queryset)
-        if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
-        
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return self.list_response(queryset)
     
     @action(detail=False, methods=['get'])
     def baikal(self, request):
@@ -488,144 +521,178 @@ class StrainViewSet(viewsets.ReadOnlyModelViewSet):
                 ]
             )
         )
+        return self.list_response(queryset)
+    
+    @action(detail=False, methods=['get'])
+    def geo(self, request):
+        """
+        Штаммы на карте (GeoJSON FeatureCollection).
+        
+        Параметры: bbox=запад,юг,восток,север, zoom и фильтры StrainFilter.
+        До GEO_CLUSTER_MAX_ZOOM - кластеры по геохешу, на более крупных
+        масштабах - отдельные штаммы (если их не больше GEO_MAX_FEATURES).
+        """
+        bbox = parse_bbox(request.query_params.get('bbox'))
+        zoom = parse_zoom(request.query_params.get('zoom'))
+        queryset = self.filter_queryset(self.get_queryset()).filter(bbox_filter(bbox))
+        
+        clustered = (
+            zoom <= GEO_CLUSTER_MAX_ZOOM
+            or queryset[:GEO_MAX_FEATURES + 1].count() > GEO_MAX_FEATURES
+        )
+        if clustered:
+            features = strain_clusters(queryset, cluster_precision(zoom, bbox))
+        else:
+            strains = project_queryset(
+                queryset, StrainGeoSerializer, required=Strain.EXTREMOPHILE_FIELDS
+            )
+            features = StrainGeoSerializer(strains, many=True).data
         
-        page = self.paginate_queryset(queryset)
-        if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
-        
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return Response({
+            'type': 'FeatureCollection',
+            'zoom': zoom,
+            'clustered': clustered,
+            'features': features,
+        })
 
     @action(detail=False, methods=['get'])
     def export_csv(self, request):
         """Экспорт штаммов в CSV формате"""
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename="strains_export.csv"'
-        
-        writer = csv.writer(response)
-        writer.writerow([
+        header = [
             'Штамм', 'Научное название', 'Род', 'Вид', 'Коллекция',
             'Тип организма', 'Среда обитания', 'Широта', 'Долгота',
             'Температура (°C)', 'pH', 'Психрофил', 'Термофил', 'Галофил',
             'Источник выделения', 'Дата выделения', 'Особые свойства'
-        ])
+        ]
         
         # Применяем те же фильтры что и в основном списке
         queryset = self.filter_queryset(self.get_queryset())
         
-        for strain in queryset:
-            writer.writerow([
-                strain.full_name,
-                strain.scientific_name,
-                strain.genus,
-                strain.species,
-                strain.collection.code,
-                strain.get_organism_type_display(),
-                strain.get_habitat_type_display(),
-                strain.latitude or '',
-                strain.longitude or '',
-                strain.optimal_temperature or '',
-                strain.optimal_ph or '',
-                'Да' if strain.is_psychrophile else 'Нет',
-                'Да' if strain.is_thermophile else 'Нет',
-                'Да' if strain.is_halophile else 'Нет',
-                strain.isolation_source or '',
-                strain.isolation_date.strftime('%Y-%m-%d') if strain.isolation_date else '',
-                strain.special_properties or ''
+        def build_response():
+            window, next_cursor = export_window(queryset, request.query_params)
+            rows = iterate_rows(window, [
+                'collection_code', 'strain_number', 'scientific_name', 'genus',
+                'species', 'organism_type', 'habitat_type', 'latitude', 'longitude',
+                'optimal_temperature', 'optimal_ph', 'is_psychrophile',
+                'is_thermophile', 'is_halophile', 'isolation_source',
+                'isolation_date', 'special_properties',
             ])
+            
+            def csv_rows():
+                for (code, number, scientific_name, genus, species, organism_type,
+                     habitat_type, latitude, longitude, temperature, ph,
+                     psychrophile, thermophile, halophile, isolation_source,
+                     isolation_date, special_properties) in rows:
+                    yield [
+                        f"{code}-{number}",
+                        scientific_name,
+                        genus,
+                        species,
+                        code,
+                        ORGANISM_TYPE_LABELS.get(organism_type, organism_type),
+                        HABITAT_TYPE_LABELS.get(habitat_type, habitat_type),
+                        latitude or '',
+                        longitude or '',
+                        temperature or '',
+                        ph or '',
+                        'Да' if psychrophile else 'Нет',
+                        'Да' if thermophile else 'Нет',
+                        'Да' if halophile else 'Нет',
+                        isolation_source or '',
+                        isolation_date.strftime('%Y-%m-%d') if isolation_date else '',
+                        special_properties or ''
+                    ]
+            
+            response = streaming_attachment(
+                stream_csv(header, csv_rows()), 'text/csv', 'strains_export.csv'
+            )
+            if next_cursor:
+                response[NEXT_CURSOR_HEADER] = next_cursor
+            return response
         
-        return response
+        return cached_export_response(
+            self.conditional_etag, build_response,
+            lambda max_rows: export_within(queryset, request.query_params, max_rows)
+        )
 
     @action(detail=False, methods=['get'])
     def export_fasta(self, request):
-        """Экспорт геномных последовательностей в FASTA формате"""
-        response = HttpResponse(content_type='text/plain')
-        response['Content-Disposition'] = 'attachment; filename="sequences_export.fasta"'
-        
-        # Только штаммы с геномными последовательностями
-        queryset = self.filter_queryset(self.get_queryset()).filter(has_genome_sequence=True)
-        
-        fasta_lines = []
-        for strain in queryset:
-            # Заголовок FASTA
-            header = f">{strain.full_name} {strain.scientific_name}"
-            if strain.latitude and strain.longitude:
-                header += f" [lat={strain.latitude} lon={strain.longitude}]"
-            if strain.optimal_temperature:
-                header += f" [temp={strain.optimal_temperature}C]"
-            header += f" [habitat={strain.habitat_type}]"
-            
-            fasta_lines.append(header)
-            
-            # Последовательность (заглушка для демонстрации)
-            if strain.genome_sequences.exists():
-                sequence = strain.genome_sequences.first()
-                if sequence.sequence_data:
-                    fasta_lines.append(sequence.sequence_data[:100] + "...")
-                else:
-                    # Генерируем заглушку на основе размера генома
-                    seq_length = min(100, (strain.genome_size or 2500000) // 25000)
-                    fasta_lines.append("A" * seq_length + "...")
-            else:
-                fasta_lines.append("ATCGATCGATCGATCG...")  # Заглушка
-            
-            fasta_lines.append("")  # Пустая строка между записями
+        """
+        Экспорт геномных последовательностей в FASTA формате.
+        
+        Параметры: фильтры StrainFilter, sequence_type (можно несколько,
+        через запятую) и line_width (60 или 80).
+        """
+        try:
+            width = int(request.query_params.get('line_width', FASTA_LINE_WIDTHS[-1]))
+        except ValueError:
+            width = None
+        if width not in FASTA_LINE_WIDTHS:
+            return Response(
+                {'error': 'line_width: допустимые значения 60, 80'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        response.write('\n'.join(fasta_lines))
-        return response
+        strains = self.filter_queryset(self.get_queryset())
+        sequences = GenomeSequence.objects.filter(
+            strain__in=strains.order_by().values('pk')
+        ).exclude(sequence_data='', sequence_handle='')
+        
+        sequence_types = [
+            value
+            for param in request.query_params.getlist('sequence_type')
+            for value in param.split(',') if value
+        ]
+        if sequence_types:
+            sequences = sequences.filter(sequence_type__in=sequence_types)
+        
+        sequences = sequences.order_by(
+            'strain__collection_code', 'strain__strain_number', 'accession_number'
+        )
+        rows = iterate_rows(sequences, FASTA_EXPORT_FIELDS, chunk_size=FASTA_CHUNK_SIZE)
+        
+        return streaming_attachment(
+            stream_fasta(rows, width), 'text/plain', 'sequences_export.fasta'
+        )
 
     @action(detail=False, methods=['get'])
     def statistics(self, request):
         """Статистическая сводка по штаммам"""
-        queryset = self.get_queryset()
-        
-        stats = {
-            'total_strains': queryset.count(),
-            'collections_count': queryset.values('collection').distinct().count(),
-            'extremophiles': {
-                'psychrophiles': queryset.filter(is_psychrophile=True).count(),
-                'thermophiles': queryset.filter(is_thermophile=True).count(),
-                'halophiles': queryset.filter(is_halophile=True).count(),
-                'acidophiles': queryset.filter(is_acidophile=True).count(),
-                'alkaliphiles': queryset.filter(is_alkaliphile=True).count(),
-                'barophiles': queryset.filter(is_barophile=True).count(),
+        # get_queryset() не фильтруется, поэтому это глобальная статистика
+        stats = cached_stats()
+        biotechnology = stats['biotechnology']
+        
+        return Response({
+            'total_strains': stats['total_strains'],
+            'collections_count': stats['collections_count'],
+            'extremophiles': stats['extremophiles'],
+            'habitat_distribution': {
+                item['type']: item['count']
+                for item in labelled_counts(
+                    stats['habitat_counts'], Strain.HABITAT_TYPES, skip_empty=True
+                )
+            },
+            'organism_types': {
+                item['type']: item['count']
+                for item in labelled_counts(
+                    stats['organism_counts'], Strain.ORGANISM_TYPES, skip_empty=True
+                )
             },
-            'habitat_distribution': {},
-            'organism_types': {},
             'biotechnology': {
-                'antibiotic_producers': queryset.filter(produces_antibiotics=True).count(),
-                'enzyme_producers': queryset.filter(produces_enzymes=True).count(),
-                'nitrogen_fixers': queryset.filter(nitrogen_fixation=True).count(),
-                'metabolite_producers': queryset.filter(produces_metabolites=True).count(),
+                'antibiotic_producers': biotechnology['antibiotics'],
+                'enzyme_producers': biotechnology['enzymes'],
+                'nitrogen_fixers': biotechnology['nitrogen_fixation'],
+                'metabolite_producers': biotechnology['metabolites'],
             },
             'genomics': {
-                'sequenced': queryset.filter(has_genome_sequence=True).count(),
-                'avg_genome_size': queryset.exclude(genome_size__isnull=True).aggregate(
-                    avg_size=Avg('genome_size')
-                )['avg_size'],
-                'avg_gc_content': queryset.exclude(gc_content__isnull=True).aggregate(
-                    avg_gc=Avg('gc_content')
-                )['avg_gc'],
+                'sequenced': stats['genome_sequenced'],
+                'avg_genome_size': stats['avg_genome_size'],
+                'avg_gc_content': stats['avg_gc_content'],
             }
-        }
-        
-        # Распределение по средам обитания
-        for choice in Strain.HABITAT_CHOICES:
-            count = queryset.filter(habitat_type=choice[0]).count()
-            if count > 0:
-                stats['habitat_distribution'][choice[1]] = count
-        
-        # Распределение по типам организмов
-        for choice in Strain.ORGANISM_CHOICES:
-            count = queryset.filter(organism_type=choice[0]).count()
-            if count > 0:
-                stats['organism_types'][choice[1]] = count
-        
-        return Response(stats)
+        })
 
 
-class GenomeSequenceViewSet(viewsets.ReadOnlyModelViewSet):
+class GenomeSequenceViewSet(CachedResponseMixin, viewsets.ReadOnlyModelViewSet):
     """API для геномных последовательностей"""
     queryset = GenomeSequence.objects.all().select_related('strain')
     serializer_class = GenomeSequenceSerializer
@@ -634,24 +701,136 @@ class GenomeSequenceViewSet(viewsets.ReadOnlyModelViewSet):
     search_fields = ['accession_number', 'strain__scientific_name']
     ordering_fields = ['submission_date', 'sequence_length']
     ordering = ['-submission_date']
+    pagination_class = KeysetPageNumberPagination
+    version_namespaces = [SEQUENCES, STRAINS]
+    
+    def with_sequence_data(self):
+        """Деталь или список с ?include_sequence=true: с данными последовательностей"""
+        if self.action == 'retrieve':
+            return True
+        return self.request.query_params.get('include_sequence', '').lower() in ('true', '1')
+    
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.with_sequence_data():
+            return queryset
+        # Данные последовательностей в списках по умолчанию не нужны
+        return queryset.without_data()
+    
+    def get_serializer_class(self):
+        if self.with_sequence_data():
+            return GenomeSequenceDetailSerializer
+        return GenomeSequenceSerializer
+    
+    @action(detail=True, methods=['get'])
+    def sequence(self, request, pk=None):
+        """
+        Участок последовательности: ?start=&end=&strand=
+        
+        Координаты 0-based, end не включается; strand '-' возвращает
+        обратно-комплементарную цепь. Поддерживается заголовок Range
+        (bytes=a-b) относительно выбранного участка.
+        """
+        genome_sequence = self.get_object()
+        length = genome_sequence.available_length
+        params = request.query_params
+        
+        try:
+            start = int(params.get('start', 0))
+            end = int(params.get('end', length))
+        except ValueError:
+            return Response(
+                {'error': 'start и end должны быть целыми числами'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        strand = params.get('strand', '+')
+        if strand not in ('+', '-'):
+            return Response(
+                {'error': "strand: допустимые значения '+', '-'"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        end = min(end, length)
+        if start < 0 or start > end:
+            return Response(
+                {'error': f'Участок вне последовательности длиной {length}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        region_length = end - start
+        byte_range = parse_byte_range(request.headers.get('Range'), region_length)
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{region_length}'
+            return response
+        
+        first, last = byte_range or (0, region_length - 1)
+        # Смещения Range отсчитываются в выдаваемой цепи
+        if strand == '-':
+            region = genome_sequence.read_region(end - 1 - last, end - first, strand)
+        else:
+            region = genome_sequence.read_region(start + first, start + last + 1)
+        
+        response = HttpResponse(region, content_type='text/plain; charset=ascii')
+        response['Accept-Ranges'] = 'bytes'
+        if byte_range:
+            response.status_code = 206
+            response['Content-Range'] = f'bytes {first}-{last}/{region_length}'
+        return response
 
 
-class PublicationViewSet(viewsets.ReadOnlyModelViewSet):
+def parse_byte_range(header, length):
+    """
+    Разбирает заголовок Range (один диапазон bytes=...).
+    
+    Возвращает (first, last) включительно, None если заголовка нет или он
+    не поддерживается, и False для невыполнимого диапазона.
+    """
+    if not header or not header.startswith('bytes=') or ',' in header:
+        return None
+    first, _, last = header[len('bytes='):].strip().partition('-')
+    try:
+        if not first:
+            # Суффикс: последние N байт
+            suffix = int(last)
+            if suffix <= 0:
+                return False
+            return max(0, length - suffix), length - 1
+        first = int(first)
+        last = int(last) if last else length - 1
+    except ValueError:
+        return None
+    if first > last or first >= length:
+        return False
+    return first, min(last, length - 1)
+
+
+class PublicationViewSet(CachedResponseMixin, viewsets.ReadOnlyModelViewSet):
     """API для публикаций"""
-    queryset = Publication.objects.all().prefetch_related('strains')
+    queryset = Publication.objects.annotate(strain_total=Count('strains')).prefetch_related(
+        Prefetch(
+            'strains',
+            queryset=Strain.objects.only(
+                'id', 'collection_code', 'strain_number', 'scientific_name'
+            )[:RELATED_STRAINS_LIMIT],
+            to_attr='top_strains'
+        )
+    )
     serializer_class = PublicationSerializer
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
     filterset_fields = ['year', 'journal']
     search_fields = ['title', 'authors', 'abstract', 'doi']
     ordering_fields = ['year', 'title']
     ordering = ['-year', 'title']
+    version_namespaces = [PUBLICATIONS, STRAINS]
 
 
-class AdvancedSearchAPIView(generics.ListAPIView):
+class AdvancedSearchAPIView(CachedResponseMixin, FastListMixin, generics.ListAPIView):
     """API для расширенного поиска"""
     serializer_class = StrainSearchSerializer
-    filter_backends = [DjangoFilterBackend]
+    filter_backends = [DjangoFilterBackend, RelevanceOrderingFilter]
     filterset_class = StrainFilter
+    ordering_fields = ['scientific_name', 'strain_number']
+    ordering = ['collection_code', 'strain_number']
     
     def get_queryset(self):
         queryset = Strain.objects.filter(is_available=True).select_related('collection')
@@ -681,118 +860,107 @@ class AdvancedSearchAPIView(generics.ListAPIView):
             queryset = queryset.filter(depth_meters__lte=max_depth)
         
         return queryset
+    
+    def list(self, request, *args, **kwargs):
+        return self.list_response(self.filter_queryset(self.get_queryset()))
 
 
-class StatisticsAPIView(generics.GenericAPIView):
+class StatisticsAPIView(ConditionalResponseMixin, generics.GenericAPIView):
     """API для статистики"""
+    version_namespaces = [STRAINS, SEQUENCES]
     
     def get(self, request):
-        total_strains = Strain.objects.filter(is_available=True)
-        
-        stats = {
-            'total_collections': Collection.objects.filter(is_active=True).count(),
-            'total_strains': total_strains.count(),
-            'total_extremophiles': total_strains.filter(
-                Q(is_psychrophile=True) | Q(is_thermophile=True) | 
-                Q(is_halophile=True) | Q(is_acidophile=True) | 
-                Q(is_alkaliphile=True) | Q(is_barophile=True)
-            ).count(),
-            'baikal_strains': total_strains.filter(
-                habitat_type__in=[
-                    'baikal_surface', 'baikal_deep', 
-                    'baikal_bottom', 'baikal_coastal'
-                ]
-            ).count(),
-            'genome_sequenced': total_strains.filter(has_genome_sequence=True).count(),
-            'biotech_potential': total_strains.filter(
-                Q(produces_antibiotics=True) | Q(produces_enzymes=True) | 
-                Q(produces_metabolites=True) | Q(nitrogen_fixation=True)
-            ).count(),
-        }
-        
-        return Response(stats)
+        stats = cached_stats()
+        
+        return Response({
+            'total_collections': stats['total_collections'],
+            'total_strains': stats['total_strains'],
+            'total_extremophiles': stats['total_extremophiles'],
+            'baikal_strains': stats['baikal_strains'],
+            'genome_sequenced': stats['genome_sequenced'],
+            'biotech_potential': stats['biotech_potential'],
+        })
 
 
-class ExportAPIView(generics.GenericAPIView):
-    """API для экспорта данных"""
+class ExportAPIView(ConditionalResponseMixin, generics.GenericAPIView):
+    """
+    API для экспорта данных.
     
-    def get(self, request, format):
-        if format not in ['csv', 'json']:
+    С ?limit= (и ?cursor= для продолжения) отдается часть выгрузки в порядке
+    коллекция/номер; курсор следующей части - в заголовке X-Next-Cursor.
+    """
+    EXPORT_FORMATS = ['csv', 'json', 'ndjson']
+    
+    def get(self, request, export_format):
+        # Параметр URL не называется format: DRF воспринимает его как суффикс
+        # формата рендерера и отвечает 404 для csv
+        if export_format not in self.EXPORT_FORMATS:
             return Response(
-                {'error': 'Поддерживаются только форматы: csv, json'}, 
+                {'error': 'Поддерживаются только форматы: ' + ', '.join(self.EXPORT_FORMATS)}, 
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Применяем фильтры
-        queryset = Strain.objects.filter(is_available=True).select_related('collection')
-        
-        # Можно добавить фильтрацию по параметрам запроса
-        collection_id = request.query_params.get('collection')
-        if collection_id:
-            queryset = queryset.filter(collection_id=collection_id)
+        # Применяем те же фильтры, что и /api/strains/
+        filterset = StrainFilter(
+            request.query_params,
+            queryset=Strain.objects.filter(is_available=True),
+            request=request
+        )
+        if not filterset.is_valid():
+            return Response(filterset.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        def build_response():
+            queryset, next_cursor = export_window(filterset.qs, request.query_params)
+            response = self.export_response(queryset, export_format)
+            if next_cursor:
+                response[NEXT_CURSOR_HEADER] = next_cursor
+            return response
         
-        if format == 'csv':
-            response = HttpResponse(content_type='text/csv')
-            response['Content-Disposition'] = 'attachment; filename="strains.csv"'
-            
-            writer = csv.writer(response)
-            writer.writerow([
+        # Одинаковые выгрузки при неизменных данных отдаются из кэша
+        return cached_export_response(
+            self.conditional_etag, build_response,
+            lambda max_rows: export_within(filterset.qs, request.query_params, max_rows)
+        )
+    
+    def export_response(self, queryset, export_format):
+        if export_format == 'csv':
+            header = [
                 'Collection', 'Strain Number', 'Scientific Name', 
                 'Organism Type', 'Habitat Type', 'Isolation Source',
                 'Geographic Location', 'Latitude', 'Longitude',
                 'Is Psychrophile', 'Is Thermophile', 'Is Halophile',
                 'Produces Antibiotics', 'Produces Enzymes'
+            ]
+            rows = iterate_rows(queryset, [
+                'collection_code', 'strain_number', 'scientific_name',
+                'organism_type', 'habitat_type', 'isolation_source',
+                'geographic_location', 'latitude', 'longitude',
+                'is_psychrophile', 'is_thermophile', 'is_halophile',
+                'produces_antibiotics', 'produces_enzymes',
             ])
             
-            for strain in queryset:
-                writer.writerow([
-                    strain.collection.code,
-                    strain.strain_number,
-                    strain.scientific_name,
-                    strain.get_organism_type_display(),
-                    strain.get_habitat_type_display(),
-                    strain.isolation_source,
-                    strain.geographic_location,
-                    strain.latitude,
-                    strain.longitude,
-                    strain.is_psychrophile,
-                    strain.is_thermophile,
-                    strain.is_halophile,
-                    strain.produces_antibiotics,
-                    strain.produces_enzymes,
-                ])
+            def csv_rows():
+                for row in rows:
+                    row = list(row)
+                    row[3] = ORGANISM_TYPE_LABELS.get(row[3], row[3])
+                    row[4] = HABITAT_TYPE_LABELS.get(row[4], row[4])
+                    yield row
             
-            return response
+            return streaming_attachment(
+                stream_csv(header, csv_rows()), 'text/csv', 'strains.csv'
+            )
         
-        elif format == 'json':
-            data = []
-            for strain in queryset:
-                data.append({
-                    'collection': strain.collection.code,
-                    'strain_number': strain.strain_number,
-                    'scientific_name': strain.scientific_name,
-                    'organism_type': strain.organism_type,
-                    'habitat_type': strain.habitat_type,
-                    'isolation_source': strain.isolation_source,
-                    'geographic_location': strain.geographic_location,
-                    'coordinates': {
-                        'latitude': float(strain.latitude) if strain.latitude else None,
-                        'longitude': float(strain.longitude) if strain.longitude else None,
-                    },
-                    'extremophile_properties': {
-                        'is_psychrophile': strain.is_psychrophile,
-                        'is_thermophile': strain.is_thermophile,
-                        'is_halophile': strain.is_halophile,
-                        'is_acidophile': strain.is_acidophile,
-                        'is_alkaliphile': strain.is_alkaliphile,
-                        'is_barophile': strain.is_barophile,
-                    },
-                    'biotechnology': {
-                        'produces_antibiotics': strain.produces_antibiotics,
-                        'produces_enzymes': strain.produces_enzymes,
-                        'produces_metabolites': strain.produces_metabolites,
-                        'nitrogen_fixation': strain.nitrogen_fixation,
-                    }
-                })
-            
-            return JsonResponse(data, safe=False)
+        records = (
+            strain_export_record(row)
+            for row in iterate_rows(queryset, STRAIN_EXPORT_FIELDS)
+        )
+        
+        if export_format == 'json':
+            return StreamingHttpResponse(
+                stream_json_array(records), content_type='application/json'
+            )
+        
+        # NDJSON: записи можно обрабатывать по мере поступления
+        return StreamingHttpResponse(
+            stream_ndjson(records), content_type='application/x-ndjson'
+        )
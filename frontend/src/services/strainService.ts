@@ -53,12 +53,24 @@ interface Strain {
   updated_at: string
 }
 
+// Поля, которые показывает таблица штаммов (?fields= списка штаммов)
+const STRAIN_TABLE_FIELDS = [
+  'id', 'full_name', 'scientific_name', 'genus', 'species',
+  'collection_name', 'collection_code', 'organism_type', 'organism_type_display',
+  'isolation_source', 'geographic_location', 'latitude', 'longitude',
+  'depth_meters', 'isolation_date', 'optimal_temperature', 'optimal_ph',
+  'temperature_range_min', 'temperature_range_max', 'ph_range_min', 'ph_range_max',
+  'is_psychrophile', 'is_thermophile', 'is_halophile', 'has_genome_sequence',
+  'produces_antibiotics', 'produces_enzymes', 'nitrogen_fixation',
+  'description', 'special_properties'
+]
+
 class StrainService {
   private baseUrl = '/api'
 
   async getAllStrains(): Promise<Strain[]> {
     try {
-      const response = await fetch(`${this.baseUrl}/strains/`)
+      const response = await fetch(`${this.baseUrl}/strains/?fields=${STRAIN_TABLE_FIELDS.join(',')}`)
       
       if (!response.ok) {
         throw new Error(`HTTP error! status: ${response.status}`)
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class SearchConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'search'
+    
+    def ready(self):
+        # Подключение сигналов обновления поискового индекса
+        from . import signals
@@ -0,0 +1,173 @@
+"""
+Автодополнение по родам, названиям, номерам штаммов и кодам коллекций.
+
+Словарь хранится в памяти процесса как отсортированный массив ключей
+(строки в нижнем регистре) с параллельными массивами значений, видов и
+счетчиков. Для коротких популярных префиксов лучшие подсказки отобраны при
+построении словаря и находятся одним поиском в словаре; для остальных
+префиксов - два ``bisect`` по массиву ключей и выбор из диапазона не длиннее
+TOP_SUGGESTIONS. Обращений к БД нет.
+
+Словарь перестраивается лениво, когда меняется версия данных штаммов
+(``catalog/versions.py``), которую увеличивают сигналы моделей.
+"""
+import heapq
+import re
+import threading
+from bisect import bisect_left, bisect_right
+from collections import Counter
+
+from catalog.models import Strain
+from catalog.versions import STRAINS, get_version
+
+
+# Вид подсказки -> поле values_list
+SUGGESTION_FIELDS = {
+    'genus': 'genus',
+    'scientific_name': 'scientific_name',
+    'strain_number': 'strain_number',
+    'alternative_number': 'alternative_numbers',
+    'collection_code': 'collection__code',
+}
+
+ALTERNATIVE_NUMBERS_SEPARATOR = re.compile(r'[,;\n]+')
+
+# Символ больше любого встречающегося в ключах: граница диапазона префикса
+PREFIX_END = '\U0010ffff'
+
+# Число подсказок, заранее отобранных для популярных префиксов (не меньше
+# максимального limit в API)
+TOP_SUGGESTIONS = 50
+
+
+def suggestion_values(kind, value):
+    if not value:
+        return []
+    if kind == 'alternative_number':
+        return [
+            number.strip() for number in ALTERNATIVE_NUMBERS_SEPARATOR.split(value)
+            if number.strip()
+        ]
+    return [value.strip()]
+
+
+class SuggestionIndex:
+    """
+    Отсортированный массив подсказок и заранее отобранные top-k для
+    популярных префиксов.
+
+    Для префикса, которому соответствует больше top_size подсказок, лучшие
+    top_size хранятся в словаре, и запрос стоит один поиск в словаре по
+    префиксу. Диапазон остальных префиксов не длиннее top_size.
+    """
+
+    def __init__(self, entries, top_size):
+        entries = sorted(entries)
+        self.keys = [entry[0] for entry in entries]
+        self.values = [entry[1] for entry in entries]
+        self.kinds = [entry[2] for entry in entries]
+        self.counts = [entry[3] for entry in entries]
+        self.top_size = top_size
+
+        prefix_sizes = {}
+        self.top = {}
+        # Позиции в порядке выдачи: каждый список top заполняется уже отсортированным
+        for i in sorted(range(len(self.keys)), key=self.rank):
+            key = self.keys[i]
+            for length in range(1, len(key) + 1):
+                prefix = key[:length]
+                if prefix not in prefix_sizes:
+                    prefix_sizes[prefix] = len(self.prefix_range(prefix))
+                if prefix_sizes[prefix] <= top_size:
+                    break  # у более длинных префиксов подсказок не больше
+                top = self.top.setdefault(prefix, [])
+                if len(top) < top_size:
+                    top.append(i)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def rank(self, i):
+        return -self.counts[i], self.keys[i]
+
+    def prefix_range(self, prefix):
+        start = bisect_left(self.keys, prefix)
+        return range(start, bisect_right(self.keys, prefix + PREFIX_END, lo=start))
+
+    def complete(self, prefix, limit):
+        """Позиции limit лучших подсказок с префиксом prefix (в нижнем регистре)"""
+        top = self.top.get(prefix)
+        if top is not None and limit <= self.top_size:
+            return top[:limit]
+        return heapq.nsmallest(limit, self.prefix_range(prefix), key=self.rank)
+
+    def suggestions(self, positions):
+        return [
+            {'value': self.values[i], 'kind': self.kinds[i], 'count': self.counts[i]}
+            for i in positions
+        ]
+
+
+class Autocomplete:
+    """Подсказки (значение, вид, число штаммов): общий словарь и словари видов"""
+
+    def __init__(self, counts, top_size=TOP_SUGGESTIONS):
+        entries = [
+            (value.lower(), value, kind, count)
+            for (kind, value), count in counts.items()
+        ]
+        self.index = SuggestionIndex(entries, top_size)
+        self.kind_indexes = {
+            kind: SuggestionIndex(
+                [entry for entry in entries if entry[2] == kind], top_size
+            )
+            for kind in SUGGESTION_FIELDS
+        }
+
+    @classmethod
+    def from_database(cls):
+        counts = Counter()
+        rows = Strain.objects.filter(is_available=True).values_list(
+            *SUGGESTION_FIELDS.values()
+        ).iterator(chunk_size=2000)
+        for row in rows:
+            for kind, value in zip(SUGGESTION_FIELDS, row):
+                for suggestion in suggestion_values(kind, value):
+                    counts[kind, suggestion] += 1
+        return cls(counts)
+
+    def __len__(self):
+        return len(self.index)
+
+    def complete(self, prefix, limit=10, kinds=None):
+        """Top-k подсказок с префиксом prefix по убыванию числа штаммов"""
+        prefix = prefix.strip().lower()
+        if not prefix:
+            return []
+        if not kinds or set(SUGGESTION_FIELDS) <= set(kinds):
+            return self.index.suggestions(self.index.complete(prefix, limit))
+        # Объединение лучших подсказок выбранных видов
+        suggestions = []
+        for kind in kinds:
+            index = self.kind_indexes[kind]
+            suggestions += index.suggestions(index.complete(prefix, limit))
+        return heapq.nsmallest(
+            limit, suggestions, key=lambda item: (-item['count'], item['value'].lower())
+        )
+
+
+_autocomplete = None
+_autocomplete_version = None
+_autocomplete_lock = threading.Lock()
+
+
+def get_autocomplete():
+    """Словарь подсказок, актуальный для текущей версии данных"""
+    global _autocomplete, _autocomplete_version
+    version = get_version(STRAINS)
+    if _autocomplete is None or _autocomplete_version != version:
+        with _autocomplete_lock:
+            if _autocomplete is None or _autocomplete_version != version:
+                _autocomplete = Autocomplete.from_database()
+                _autocomplete_version = version
+    return _autocomplete
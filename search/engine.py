@@ -0,0 +1,243 @@
+"""
+Поисковый движок в памяти процесса.
+
+Инвертированный индекс по текстовым полям доступных штаммов с
+ранжированием BM25. Поля имеют разный вес (упрощенный BM25F): вхождение
+слова в название весит больше, чем в описание.
+
+Индекс строится одним проходом по ``values_list(...).iterator()`` в фоновом
+потоке при старте сервера (``warm_up`` в wsgi.py) или при первом запросе, а
+затем обновляется инкрементально: сигналы штаммов и коллекций
+(``search/signals.py``) запоминают измененные записи, и они
+переиндексируются, когда эти изменения увеличивают версию данных штаммов
+(``catalog/versions.py``) после фиксации транзакции.
+
+Индекс принимает новую версию, только если был построен для предыдущей:
+иначе между ними есть изменения других процессов, и индекс строится заново
+при следующем запросе. Построение идет вне блокировки поиска, и до его
+окончания запросы обслуживает прежний индекс.
+"""
+import heapq
+import logging
+import math
+import re
+import threading
+from collections import defaultdict
+
+from django.db import DatabaseError, transaction
+from django.db.models import Q
+
+from catalog.models import Strain
+from catalog.versions import STRAINS, get_version
+
+
+logger = logging.getLogger(__name__)
+
+# Поле values_list -> вес вхождения слова
+FIELD_WEIGHTS = {
+    'scientific_name': 3.0,
+    'genus': 3.0,
+    'species': 3.0,
+    'strain_number': 2.5,
+    'alternative_numbers': 2.0,
+    'collection__code': 2.0,
+    'collection__name': 1.0,
+    'isolation_source': 1.5,
+    'geographic_location': 1.5,
+    'description': 1.0,
+}
+
+INDEX_FIELDS = ['pk', *FIELD_WEIGHTS]
+
+BUILD_CHUNK_SIZE = 2000
+
+# Параметры BM25
+K1 = 1.2
+B = 0.75
+
+TOKEN_RE = re.compile(r'\w+')
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower()) if text else []
+
+
+class InvertedIndex:
+    """Инвертированный индекс с ранжированием BM25"""
+
+    def __init__(self):
+        self.postings = defaultdict(dict)  # слово -> {pk: взвешенная частота}
+        self.lengths = {}                  # pk -> взвешенная длина документа
+        self.terms = {}                    # pk -> слова документа (для удаления)
+        self.total_length = 0.0
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def add(self, pk, fields):
+        """Добавляет (или заменяет) документ; fields - {поле: текст}"""
+        self.remove(pk)
+        frequencies = defaultdict(float)
+        length = 0.0
+        for field, text in fields.items():
+            weight = FIELD_WEIGHTS[field]
+            for token in tokenize(text):
+                frequencies[token] += weight
+                length += weight
+        for token, frequency in frequencies.items():
+            self.postings[token][pk] = frequency
+        self.lengths[pk] = length
+        self.terms[pk] = list(frequencies)
+        self.total_length += length
+
+    def remove(self, pk):
+        terms = self.terms.pop(pk, None)
+        if terms is None:
+            return
+        for token in terms:
+            documents = self.postings[token]
+            documents.pop(pk, None)
+            if not documents:
+                del self.postings[token]
+        self.total_length -= self.lengths.pop(pk)
+
+    def search(self, query, limit=20, offset=0):
+        """
+        Поиск по словам запроса (любое из слов, с ранжированием BM25).
+
+        Возвращает (число найденных документов, [(pk, score), ...]) для
+        окна [offset, offset + limit) по убыванию score.
+        """
+        count = len(self.lengths)
+        if not count:
+            return 0, []
+        average_length = self.total_length / count or 1.0
+
+        scores = defaultdict(float)
+        for token in set(tokenize(query)):
+            documents = self.postings.get(token)
+            if not documents:
+                continue
+            frequency = len(documents)
+            idf = math.log(1 + (count - frequency + 0.5) / (frequency + 0.5))
+            for pk, tf in documents.items():
+                norm = K1 * (1 - B + B * self.lengths[pk] / average_length)
+                scores[pk] += idf * tf * (K1 + 1) / (tf + norm)
+
+        top = heapq.nlargest(offset + limit, scores.items(), key=lambda item: item[1])
+        return len(scores), top[offset:]
+
+
+class SearchEngine:
+    """Потокобезопасная обертка индекса с учетом версии данных"""
+
+    def __init__(self):
+        self.index = None
+        self.version = None
+        # Короткая блокировка: поиск, инкрементальные изменения, замена индекса
+        self.lock = threading.Lock()
+        # Полное построение идет вне self.lock, не более одного за раз
+        self.build_lock = threading.Lock()
+        # Изменения, сделанные потоком и еще не отмеченные новой версией
+        self.local = threading.local()
+
+    def build(self):
+        """Строит индекс заново по доступным штаммам и подменяет им текущий"""
+        with self.build_lock:
+            version = get_version(STRAINS)
+            if self.index is not None and self.version == version:
+                # Построен другим потоком, пока этот ждал
+                return self.index
+            index = InvertedIndex()
+            rows = Strain.objects.filter(is_available=True).values_list(
+                *INDEX_FIELDS
+            ).iterator(chunk_size=BUILD_CHUNK_SIZE)
+            for pk, *values in rows:
+                index.add(pk, dict(zip(FIELD_WEIGHTS, values)))
+            # Версия прочитана до чтения строк: изменения, зафиксированные во
+            # время построения, приведут к еще одному построению, но не потеряются
+            with self.lock:
+                self.index = index
+                self.version = version
+            logger.info('Поисковый индекс построен: %s штаммов', len(index))
+            return index
+
+    def get_index(self):
+        """
+        Актуальный индекс: строится при первом обращении или при смене версии.
+        Пока устаревший индекс перестраивается другим потоком, запросы
+        обслуживает он.
+        """
+        index = self.index
+        if index is None:
+            return self.build()
+        if self.version == get_version(STRAINS):
+            return index
+        if self.build_lock.locked():
+            return index
+        return self.build()
+
+    def pending_changes(self):
+        if not hasattr(self.local, 'changes'):
+            self.local.changes = []
+        return self.local.changes
+
+    def mark_changed(self, strain_pk=None, collection_pk=None):
+        """
+        Запоминает изменение штамма или коллекции. Вызывается до сохранения:
+        при фиксации транзакции изменение запоминается раньше, чем сигналы
+        каталога увеличат версию; при откате оно забывается.
+        """
+        transaction.on_commit(
+            lambda: self.pending_changes().append((strain_pk, collection_pk))
+        )
+
+    def reindex(self, strain_pks, collection_pks):
+        """Переиндексирует штаммы strain_pks и штаммы коллекций collection_pks"""
+        missing = set(strain_pks)
+        rows = Strain.objects.filter(
+            Q(pk__in=strain_pks) | Q(collection_id__in=collection_pks)
+        ).values_list('is_available', *INDEX_FIELDS)
+        for is_available, pk, *values in rows:
+            missing.discard(pk)
+            if is_available:
+                self.index.add(pk, dict(zip(FIELD_WEIGHTS, values)))
+            else:
+                self.index.remove(pk)
+        # Удаленные штаммы
+        for pk in missing:
+            self.index.remove(pk)
+
+    def version_bumped(self, version):
+        """
+        Версия данных штаммов увеличена этим потоком до version: если индекс
+        построен для version - 1, применяет запомненные изменения и принимает
+        version. Иначе (пропущены версии других процессов или увеличение без
+        запомненных изменений, например массовый update()) индекс остается
+        устаревшим и строится заново при следующем запросе.
+        """
+        changes = self.pending_changes()
+        with self.lock:
+            if self.index is not None and changes and self.version == version - 1:
+                self.reindex(
+                    {strain_pk for strain_pk, _ in changes if strain_pk},
+                    {collection_pk for _, collection_pk in changes if collection_pk}
+                )
+                self.version = version
+        changes.clear()
+
+    def search(self, query, limit=20, offset=0):
+        index = self.get_index()
+        with self.lock:
+            return index.search(query, limit, offset)
+
+
+engine = SearchEngine()
+
+
+def warm_up():
+    """Построение индекса при старте процесса; ошибки БД не мешают запуску"""
+    try:
+        engine.build()
+    except DatabaseError:
+        logger.exception('Поисковый индекс не построен при старте')
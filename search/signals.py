@@ -0,0 +1,38 @@
+"""
+Инкрементальное обновление поискового индекса (search/engine.py).
+
+Измененные штаммы и коллекции запоминаются до сохранения и
+переиндексируются, когда сигналы каталога (catalog/signals.py) после
+фиксации транзакции увеличивают версию данных штаммов.
+"""
+from django.db.models.signals import pre_delete, pre_save
+from django.dispatch import receiver
+
+from catalog.models import Collection, Strain
+from catalog.versions import STRAINS, version_bumped
+
+from .engine import engine
+
+
+@receiver(pre_save, sender=Strain)
+def remember_strain(sender, instance, raw=False, **kwargs):
+    if not raw:
+        engine.mark_changed(strain_pk=instance.pk)
+
+
+@receiver(pre_delete, sender=Strain)
+def remember_deleted_strain(sender, instance, **kwargs):
+    engine.mark_changed(strain_pk=instance.pk)
+
+
+@receiver(pre_save, sender=Collection)
+def remember_collection(sender, instance, raw=False, **kwargs):
+    # Название и код коллекции входят в документы ее штаммов
+    if not raw:
+        engine.mark_changed(collection_pk=instance.pk)
+
+
+@receiver(version_bumped)
+def apply_index_changes(sender, namespace, version, **kwargs):
+    if namespace == STRAINS:
+        engine.version_bumped(version)
@@ -1,3 +1,205 @@
-from django.test import TestCase
+from datetime import date
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+from catalog.local_cache import local_cache
+from catalog.models import Collection, Strain
+from catalog.tests import LOCAL_CACHES
+from catalog.versions import STRAINS, VERSION_KEY, bump_version, get_version
+
+from .autocomplete import Autocomplete
+from .engine import InvertedIndex, engine, warm_up
+
+
+@override_settings(CACHES=LOCAL_CACHES, CATALOG_SHARED_CACHE=True)
+class SearchTestCase(APITestCase):
+    """Штаммы для поиска; индекс и версии данных сбрасываются перед тестом"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.collection = Collection.objects.create(
+            name='Коллекция микроорганизмов Байкала', code='BAI', collection_type='bacteria',
+            description='', established_date=date(2000, 1, 1)
+        )
+        cls.strains = [
+            cls.create_strain('001', 'Pseudomonas fluorescens', 'Вода'),
+            cls.create_strain('002', 'Bacillus subtilis', 'Донные осадки, pseudomonas рядом'),
+            cls.create_strain('003', 'Rhodococcus erythropolis', 'Вода'),
+        ]
+
+    @classmethod
+    def create_strain(cls, number, name, source):
+        genus, species = name.split()
+        return Strain.objects.create(
+            collection=cls.collection, strain_number=number, scientific_name=name,
+            genus=genus, species=species, organism_type='bacteria',
+            isolation_source=source, habitat_type='baikal_deep',
+            geographic_location='оз. Байкал', deposit_date=date(2020, 1, 1)
+        )
+
+    def setUp(self):
+        cache.clear()
+        local_cache.clear()
+        engine.index = None
+        engine.version = None
+
+    def search(self, query):
+        response = self.client.get('/api/search/query/', {'q': query})
+        self.assertEqual(response.status_code, 200)
+        return [item['strain_number'] for item in response.json()['results']]
+
+    def save(self, strain):
+        with self.captureOnCommitCallbacks(execute=True):
+            strain.save()
+
+
+class InvertedIndexTests(SearchTestCase):
+    """Ранжирование BM25 с весами полей"""
+
+    def test_field_weights(self):
+        # Совпадение в названии весит больше, чем в источнике выделения
+        self.assertEqual(self.search('pseudomonas'), ['001', '002'])
+
+    def test_any_word_matches(self):
+        self.assertEqual(set(self.search('rhodococcus subtilis')), {'002', '003'})
+        self.assertEqual(self.search('mycobacterium'), [])
+
+    def test_rare_words_rank_higher(self):
+        index = InvertedIndex()
+        index.add(1, {'description': 'вода вода вода'})
+        index.add(2, {'description': 'вода лед'})
+        index.add(3, {'description': 'вода'})
+        count, top = index.search('вода лед')
+        self.assertEqual(count, 3)
+        self.assertEqual(top[0][0], 2)
+        index.remove(2)
+        self.assertEqual(index.search('лед'), (0, []))
+        self.assertEqual(len(index), 2)
+
+    def test_pagination(self):
+        response = self.client.get('/api/search/query/', {'q': 'вода', 'limit': 1, 'offset': 1})
+        data = response.json()
+        self.assertEqual((data['count'], len(data['results'])), (2, 1))
+        self.assertEqual(self.client.get('/api/search/query/').status_code, 400)
+
+
+class IncrementalIndexTests(SearchTestCase):
+    """Индекс обновляется изменениями этого процесса и перестраивается при чужих"""
+
+    def test_save_updates_index_in_place(self):
+        index = engine.get_index()
+        strain = Strain.objects.get(pk=self.strains[2].pk)
+        strain.scientific_name = 'Rhodococcus qingshengii'
+        self.save(strain)
+        self.assertEqual(engine.version, get_version(STRAINS))
+        with mock.patch.object(engine, 'build', side_effect=AssertionError):
+            self.assertEqual(self.search('qingshengii'), ['003'])
+        self.assertIs(engine.index, index)
+
+    def test_delete_and_unavailable(self):
+        engine.get_index()
+        strain = Strain.objects.get(pk=self.strains[0].pk)
+        strain.is_available = False
+        self.save(strain)
+        with self.captureOnCommitCallbacks(execute=True):
+            Strain.objects.get(pk=self.strains[2].pk).delete()
+        with mock.patch.object(engine, 'build', side_effect=AssertionError):
+            self.assertEqual(self.search('pseudomonas вода'), ['002'])
+
+    def test_collection_rename(self):
+        engine.get_index()
+        with self.captureOnCommitCallbacks(execute=True):
+            collection = Collection.objects.get(pk=self.collection.pk)
+            collection.name = 'Коллекция термальных источников'
+            collection.code = 'TRM'
+            collection.save()
+        self.assertEqual(engine.version, get_version(STRAINS))
+        with mock.patch.object(engine, 'build', side_effect=AssertionError):
+            self.assertEqual(len(self.search('термальных')), 3)
+            self.assertEqual(len(self.search('trm')), 3)
+
+    def test_foreign_change_forces_rebuild(self):
+        engine.get_index()
+        # Изменение, сделанное другим процессом: версия увеличена без сигналов
+        cache.incr(VERSION_KEY.format(STRAINS))
+        Strain.objects.filter(pk=self.strains[1].pk).update(scientific_name='Bacillus cereus')
+        strain = Strain.objects.get(pk=self.strains[2].pk)
+        strain.scientific_name = 'Rhodococcus qingshengii'
+        self.save(strain)
+        self.assertNotEqual(engine.version, get_version(STRAINS))
+        self.assertEqual(self.search('cereus'), ['002'])
+        self.assertEqual(engine.version, get_version(STRAINS))
+
+    def test_bulk_update_forces_rebuild(self):
+        engine.get_index()
+        with self.captureOnCommitCallbacks(execute=True):
+            Strain.objects.filter(pk=self.strains[1].pk).update(scientific_name='Bacillus cereus')
+        self.assertEqual(self.search('cereus'), ['002'])
+
+    def test_stale_index_served_during_rebuild(self):
+        index = engine.get_index()
+        bump_version(STRAINS)
+        with engine.build_lock:
+            self.assertIs(engine.get_index(), index)
+        self.assertIsNot(engine.get_index(), index)
+        self.assertEqual(engine.version, get_version(STRAINS))
+
+    def test_warm_up(self):
+        warm_up()
+        self.assertEqual(engine.version, get_version(STRAINS))
+        self.assertEqual(len(engine.index), 3)
+
+
+class AutocompleteTests(SearchTestCase):
+    """Подсказки по префиксу"""
+
+    counts = {
+        ('genus', 'Bacillus'): 40,
+        ('genus', 'Bacteroides'): 7,
+        ('scientific_name', 'Bacillus subtilis'): 25,
+        ('scientific_name', 'Bacillus cereus'): 15,
+        ('strain_number', 'B-12'): 1,
+        ('strain_number', 'B-7'): 1,
+        ('collection_code', 'BAI'): 48,
+    }
+
+    def values(self, suggestions):
+        return [item['value'] for item in suggestions]
+
+    def test_precomputed_top_matches_scan(self):
+        precomputed = Autocomplete(self.counts, top_size=2)
+        scanned = Autocomplete(self.counts, top_size=len(self.counts))
+        self.assertIn('ba', precomputed.index.top)
+        for prefix in ('b', 'ba', 'bac', 'bacillus ', 'b-', 'x'):
+            for limit in (1, 2, 3, 10):
+                self.assertEqual(
+                    precomputed.complete(prefix, limit), scanned.complete(prefix, limit),
+                    (prefix, limit)
+                )
+
+    def test_ranking_and_kinds(self):
+        autocomplete = Autocomplete(self.counts, top_size=2)
+        self.assertEqual(
+            self.values(autocomplete.complete('BA', 3)), ['BAI', 'Bacillus', 'Bacillus subtilis']
+        )
+        self.assertEqual(
+            self.values(autocomplete.complete('bac', 3, {'genus', 'strain_number'})),
+            ['Bacillus', 'Bacteroides']
+        )
+        self.assertEqual(autocomplete.complete('  ', 3), [])
+
+    def test_api(self):
+        response = self.client.get(
+            '/api/search/autocomplete/', {'q': 'b', 'kind': 'collection_code'}
+        )
+        self.assertEqual(response.json()['results'], [
+            {'value': 'BAI', 'kind': 'collection_code', 'count': 3}
+        ])
+        strain = Strain.objects.get(pk=self.strains[1].pk)
+        strain.genus = 'Brevibacterium'
+        self.save(strain)
+        response = self.client.get('/api/search/autocomplete/', {'q': 'brev', 'kind': 'genus'})
+        self.assertEqual(self.values(response.json()['results']), ['Brevibacterium'])
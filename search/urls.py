@@ -3,5 +3,6 @@ from . import views
  
 app_name = 'search'
 urlpatterns = [
-    # Пока пустой - для будущего функционала поиска
-] 
\ No newline at end of file
+    path('search/query/', views.SearchQueryAPIView.as_view(), name='query'),
+    path('search/autocomplete/', views.AutocompleteAPIView.as_view(), name='autocomplete'),
+]
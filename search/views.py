@@ -1,3 +1,103 @@
-from django.shortcuts import render
+import time
 
-# Create your views here.
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from catalog.models import Strain
+from catalog.serializers import StrainSearchSerializer
+
+from .autocomplete import SUGGESTION_FIELDS, TOP_SUGGESTIONS, get_autocomplete
+from .engine import engine
+
+
+class SearchQueryAPIView(APIView):
+    """Поиск штаммов по индексу в памяти с ранжированием BM25"""
+    
+    default_limit = 20
+    max_limit = 100
+    
+    def get(self, request):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response(
+                {'error': 'Не задан поисковый запрос (q)'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            limit = min(int(request.query_params.get('limit', self.default_limit)), self.max_limit)
+            offset = int(request.query_params.get('offset', 0))
+        except ValueError:
+            return Response(
+                {'error': 'limit и offset должны быть целыми числами'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if limit < 1 or offset < 0:
+            return Response(
+                {'error': 'limit должен быть положительным, offset - неотрицательным'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        started = time.perf_counter()
+        count, ranked = engine.search(query, limit, offset)
+        took_ms = (time.perf_counter() - started) * 1000
+        
+        # Штаммы текущей страницы - одним запросом, в порядке релевантности
+        strains = Strain.objects.select_related('collection').in_bulk(
+            [pk for pk, _ in ranked]
+        )
+        results = []
+        for pk, score in ranked:
+            strain = strains.get(pk)
+            if strain is None:
+                continue
+            data = StrainSearchSerializer(strain, context={'request': request}).data
+            data['score'] = round(score, 4)
+            results.append(data)
+        
+        return Response({
+            'query': query,
+            'count': count,
+            'limit': limit,
+            'offset': offset,
+            'took_ms': round(took_ms, 3),
+            'results': results,
+        })
+
+
+class AutocompleteAPIView(APIView):
+    """Подсказки по префиксу: роды, названия, номера штаммов, коды коллекций"""
+    
+    default_limit = 10
+    max_limit = TOP_SUGGESTIONS
+    
+    def get(self, request):
+        prefix = request.query_params.get('q', '')
+        try:
+            limit = min(int(request.query_params.get('limit', self.default_limit)), self.max_limit)
+        except ValueError:
+            return Response(
+                {'error': 'limit должен быть целым числом'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # ?kind=genus&kind=strain_number или ?kind=genus,strain_number
+        kinds = {
+            kind.strip()
+            for value in request.query_params.getlist('kind')
+            for kind in value.split(',') if kind.strip()
+        }
+        unknown = kinds - set(SUGGESTION_FIELDS)
+        if unknown:
+            return Response(
+                {
+                    'error': f"Неизвестный вид подсказок: {', '.join(sorted(unknown))}",
+                    'available_kinds': list(SUGGESTION_FIELDS),
+                },
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        return Response({
+            'query': prefix,
+            'results': get_autocomplete().complete(prefix, max(limit, 1), kinds),
+        })
@@ -14,3 +14,9 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'sifibr_collections.settings')
 
 application = get_asgi_application()
+
+# Кэш в памяти процесса и прием сообщений об его инвалидации - только в
+# процессах сервера (catalog/local_cache.py)
+from catalog.local_cache import start_listener
+
+start_listener()
@@ -163,11 +163,33 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedStaticFilesStorage'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Внешнее хранилище геномных последовательностей (catalog/sequence_store.py)
+SEQUENCE_STORE_ROOT = os.getenv('SEQUENCE_STORE_ROOT')
+SEQUENCE_STORE = {
+    'BACKEND': 'catalog.sequence_store.LocalChunkStore',
+    'OPTIONS': {
+        'root': SEQUENCE_STORE_ROOT or str(BASE_DIR / 'sequence_store'),
+    },
+}
+# Переносить sequence_data в хранилище при сохранении GenomeSequence. По
+# умолчанию включено только при явно заданном SEQUENCE_STORE_ROOT (постоянный
+# диск): файловая система контейнера не сохраняется между деплоями
+SEQUENCE_STORE_OFFLOAD = os.getenv(
+    'SEQUENCE_STORE_OFFLOAD', str(bool(SEQUENCE_STORE_ROOT))
+).lower() == 'true'
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# INCLUDE в индексах поддерживает только PostgreSQL; в SQLite (локальная
+# разработка, тесты) неключевые столбцы покрывающего индекса
+# strain_collection_number_idx просто игнорируются. Предупреждение об этом
+# отключается только для таких СУБД: в PostgreSQL проверка W040 работает
+if 'postgresql' not in DATABASES['default']['ENGINE']:
+    SILENCED_SYSTEM_CHECKS = ['models.W040']
+
 # Django REST Framework настройки
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
@@ -177,6 +199,16 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
+    # JSON через orjson (catalog/renderers.py); без orjson - стандартный json
+    'DEFAULT_RENDERER_CLASSES': [
+        'catalog.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'catalog.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 50,
     'DEFAULT_FILTER_BACKENDS': [
@@ -187,11 +219,43 @@ REST_FRAMEWORK = {
 }
 
 # Настройки кэширования (Redis)
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+# Общий для всех процессов кэш нужен версиям данных (catalog/versions.py) и
+# блокировкам пересчета (catalog/stampede.py). Без REDIS_URL у каждого
+# процесса свой кэш в памяти, и ETag, ответы 304 и кэш ответов API и
+# выгрузок отключены (CATALOG_SHARED_CACHE ниже)
+REDIS_URL = os.getenv('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': 'sifibr',
+        }
     }
-}
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Общий ли кэш для всех процессов (None - по бэкенду: LocMemCache и
+# DummyCache считаются локальными). С локальным кэшем версии данных не
+# видят изменений других процессов, поэтому ETag и кэш ответов API
+# отключаются (catalog/versions.py, shared_versions)
+CATALOG_SHARED_CACHE = None
+
+# Время жизни кэша статистики и выгрузок (секунды)
+CATALOG_STATS_CACHE_TIMEOUT = int(os.getenv('CATALOG_STATS_CACHE_TIMEOUT', '300'))
+CATALOG_EXPORT_CACHE_TIMEOUT = int(os.getenv('CATALOG_EXPORT_CACHE_TIMEOUT', '600'))
+# Выгрузки длиннее этого числа строк не кэшируются и отдаются потоком
+CATALOG_EXPORT_CACHE_MAX_ROWS = int(os.getenv('CATALOG_EXPORT_CACHE_MAX_ROWS', '2000'))
+
+# Кэш в памяти процесса перед общим кэшем (catalog/local_cache.py): число
+# записей и время жизни (секунды) - предел устаревания при потере сообщения
+# об инвалидации
+CATALOG_L1_CACHE_MAX_ENTRIES = int(os.getenv('CATALOG_L1_CACHE_MAX_ENTRIES', '512'))
+CATALOG_L1_CACHE_TIMEOUT = int(os.getenv('CATALOG_L1_CACHE_TIMEOUT', '30'))
 
 # Настройки логирования
 LOGGING = {
@@ -14,3 +14,17 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'sifibr_collections.settings')
 
 application = get_wsgi_application()
+
+# Кэш в памяти процесса и прием сообщений об его инвалидации - только в
+# процессах сервера (catalog/local_cache.py)
+from catalog.local_cache import start_listener
+
+start_listener()
+
+# Поисковый индекс в памяти строится в фоновом потоке, не задерживая
+# запуск воркера; поиск до окончания построения ждет его (search/engine.py)
+import threading
+
+from search.engine import warm_up
+
+threading.Thread(target=warm_up, name='search-warm-up', daemon=True).start()